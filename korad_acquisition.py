@@ -0,0 +1,417 @@
+import collections
+import logging
+import math
+import threading
+import time
+
+from korad_metrics import REGISTRY, Counter, Gauge
+from korad_protocol import KoradProtocol, ProtocolError, PRIORITY_CONTROL, PRIORITY_POLL, PRIORITY_QUERY
+from korad_state import DeviceState
+from korad_supervisor import LinkSupervisor, reconnect_loop
+from korad_stats import StreamStats
+from korad_triggers import TriggerEngine
+
+# Liczba par zapytań VOUT1?/IOUT1? utrzymywanych w kolejce w trybie szybkim
+FAST_CAPTURE_DEPTH = 2
+
+logger = logging.getLogger('korad.acquisition')
+
+
+class AdaptivePolling:
+    """Okres odpytywania zależny od stanu zasilacza.
+
+    Przy załączonym (albo nieznanym) stanie wyjścia i przy uzbrojonych wyzwalaczach
+    odczyt zawsze odbywa się z pełną częstotliwością (``interval`` wątku) - wyzwalacz
+    zadziała z opóźnieniem jednego okresu. Przy wyłączonym wyjściu, ``hold_off`` sekund
+    po ostatniej zmianie odczytu (większej niż ``voltage_delta``/``current_delta``) albo
+    własnym zapisie do zasilacza, odczyt zwalnia do jednego co ``slow`` sekund.
+    """
+
+    def __init__(self, slow=2.0, hold_off=2.0, voltage_delta=0.02, current_delta=0.002):
+        self.slow = slow
+        self.hold_off = hold_off
+        self.voltage_delta = voltage_delta
+        self.current_delta = current_delta
+        self._last_change = time.monotonic()
+        self._previous = None  # Ostatni odczyt (napięcie, prąd)
+
+    def changed(self):
+        """Zgłoś zmianę (np. zapis nastawy) - odczyt wraca do pełnej częstotliwości."""
+        self._last_change = time.monotonic()
+
+    def update(self, voltage, current):
+        """Uwzględnij nową próbkę (NaN - przerwa w danych, liczy się jako zmiana)."""
+        previous = self._previous
+        self._previous = (voltage, current)
+        if (previous is None or not abs(voltage - previous[0]) <= self.voltage_delta
+                or not abs(current - previous[1]) <= self.current_delta):
+            self.changed()
+
+    def interval(self, fast, output, armed=False):
+        """Bieżący okres odpytywania [s]; ``output`` None (nieznany) - jak załączone, ``armed`` - są wyzwalacze."""
+        if output is not False or armed or time.monotonic() - self._last_change < self.hold_off:
+            return fast
+        return max(self.slow, fast)
+
+
+class AcquisitionWorker(threading.Thread):
+    """Wątek akwizycji - jedyny właściciel portu szeregowego zasilacza.
+
+    GUI nie dotyka portu bezpośrednio: komendy trafiają do kolejki protokołu
+    (``protocol``), a próbki i zdarzenia są odkładane do ``samples`` / ``events``
+    (deque - append/popleft są atomowe, więc nie potrzeba blokad).
+
+    Próbki mają postać (czas w ns z ``time.perf_counter_ns``, napięcie, prąd).
+    Metryki wątku i protokołu są rejestrowane w ``korad_metrics.REGISTRY`` z etykietą
+    ``port`` równą ``name`` (domyślnie nazwa portu połączenia).
+
+    Wyzwalacze (``triggers``) są sprawdzane w tym wątku na porcji próbek odebranych w
+    jednym przebiegu pętli, zaraz po odbiorze - akcja (np. OUT0) trafia do kolejki
+    protokołu przed kolejnym odczytem. Zadziałanie trafia do ``events`` jako ('trigger', zdarzenie).
+
+    ``state`` (``DeviceState``) przechowuje nastawy, stan wyjścia i bajt STATUS? - odczyt
+    nie wymaga komunikacji z zasilaczem. Rozbieżność między zapisaną nastawą a stanem
+    zasilacza trafia do ``events`` jako ('divergence', (nazwa, oczekiwana, odczytana)).
+
+    Po utracie łącza (``supervisor``) wątek sam łączy się ponownie, przywraca nastawy
+    i stan wyjścia, a w strumieniu próbek zostawia znacznik przerwy (czas, NaN, NaN).
+    Zmiany stanu łącza trafiają do ``events`` jako ('link', 'lost'/'restored').
+    Błąd zapisu próbek (``recorder``, subskrybenci z ``on_error``) odłącza zapis i trafia do
+    ``events`` jako ('writer', (zapis, błąd)).
+
+    Z ``adaptive`` (``AdaptivePolling``) okres odczytu wydłuża się do rzadkiego odczytu
+    kontrolnego, gdy odczyty się nie zmieniają - mniej ruchu na porcie przy bezczynnym stanowisku.
+    """
+
+    def __init__(self, connection, interval=0.3, max_samples=100000, name=None, reconnect=True):
+        super().__init__(daemon=True)
+        self.connection = connection
+        self.name = name or getattr(connection, 'port', None) or 'zasilacz'
+        self.protocol = KoradProtocol(connection, name=self.name)
+        port = getattr(connection, 'port', None)
+        self.supervisor = LinkSupervisor(port) if reconnect and port else None
+        self.restore_output = True  # Po ponownym połączeniu załącz wyjście, jeśli było załączone
+        self.link_up = True
+        self.interval = interval  # Okres odpytywania w sekundach (None - bez cyklicznego odczytu)
+        self.fast_capture = False  # Tryb szybki: zapytania potokowo, bez przerw
+        self.adaptive = None  # AdaptivePolling - okres zależny od zmian odczytu (None - stały ``interval``)
+        self.sample_rate = 0.0  # Osiągnięta liczba próbek na sekundę
+        self._recorder = None  # Opcjonalny zapis próbek na dysk (korad_recorder.Recorder)
+        self.stats = StreamStats()  # Moc, energia, ładunek i statystyki - aktualizowane przy każdej próbce
+        self.triggers = TriggerEngine(send=self.send)
+        self.subscribers = ()  # Dodatkowi odbiorcy próbek (deque) - np. serwer API; podmieniane atomowo
+
+        # Bufory wymiany danych z GUI
+        self.samples = collections.deque(maxlen=max_samples)  # (czas_ns, napięcie, prąd)
+        self.events = collections.deque()  # (rodzaj, dane)
+
+        self._stop_event = threading.Event()
+        self._polls_pending = 0  # Zlecone, jeszcze nieodebrane pary VOUT1?/IOUT1?
+        self._link_lost = False
+        self._port_errors_seen = 0
+        self._rate_count = 0
+        self._rate_start = time.perf_counter_ns()
+        self._last_poll = time.monotonic()
+
+        labels = {'port': self.name}
+        self.state = DeviceState(self.protocol, on_divergence=self._on_divergence, labels=labels)
+        self.setpoints = self.state.setpoints  # Bieżące nastawy: napięcie, prąd, wyjście
+        self.samples_total = Counter('korad_samples_total', 'Odebrane próbki napięcia i prądu', labels)
+        self.samples_dropped = Counter('korad_samples_dropped_total',
+                                       'Próbki utracone (nieudany odczyt lub przepełniony bufor)', labels)
+        self.triggers_fired = Counter('korad_triggers_total', 'Zadziałania wyzwalaczy', labels)
+        self.reconnects = Counter('korad_reconnects_total', 'Ponowne połączenia po utracie łącza', labels)
+        self.metrics = self.protocol.metrics + [
+            self.samples_total, self.samples_dropped, self.triggers_fired, self.state.divergences,
+            self.reconnects,
+            Gauge('korad_link_up', 'Łącze z zasilaczem działa (1) / utracone (0)', labels, lambda: int(self.link_up)),
+            Gauge('korad_sample_rate', 'Osiągnięta liczba próbek na sekundę', labels, lambda: self.sample_rate),
+            Gauge('korad_poll_interval_seconds', 'Bieżący okres cyklicznego odczytu', labels,
+                  lambda: self.poll_interval() or 0),
+        ]
+        REGISTRY.register(*self.metrics)
+
+    def stop(self, timeout=3.0, wait=True):
+        """Zatrzymaj wątek i zamknij port (``wait=False`` - tylko zasygnalizuj zatrzymanie)."""
+        self._stop_event.set()
+        self.protocol.wake()  # Obudź pętlę czekającą na komendy
+        if wait and self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    def send(self, command, priority=None, callback=None):
+        """Zakolejkuj komendę tekstową (np. 'VSET1:5.00') do wysłania; ``callback(request)`` po zakończeniu."""
+        self.state.written(command)
+        adaptive = self.adaptive
+        if adaptive is not None:
+            adaptive.changed()
+        return self.protocol.submit(command, priority, callback)
+
+    @property
+    def recorder(self):
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        self._recorder = recorder
+        if recorder is not None:
+            recorder.on_error = self._writer_failed
+            if recorder.error is not None:
+                self._writer_failed(recorder, recorder.error)
+
+    def subscribe(self, buffer):
+        """Dopisuj kopie próbek do ``buffer`` (deque z ``maxlen``) - bez dodatkowych zapytań do zasilacza.
+
+        Subskrybent z atrybutem ``on_error`` (np. ``korad_store.StoreWriter``) po błędzie
+        zapisu jest odłączany, a błąd trafia do ``events`` jako ('writer', (zapis, błąd)).
+        """
+        self.subscribers = self.subscribers + (buffer,)
+        if hasattr(buffer, 'on_error'):
+            buffer.on_error = self._writer_failed
+            if buffer.error is not None:
+                self._writer_failed(buffer, buffer.error)
+
+    def unsubscribe(self, buffer):
+        self.subscribers = tuple(subscriber for subscriber in self.subscribers if subscriber is not buffer)
+
+    def _writer_failed(self, writer, error):
+        """Zapis próbek (plik, baza sesji) przestał działać: odłącz go i zgłoś zdarzenie 'writer'."""
+        if self._recorder is writer:
+            self._recorder = None
+        self.unsubscribe(writer)
+        self.events.append(('writer', (writer, error)))
+
+    def request_settings(self):
+        """Zakolejkuj odczyt stanu zasilacza (VSET1?/ISET1?/STATUS?); nastawy wracają jako zdarzenie 'settings'."""
+
+        def on_done(error):
+            if error:
+                logger.warning('%s: błąd pobierania ustawień: %s', self.name, error)
+                self.events.append(('error', f'Błąd pobierania ustawień: {error}'))
+                return
+            self.events.append(('settings', (self.state.get('voltage'), self.state.get('current'))))
+
+        self.state.revalidate(on_done, PRIORITY_QUERY)
+
+    def _on_divergence(self, name, expected, actual):
+        self.events.append(('divergence', (name, expected, actual)))
+
+    def poll_interval(self):
+        """Bieżący okres cyklicznego odczytu [s] (None - bez odczytu)."""
+        adaptive = self.adaptive
+        if adaptive is None or self.interval is None:
+            return self.interval
+        return adaptive.interval(self.interval, self.state.get('output'), bool(self.triggers.triggers))
+
+    def set_adaptive(self, enabled, slow=2.0):
+        """Włącz/wyłącz adaptacyjny okres odczytu (``slow`` - okres w spoczynku [s])."""
+        self.adaptive = AdaptivePolling(slow) if enabled else None
+        self.protocol.wake()
+
+    def set_fast_capture(self, enabled):
+        """Włącz/wyłącz tryb szybkiej akwizycji (zapytania potokowe, bez przerw)."""
+        self.fast_capture = bool(enabled)
+        self.protocol.max_in_flight = 2 * FAST_CAPTURE_DEPTH if self.fast_capture else 1
+        self._reset_rate()
+        self.protocol.wake()
+
+    def run(self):
+        next_poll = time.monotonic()
+        if self.supervisor:
+            self._remember_identity()
+        try:
+            while not self._stop_event.is_set():
+                if self._link_lost or self.protocol.port_errors.value != self._port_errors_seen:
+                    self._recover()
+                    next_poll = time.monotonic()
+                    continue
+                now = time.monotonic()
+                if self.fast_capture:
+                    # Tryb szybki: zawsze kolejna para zapytań czeka w kolejce
+                    while self._polls_pending < FAST_CAPTURE_DEPTH:
+                        self.read_voltage_and_current()
+                    next_poll = now
+                elif self.interval is None:
+                    next_poll = now + 0.5  # Tylko komendy - budź się co jakiś czas, by sprawdzić zatrzymanie
+                else:
+                    interval = self.poll_interval()
+                    # Okres mógł się skrócić (zmiana odczytu, zapis nastawy) - nie czekaj do starego terminu
+                    next_poll = min(next_poll, self._last_poll + interval)
+                    if now >= next_poll and not self._polls_pending:
+                        self.read_voltage_and_current()
+                        self._last_poll = now
+                        next_poll += interval
+                        if next_poll < now:  # Nie nadrabiaj zaległych odczytów
+                            next_poll = now + interval
+
+                # Wysyłka komend i odbiór odpowiedzi; bez pracy czekaj do kolejnego odczytu
+                self.protocol.pump(timeout=max(next_poll - time.monotonic(), 0))
+                self._check_triggers()
+                self.state.poll()
+        finally:
+            self.protocol.fail_all(ProtocolError('Port zamknięty'))
+            REGISTRY.unregister(*self.metrics)
+            if self.supervisor:
+                self.supervisor.close()
+            try:
+                self.connection.close()
+            except Exception as e:
+                logger.error('%s: błąd zamykania portu: %s', self.name, e)
+
+    def _remember_identity(self):
+        def on_idn(request):
+            if not request.error:
+                self.supervisor.remember(request.reply)
+
+        self.protocol.submit('*IDN?', PRIORITY_QUERY, on_idn)
+
+    def _recover(self):
+        """Utracono łącze: zamknij port, zaznacz przerwę, połącz ponownie i przywróć ustawienia."""
+        self._port_errors_seen = self.protocol.port_errors.value
+        if not self.supervisor:
+            self._link_lost = False
+            return
+        logger.error('%s: utracono połączenie z zasilaczem', self.name)
+        self.link_up = False
+        self.events.append(('link', 'lost'))
+        try:
+            self.connection.close()
+        except Exception as e:
+            logger.debug('%s: błąd zamykania portu: %s', self.name, e)
+        # Zapytania w locie przepadły; komendy z kolejki zostaną wysłane po ponownym połączeniu
+        self.protocol.fail_in_flight(ProtocolError('Utracono połączenie'))
+        self._record(time.perf_counter_ns(), math.nan, math.nan)  # Znacznik przerwy w danych
+
+        connection = reconnect_loop(self.supervisor, self._stop_event)
+        if connection is None:
+            return  # Zatrzymano wątek w trakcie ponownego łączenia
+        self.connection = connection
+        self.protocol.connection = connection
+        self._link_lost = False
+        self._port_errors_seen = self.protocol.port_errors.value
+        self.link_up = True
+        self.reconnects.inc()
+        self._restore()
+        self.events.append(('link', 'restored'))
+
+    def _restore(self):
+        """Wyślij ostatnie zadane nastawy i stan wyjścia (model stanu potwierdzi je odczytem).
+
+        Wyłączenie wyjścia idzie od razu, załączenie - dopiero po zapisie nastaw do portu,
+        żeby wyjście nie wróciło przy nastawach, z którymi zasilacz się uruchomił.
+        """
+        setpoints = dict(self.setpoints)
+        output = setpoints['output']
+        if output and not self.supervisor.verified:
+            # Bez pewności, że to ten sam zasilacz, nie załączaj wyjścia
+            logger.warning('%s: nie potwierdzono tożsamości zasilacza - wyjście pozostaje bez zmian', self.name)
+            output = None
+        elif output and not self.restore_output:
+            output = None
+        elif output is False:
+            self.send('OUT0', PRIORITY_CONTROL)
+            output = None
+
+        commands = []
+        if setpoints['current'] is not None:
+            commands.append(f'ISET1:{setpoints["current"]:.3f}')
+        if setpoints['voltage'] is not None:
+            commands.append(f'VSET1:{setpoints["voltage"]:.2f}')
+        remaining = [len(commands)]
+        errors = []
+
+        def on_written(request):
+            # Wołane w tym wątku (``pump``) - po zapisie ostatniej nastawy załącz wyjście
+            if request.error:
+                errors.append(request.error)
+            remaining[0] -= 1
+            if remaining[0] or not output:
+                return
+            if errors:
+                logger.warning('%s: nie przywrócono nastaw (%s) - wyjście pozostaje wyłączone',
+                               self.name, errors[0])
+            else:
+                self.send('OUT1')
+
+        for command in commands:
+            self.send(command, callback=on_written)
+        if output and not commands:
+            self.send('OUT1')
+        logger.info('%s: przywrócono nastawy %s', self.name, setpoints)
+
+    def _record(self, timestamp_ns, voltage, current):
+        """Odłóż próbkę i zaktualizuj pomiar osiągniętej częstotliwości."""
+        sample = (timestamp_ns, voltage, current)
+        if len(self.samples) == self.samples.maxlen:
+            self.samples_dropped.inc()  # Odbiorca nie nadąża - najstarsza próbka wypada z bufora
+        self.samples.append(sample)
+        self.samples_total.inc()
+        self.stats.update(timestamp_ns, voltage, current)
+        adaptive = self.adaptive
+        if adaptive is not None:
+            adaptive.update(voltage, current)
+        if self.triggers.triggers:
+            self.triggers.add(timestamp_ns, voltage, current)
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.append(sample)
+        for subscriber in self.subscribers:
+            subscriber.append(sample)
+        self._rate_count += 1
+        elapsed = timestamp_ns - self._rate_start
+        if elapsed >= 1_000_000_000:
+            self.sample_rate = self._rate_count * 1e9 / elapsed
+            self._rate_count = 0
+            self._rate_start = timestamp_ns
+
+    def _check_triggers(self):
+        """Sprawdź wyzwalacze na próbkach odebranych w ostatnim przebiegu pętli."""
+        try:
+            fired = self.triggers.process_pending({'setpoints': self.setpoints})
+        except Exception:
+            logger.exception('%s: błąd sprawdzania wyzwalaczy', self.name)
+            return
+        for event in fired:
+            self.triggers_fired.inc()
+            self.events.append(('trigger', event))
+
+    def _reset_rate(self):
+        self.sample_rate = 0.0
+        self._rate_count = 0
+        self._rate_start = time.perf_counter_ns()
+
+    def read_voltage_and_current(self):
+        """Zleć odczyt napięcia i prądu; próbka trafi do bufora po odebraniu obu odpowiedzi.
+
+        Czas próbki to środek między odpowiedziami na VOUT1? i IOUT1?.
+        """
+        self._polls_pending += 1
+        voltage_request = self.protocol.submit('VOUT1?', PRIORITY_POLL)
+
+        def on_current(request):
+            self._polls_pending -= 1
+            error = voltage_request.error or request.error
+            if error:
+                if self._stop_event.is_set():
+                    return  # Zapytania odrzucone przy zamykaniu portu - to nie jest błąd odczytu
+                self.samples_dropped.inc()
+                logger.warning('%s: błąd odczytu napięcia i prądu: %s', self.name, error)
+                self.events.append(('error', f'Błąd odczytu napięcia i prądu: {error}'))
+                if self.supervisor and self.link_up and self.supervisor.failure():
+                    self._link_lost = True
+                return
+            if self.supervisor:
+                self.supervisor.success()
+            timestamp_ns = (voltage_request.completed_ns + request.completed_ns) // 2
+            self._record(timestamp_ns, float(voltage_request.reply), float(request.reply))
+
+        self.protocol.submit('IOUT1?', PRIORITY_POLL, on_current)
+
+
+def drain(buffer):
+    """Pobierz wszystkie elementy z deque bez blokowania wątku akwizycji."""
+    items = []
+    while True:
+        try:
+            items.append(buffer.popleft())
+        except IndexError:
+            return items
@@ -0,0 +1,424 @@
+"""Analiza zapisanych sesji: szumy, czas ustalania, tryb CV/CC, energia, pasma tolerancji.
+
+Każdy zapis jest przetwarzany w całości operacjami NumPy na tablicach (bez pętli po
+próbkach). Przebieg jest dzielony na odcinki w miejscach skoków napięcia lub prądu
+(zmiana nastawy, załączenie wyjścia, zmiana obciążenia) i przerw w danych (NaN).
+Dla każdego odcinka liczone są:
+
+* czas ustalania - od ostatniej próbki przed skokiem do pierwszej próbki, od której
+  kanał regulowany pozostaje w tolerancji wartości końcowej (średnia z końca
+  odcinka; pojedyncze próbki poza tolerancją są pomijane); dokładność ograniczona
+  okresem próbkowania,
+* tryb pracy - OFF (wyjście wyłączone), CV albo CC; bez podanych nastaw zasilacza
+  (``limits``) za regulowany uznaje się kanał stały (RMS zmian poniżej połowy
+  tolerancji) w drugiej połowie odcinka, a przy obu stałych - napięcie (CV),
+* szum na ustalonej części odcinka - międzyszczytowy i RMS napięcia i prądu (w
+  zestawieniu: napięcia w odcinkach CV, prądu w odcinkach CC),
+* zgodność z pasmami tolerancji (``voltage_band``/``current_band``) na ustalonych
+  częściach odcinków z załączonym wyjściem.
+
+``analyse_many`` przetwarza wiele zapisów równolegle w puli procesów; ``write_csv``,
+``write_segments_csv`` i ``write_html`` tworzą zestawienia (HTML z wykresami SVG, bez
+dodatkowych bibliotek).
+"""
+import concurrent.futures
+import csv
+import functools
+import html
+import logging
+import os
+import time
+
+import numpy as np
+
+# Domyślne parametry analizy
+DEFAULTS = {
+    'voltage_step': 0.1,  # Skok napięcia między próbkami uznawany za zmianę stanu [V]
+    'current_step': 0.01,  # Skok prądu [A]
+    'voltage_tolerance': 0.02,  # Tolerancja ustalenia napięcia [V]
+    'current_tolerance': 0.002,  # Tolerancja ustalenia prądu [A]
+    'final_window': 5,  # Liczba próbek z końca odcinka wyznaczających wartość ustaloną
+    'off_voltage': 0.05,  # Napięcie, poniżej którego (przy zerowym prądzie) wyjście uznaje się za wyłączone [V]
+    'max_gap': 10.0,  # Dłuższy odstęp między próbkami nie jest całkowany [s]
+    'limits': None,  # Nastawy (VSET, ISET) - dokładniejsza klasyfikacja CV/CC
+    'voltage_band': None,  # (min, max) napięcia na ustalonych odcinkach [V]
+    'current_band': None,  # (min, max) prądu [A]
+}
+
+# Wymiary wykresu SVG w raporcie HTML [px]
+PLOT_WIDTH = 900
+PLOT_HEIGHT = 220
+
+SUMMARY_COLUMNS = ('name', 'samples', 'duration_s', 'energy_wh', 'charge_ah', 'power_mean_w', 'power_max_w',
+                   'steps', 'settle_max_s', 'settle_mean_s', 'unsettled', 'voltage_pp', 'voltage_rms',
+                   'current_pp', 'current_rms', 'cv_fraction', 'cc_fraction', 'off_fraction',
+                   'voltage_in_band', 'current_in_band', 'pass', 'error')
+
+SEGMENT_COLUMNS = ('name', 'start_s', 'duration_s', 'settle_s', 'mode', 'voltage', 'current', 'voltage_pp',
+                   'voltage_rms', 'current_pp', 'current_rms')
+
+logger = logging.getLogger('korad.analysis')
+
+
+def load_session(source):
+    """Wczytaj zapis; ``source`` - ścieżka .kps albo (plik bazy sesji, numer sesji).
+
+    Zwraca (nazwa, metadane, czas [s od początku], napięcie, prąd).
+    """
+    if isinstance(source, (tuple, list)):
+        from korad_store import SessionStore
+
+        path, session = source
+        with SessionStore(path) as store:
+            columns = store.read(session)
+            info = store.session(session)
+        if info is None:
+            raise ValueError(f'Brak sesji {session} w {path}')
+        times, voltages, currents = columns['time_ns'], columns['voltage'], columns['current']
+        name = f"sesja {session} ({info.get('device', '?')})"
+        metadata = dict(info.get('metadata', {}), start_wall_time=times[0] / 1e9 if len(times) else None)
+    else:
+        from korad_recorder import read_log
+
+        metadata, times, voltages, currents = read_log(source)
+        name = os.path.basename(source)
+    start = times[0] if len(times) else 0
+    return (name, metadata, (times - start) / 1e9, voltages.astype(np.float64), currents.astype(np.float64))
+
+
+def _moving_means(values, window):
+    """Średnie ``window`` próbek kończących się na każdej próbce i zaczynających się od następnej."""
+    valid = np.isfinite(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    index = np.arange(len(values))
+    before = np.maximum(index + 1 - window, 0)
+    after = np.minimum(index + 1 + window, len(values))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_before = (sums[index + 1] - sums[before]) / (counts[index + 1] - counts[before])
+        mean_after = (sums[after] - sums[index + 1]) / (counts[after] - counts[index + 1])
+    return mean_before, mean_after
+
+
+def segment_starts(voltages, currents, voltage_step, current_step, window=5):
+    """Indeksy początków odcinków: po skoku napięcia/prądu i po przerwie w danych (NaN).
+
+    Skok między próbkami liczy się tylko wtedy, gdy zmienia się też średnia ``window``
+    próbek przed nim i po nim - pojedyncze szpilki i szum nie dzielą przebiegu.
+    """
+    valid = np.isfinite(voltages) & np.isfinite(currents)
+    jumps = np.zeros(len(voltages) - 1, dtype=bool)
+    for values, step in ((voltages, voltage_step), (currents, current_step)):
+        before, after = _moving_means(values, window)
+        with np.errstate(invalid='ignore'):
+            jumps |= (np.abs(np.diff(values)) > step) & (np.abs(after - before)[:-1] > step)
+    # Kolejne próbki przejścia (narastanie po zmianie nastawy) należą do jednego odcinka
+    first_jump = jumps & ~np.concatenate(([False], jumps[:-1]))
+    gaps = valid[1:] & ~valid[:-1]  # Pierwsza poprawna próbka po przerwie
+    return np.unique(np.concatenate(([0], np.flatnonzero(first_jump | gaps) + 1)))
+
+
+def _segment_reduce(ufunc, values, starts):
+    """``ufunc.reduceat`` po odcinkach (pomija NaN dla fmin/fmax)."""
+    return ufunc.reduceat(values, starts) if len(values) else np.empty(0)
+
+
+def _segment_stats(values, mask, segment, starts):
+    """Średnia, wartość międzyszczytowa i RMS odchyłki od średniej próbek ``mask`` w każdym odcinku."""
+    masked = np.where(mask, values, np.nan)
+    weights = np.bincount(segment, mask, minlength=len(starts))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pp = _segment_reduce(np.fmax, masked, starts) - _segment_reduce(np.fmin, masked, starts)
+        mean = np.bincount(segment, np.where(mask, values, 0.0), minlength=len(starts)) / weights
+        deviation = np.where(mask, values - mean[segment], 0.0)
+        rms = np.sqrt(np.bincount(segment, deviation ** 2, minlength=len(starts)) / weights)
+    return mean, pp, rms
+
+
+def analyse(times, voltages, currents, **options):
+    """Analiza jednego przebiegu (czas [s], napięcie, prąd); zwraca słownik wyników.
+
+    Parametry jak w ``DEFAULTS``.
+    """
+    options = dict(DEFAULTS, **options)
+    times = np.asarray(times, dtype=np.float64)
+    voltages = np.asarray(voltages, dtype=np.float64)
+    currents = np.asarray(currents, dtype=np.float64)
+    count = len(times)
+    result = {'samples': int(np.count_nonzero(np.isfinite(voltages))), 'segments': []}
+    if count < 2:
+        return result
+
+    valid = np.isfinite(voltages) & np.isfinite(currents)
+    dt = np.diff(times)
+    integrate = valid[:-1] & valid[1:] & (dt <= options['max_gap'])
+    power = voltages * currents
+    result['duration_s'] = float(times[-1] - times[0])
+    result['energy_wh'] = float(((power[:-1] + power[1:]) * dt)[integrate].sum() / 2 / 3600)
+    result['charge_ah'] = float(((currents[:-1] + currents[1:]) * dt)[integrate].sum() / 2 / 3600)
+    result['power_max_w'] = float(np.nanmax(power)) if valid.any() else None
+    integrated_time = dt[integrate].sum()
+    result['power_mean_w'] = result['energy_wh'] * 3600 / integrated_time if integrated_time else None
+
+    # Odcinki: numer odcinka każdej próbki i koniec odcinka (wyłącznie)
+    starts = segment_starts(voltages, currents, options['voltage_step'], options['current_step'],
+                            options['final_window'])
+    ends = np.append(starts[1:], count)
+    segment = np.repeat(np.arange(len(starts)), ends - starts)
+    index = np.arange(count)
+
+    # Tryb pracy z drugiej połowy odcinka: kanał regulowany jest stały, drugi zależy od obciążenia
+    tail = valid & (index >= ((starts + ends) // 2)[segment])
+    v_mean, _, v_rms = _segment_stats(voltages, tail, segment, starts)
+    i_mean, _, i_rms = _segment_stats(currents, tail, segment, starts)
+    limits = options['limits']
+    with np.errstate(invalid='ignore'):
+        off = (np.abs(v_mean) < options['off_voltage']) & (np.abs(i_mean) <= options['current_tolerance'])
+        if limits is not None:
+            current_limited = ((i_mean >= limits[1] - options['current_tolerance'])
+                               & (v_mean < limits[0] - options['voltage_tolerance']))
+        else:
+            current_limited = ((i_rms <= options['current_tolerance'] / 2)
+                               & (v_rms > options['voltage_tolerance'] / 2))
+    modes = np.where(off, 'OFF', np.where(current_limited, 'CC', 'CV'))
+    modes = np.where(np.isnan(v_mean), '-', modes)
+
+    # Ustalenie kanału regulowanego (OFF - obu): pierwsza próbka, od której pozostaje on w tolerancji
+    # wartości końcowej (średnia z ``final_window`` ostatnich próbek odcinka)
+    window_start = np.maximum(ends - options['final_window'], starts)
+    settle_index = {}
+    for name, values in (('voltage', voltages), ('current', currents)):
+        filled = np.where(valid, values, 0.0)
+        sums = np.concatenate(([0.0], np.cumsum(filled)))
+        counts = np.concatenate(([0], np.cumsum(valid)))
+        n = counts[ends] - counts[window_start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            final = np.where(n > 0, (sums[ends] - sums[window_start]) / np.maximum(n, 1), np.nan)
+            outside = valid & (np.abs(values - final[segment]) > options[f'{name}_tolerance'])
+        # Pojedyncza próbka poza tolerancją (szpilka, szum) nie przerywa ustalenia - liczą się dwie kolejne
+        outside &= np.concatenate(([False], outside[:-1])) | np.concatenate((outside[1:], [False]))
+        last_outside = _segment_reduce(np.maximum, np.where(outside, index, -1), starts)
+        settle_index[name] = np.maximum(last_outside + 1, starts)
+    settle_index = np.where(modes == 'CC', settle_index['current'],
+                            np.where(modes == 'CV', settle_index['voltage'],
+                                     np.maximum(settle_index['voltage'], settle_index['current'])))
+    settled_segment = settle_index < ends
+    # Odcinek po skoku: czas liczony od ostatniej próbki przed skokiem
+    reference = np.maximum(starts - 1, 0)
+    settle_time = np.where(settled_segment, times[np.minimum(settle_index, count - 1)] - times[reference], np.nan)
+    after_step = starts > 0
+
+    # Szum na ustalonej części odcinków
+    settled = valid & (index >= settle_index[segment])
+    noise = {name: _segment_stats(values, settled, segment, starts)
+             for name, values in (('voltage', voltages), ('current', currents))}
+
+    # Czas trwania odcinków (odstępy między próbkami przypisane próbce początkowej, bez przerw)
+    step_dt = np.where(integrate, dt, 0.0)
+    durations = np.bincount(segment[:-1], step_dt, minlength=len(starts))
+    total = durations.sum()
+    result['modes'] = {mode: float(durations[modes == mode].sum() / total) if total else 0.0
+                       for mode in ('CV', 'CC', 'OFF')}
+
+    step_times = settle_time[after_step]
+    result['steps'] = int(after_step.sum())
+    result['unsettled'] = int((~settled_segment).sum())
+    result['settle_max_s'] = float(np.nanmax(step_times)) if np.isfinite(step_times).any() else None
+    result['settle_mean_s'] = float(np.nanmean(step_times)) if np.isfinite(step_times).any() else None
+    on = ~off[segment] & settled
+    # Szum kanału regulowanego: napięcia w odcinkach CV, prądu w odcinkach CC
+    for name, mode in (('voltage', 'CV'), ('current', 'CC')):
+        _, pp, rms = noise[name]
+        active = (modes == mode) & np.isfinite(pp)
+        result[f'{name}_pp'] = float(pp[active].max()) if active.any() else None
+        result[f'{name}_rms'] = float(rms[active].max()) if active.any() else None
+
+    # Pasma tolerancji
+    result['bands'] = {}
+    for name, values in (('voltage', voltages), ('current', currents)):
+        band = options[f'{name}_band']
+        if band is None:
+            continue
+        checked = values[on]
+        inside = (checked >= band[0]) & (checked <= band[1])
+        worst = np.maximum(band[0] - checked, checked - band[1])
+        result['bands'][name] = {'min': band[0], 'max': band[1], 'checked': int(len(checked)),
+                                 'in_band': float(inside.mean()) if len(checked) else None,
+                                 'worst': float(worst.max()) if len(checked) else None,
+                                 'pass': bool(inside.all())}
+    result['pass'] = all(band['pass'] for band in result['bands'].values()) if result['bands'] else None
+
+    result['segments'] = [
+        {'start_s': float(times[start]), 'duration_s': float(duration),
+         'settle_s': float(settle) if after and np.isfinite(settle) else None, 'mode': str(mode),
+         'voltage': _float(noise['voltage'][0][k]), 'current': _float(noise['current'][0][k]),
+         'voltage_pp': _float(noise['voltage'][1][k]), 'voltage_rms': _float(noise['voltage'][2][k]),
+         'current_pp': _float(noise['current'][1][k]), 'current_rms': _float(noise['current'][2][k])}
+        for k, (start, duration, settle, after, mode)
+        in enumerate(zip(starts, durations, settle_time, after_step, modes))]
+    return result
+
+
+def _float(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def analyse_file(source, plot=True, **options):
+    """Wczytaj i przeanalizuj zapis (w procesie roboczym puli); błąd trafia do pola 'error'."""
+    started = time.perf_counter()
+    try:
+        name, metadata, times, voltages, currents = load_session(source)
+        result = analyse(times, voltages, currents, **options)
+        if plot:
+            result['plot'] = plot_svg(times, voltages, currents, result, options)
+    except (OSError, ValueError, KeyError, ImportError) as e:
+        name = source if isinstance(source, str) else f'sesja {source[1]}'
+        return {'name': os.path.basename(name), 'source': str(source), 'error': str(e), 'segments': []}
+    result.update(name=name, source=str(source), metadata=metadata,
+                  analysis_s=time.perf_counter() - started)
+    return result
+
+
+def analyse_many(sources, workers=None, plot=True, **options):
+    """Przeanalizuj zapisy równolegle (pula procesów); wyniki w kolejności ``sources``.
+
+    ``workers`` - liczba procesów (None - liczba rdzeni; 1 - bez puli, w bieżącym procesie).
+    """
+    sources = list(sources)
+    job = functools.partial(analyse_file, plot=plot, **options)
+    if workers == 1 or len(sources) <= 1:
+        return [job(source) for source in sources]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # Pakiety po kilka plików - mniej komunikacji między procesami przy setkach krótkich zapisów
+        chunksize = max(1, len(sources) // (4 * (workers or os.cpu_count() or 1)))
+        return list(executor.map(job, sources, chunksize=chunksize))
+
+
+def _envelope(times, values, t0, t1, top, bottom, low, high, width=PLOT_WIDTH):
+    """Ścieżka SVG obwiedni min/max przebiegu - jeden pionowy odcinek na piksel szerokości."""
+    keep = np.isfinite(values)
+    times, values = times[keep], values[keep]
+    if not len(times) or t1 <= t0 or high <= low:
+        return ''
+    column = np.minimum(((times - t0) / (t1 - t0) * (width - 1)).astype(np.int64), width - 1)
+    starts = np.flatnonzero(np.diff(column, prepend=-1))
+    columns = column[starts]
+    minima = np.minimum.reduceat(values, starts)
+    maxima = np.maximum.reduceat(values, starts)
+    scale = (bottom - top) / (high - low)
+    y_min = bottom - (minima - low) * scale
+    y_max = bottom - (maxima - low) * scale
+    # Przerwa w danych (kilka pustych kolumn) przerywa linię
+    move = np.diff(columns, prepend=-10) > 3
+    parts = [f'{"M" if jump else "L"}{x} {a:.1f}L{x} {b:.1f}' for x, a, b, jump in zip(columns, y_min, y_max, move)]
+    return ''.join(parts)
+
+
+def plot_svg(times, voltages, currents, result, options):
+    """Wykres napięcia i prądu (SVG) ze znacznikami skoków i pasmami tolerancji."""
+    if not len(times):
+        return ''
+    t0, t1 = float(times[0]), float(times[-1])
+    panels = []
+    colors = {'voltage': '#1f77b4', 'current': '#d62728'}
+    units = {'voltage': 'V', 'current': 'A'}
+    for row, (name, values) in enumerate((('voltage', voltages), ('current', currents))):
+        top = row * PLOT_HEIGHT / 2 + 12
+        bottom = (row + 1) * PLOT_HEIGHT / 2 - 6
+        finite = values[np.isfinite(values)]
+        band = options.get(f'{name}_band')
+        low = min(finite.min(), band[0]) if len(finite) and band else (finite.min() if len(finite) else 0.0)
+        high = max(finite.max(), band[1]) if len(finite) and band else (finite.max() if len(finite) else 1.0)
+        margin = max((high - low) * 0.05, 1e-3)
+        low, high = low - margin, high + margin
+        path = _envelope(times, values, t0, t1, top, bottom, low, high)
+        panels.append(f'<path d="{path}" stroke="{colors[name]}" fill="none" stroke-width="1"/>')
+        if band:
+            for limit in band:
+                y = bottom - (limit - low) / (high - low) * (bottom - top)
+                panels.append(f'<line x1="0" x2="{PLOT_WIDTH}" y1="{y:.1f}" y2="{y:.1f}" stroke="#888" '
+                              'stroke-dasharray="4 3"/>')
+        panels.append(f'<text x="4" y="{top + 10:.0f}" font-size="11" fill="{colors[name]}">'
+                      f'{name} {low + margin:.3f}..{high - margin:.3f} {units[name]}</text>')
+    for segment in result['segments'][1:]:
+        x = (segment['start_s'] - t0) / (t1 - t0) * (PLOT_WIDTH - 1) if t1 > t0 else 0
+        panels.append(f'<line x1="{x:.1f}" x2="{x:.1f}" y1="0" y2="{PLOT_HEIGHT}" stroke="#ccc"/>')
+    panels.append(f'<text x="{PLOT_WIDTH - 4}" y="{PLOT_HEIGHT - 2}" font-size="11" text-anchor="end">'
+                  f'{t1 - t0:.1f} s</text>')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{PLOT_WIDTH}" height="{PLOT_HEIGHT}" '
+            f'viewBox="0 0 {PLOT_WIDTH} {PLOT_HEIGHT}">' + ''.join(panels) + '</svg>')
+
+
+def summary_row(result):
+    """Wiersz zestawienia (kolumny ``SUMMARY_COLUMNS``) dla wyniku ``analyse_file``."""
+    modes = result.get('modes', {})
+    bands = result.get('bands', {})
+    row = {key: result.get(key) for key in SUMMARY_COLUMNS}
+    row.update(cv_fraction=modes.get('CV'), cc_fraction=modes.get('CC'), off_fraction=modes.get('OFF'),
+               voltage_in_band=bands.get('voltage', {}).get('in_band'),
+               current_in_band=bands.get('current', {}).get('in_band'))
+    return row
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float):
+        return f'{value:.6g}'
+    return value
+
+
+def write_csv(results, path):
+    """Zestawienie do CSV - wiersz na zapis."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SUMMARY_COLUMNS)
+        for result in results:
+            row = summary_row(result)
+            writer.writerow([_cell(row[key]) for key in SUMMARY_COLUMNS])
+
+
+def write_segments_csv(results, path):
+    """Odcinki wszystkich zapisów do CSV - wiersz na odcinek."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SEGMENT_COLUMNS)
+        for result in results:
+            for segment in result['segments']:
+                writer.writerow([_cell(result['name'] if key == 'name' else segment[key]) for key in SEGMENT_COLUMNS])
+
+
+def write_html(results, path, title='Raport zapisów KORAD PS'):
+    """Raport HTML: tabela zestawienia i dla każdego zapisu wykres oraz tabela odcinków."""
+    escape = html.escape
+    parts = [f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)}</title><style>'
+             'body{font-family:sans-serif;font-size:13px}table{border-collapse:collapse}'
+             'td,th{border:1px solid #ccc;padding:2px 6px;text-align:right}.fail{background:#fdd}'
+             '.pass{background:#dfd}</style></head><body>',
+             f'<h1>{escape(title)}</h1><p>{time.strftime("%Y-%m-%d %H:%M")}, zapisów: {len(results)}</p>',
+             '<table><tr>' + ''.join(f'<th>{key}</th>' for key in SUMMARY_COLUMNS) + '</tr>']
+    for number, result in enumerate(results):
+        row = summary_row(result)
+        status = {True: ' class="pass"', False: ' class="fail"'}.get(result.get('pass'), '')
+        if result.get('error'):
+            status = ' class="fail"'
+        cells = [f'<a href="#r{number}">{escape(str(row["name"]))}</a>' if key == 'name'
+                 else escape(str(_cell(row[key]))) for key in SUMMARY_COLUMNS]
+        parts.append(f'<tr{status}>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>')
+    parts.append('</table>')
+    for number, result in enumerate(results):
+        parts.append(f'<h2 id="r{number}">{escape(str(result["name"]))}</h2>')
+        if result.get('error'):
+            parts.append(f'<p class="fail">Błąd: {escape(result["error"])}</p>')
+            continue
+        parts.append(result.get('plot', ''))
+        parts.append('<table><tr>' + ''.join(f'<th>{key}</th>' for key in SEGMENT_COLUMNS[1:]) + '</tr>')
+        for segment in result['segments']:
+            parts.append('<tr>' + ''.join(f'<td>{escape(str(_cell(segment[key])))}</td>'
+                                          for key in SEGMENT_COLUMNS[1:]) + '</tr>')
+        parts.append('</table>')
+    parts.append('</body></html>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(parts))
@@ -0,0 +1,394 @@
+"""Benchmarki ścieżek akwizycji, rysowania i ustawień - na symulatorze zasilacza.
+
+Przykłady:
+    python korad_bench.py                            # pełny zestaw, wyniki na stdout
+    python korad_bench.py --quick --save bazowy.json # krótki przebieg, zapis wyników
+    python korad_bench.py --baseline bazowy.json     # porównanie z poprzednią wersją
+    python korad_bench.py --no-gui                   # bez PyQt5 (tylko rdzeń)
+
+Każda metryka ma kierunek (``higher``/``lower`` - co jest lepsze). Przy porównaniu z
+plikiem bazowym pogorszenie większe niż ``--tolerance`` (względnie) i niż próg szumu
+metryki (bezwzględnie) jest zgłaszane jako regresja, a program kończy się kodem 1.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from korad_acquisition import AcquisitionWorker, drain
+from korad_buffer import RingBuffer
+from korad_decimation import MinMaxPyramid
+from korad_sim import SimulatedKorad, SimulatedLoad
+
+# Liczby próbek w historii, dla których mierzony jest czas klatki GUI
+FRAME_HISTORY_SIZES = (1000, 10000, 100000, 200000)
+
+# Domyślna względna tolerancja przy porównaniu z wynikami bazowymi
+DEFAULT_TOLERANCE = 0.2
+
+
+class Results:
+    """Zebrane metryki: nazwa -> wartość, jednostka, kierunek i próg szumu."""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better, noise=0.0):
+        self.metrics[name] = {'value': float(value), 'unit': unit, 'better': better, 'noise': noise}
+        print(f'  {name:<40} {value:>12.3f} {unit}', flush=True)
+
+    def add_percentiles(self, name, values_ns, unit='ms', noise=0.5):
+        """Dodaj p50/p95/p99 z listy czasów w nanosekundach."""
+        if not len(values_ns):
+            print(f'  {name}: brak pomiarów', flush=True)
+            return
+        scale = {'ms': 1e6, 'us': 1e3}[unit]
+        values = np.asarray(values_ns, dtype=np.float64) / scale
+        for percentile in (50, 95, 99):
+            self.add(f'{name}.p{percentile}', np.percentile(values, percentile), unit, 'lower', noise)
+
+    def to_dict(self):
+        return {
+            'version': _git_version(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'metrics': self.metrics,
+        }
+
+
+def _git_version():
+    """Skrócony hash bieżącego commita (o ile program działa z repozytorium)."""
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _rss_bytes():
+    """Bieżąca pamięć rezydentna procesu (tylko Linux) albo None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _start_worker(simulator, interval=None, fast=False):
+    worker = AcquisitionWorker(simulator, interval=interval)
+    worker.start()
+    worker.send('ISET1:1.000')
+    worker.send('VSET1:5.00')
+    worker.send('OUT1').wait(5)
+    if fast:
+        worker.set_fast_capture(True)
+    return worker
+
+
+def _measure_rate(worker, duration):
+    """Liczba próbek na sekundę zebranych przez wątek w czasie ``duration``."""
+    time.sleep(min(duration / 5, 0.5))  # Rozgrzewka
+    drain(worker.samples)
+    start = time.perf_counter()
+    count = 0
+    while time.perf_counter() - start < duration:
+        time.sleep(0.05)
+        count += len(drain(worker.samples))
+    return count / (time.perf_counter() - start)
+
+
+def bench_acquisition(results, duration):
+    """Przepustowość ``read_voltage_and_current`` przy łączu 9600 bodów i bez ograniczeń łącza."""
+    cases = (
+        ('acquisition.serial.sequential', dict(), dict(interval=0)),
+        ('acquisition.serial.fast', dict(), dict(fast=True)),
+        ('acquisition.unthrottled.fast', dict(baudrate=None, latency=0), dict(fast=True)),
+    )
+    for name, simulator_options, worker_options in cases:
+        worker = _start_worker(SimulatedKorad(**simulator_options), **worker_options)
+        try:
+            results.add(f'{name}.samples_per_s', _measure_rate(worker, duration), 'S/s', 'higher', noise=5)
+        finally:
+            worker.stop()
+
+
+def bench_command_latency(results, duration):
+    """Czas od zakolejkowania zapytania do odpowiedzi, gdy w tle trwa cykliczny odczyt."""
+    worker = _start_worker(SimulatedKorad(), interval=0.05)
+    latencies = []
+    try:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            request = worker.send('VSET1?')
+            request.wait(5)
+            latencies.append(request.completed_ns - request.enqueued_ns)
+            time.sleep(0.01)
+    finally:
+        worker.stop()
+    results.add_percentiles('latency.command', latencies)
+
+
+class GuiBench:
+    """Benchmarki okna KoradController - rysowanie, pokrętła i opóźnienie do pikseli."""
+
+    def __init__(self):
+        from PyQt5.QtWidgets import QApplication
+        import korad_gui
+        self.app = QApplication.instance() or QApplication([sys.argv[0]])
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.window = korad_gui.KoradController()
+        # Klatki są wywoływane ręcznie, nie przez timer okna
+        self.window.readout_timer.stop()
+        self.window.ports_timer.stop()
+        self.window.resize(1200, 800)
+        self.window.show()
+        self.app.processEvents()
+
+    def close(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.window.close()
+        self.app.processEvents()
+
+    def frame(self):
+        """Jedna klatka: próbki z wątku do wykresów i synchroniczne przerysowanie okna."""
+        self.window.update_readouts()
+        self.window.repaint()
+        self.app.processEvents()
+
+    def bench_frame_time(self, results, duration):
+        """Czas klatki (nowe próbki + decymacja + setData + rysowanie) w zależności od długości historii."""
+        window = self.window
+        frames = max(int(duration * 20), 10)
+        for size in FRAME_HISTORY_SIZES:
+            size = min(size, window.history.capacity)
+            window.history.clear()
+            window.plot_pyramid.clear()
+            t = np.arange(size, dtype=np.float64) * 0.01
+            rows = np.column_stack((t, 5 + np.sin(t), 0.5 + 0.1 * np.cos(t)))
+            window.history.extend(rows)
+            window.plot_pyramid.extend(rows)
+            window.refresh_plots()
+            self.app.processEvents()
+
+            times = []
+            for index in range(frames):
+                # Porcja jak przy szybkiej akwizycji: 30 próbek na klatkę
+                t = (size + index * 30 + np.arange(30)) * 0.01
+                batch = np.column_stack((t, 5 + np.sin(t), 0.5 + 0.1 * np.cos(t)))
+                start = time.perf_counter_ns()
+                window.history.extend(batch)
+                window.plot_pyramid.extend(batch)
+                window.refresh_plots()
+                window.repaint()
+                self.app.processEvents()
+                times.append(time.perf_counter_ns() - start)
+            results.add_percentiles(f'gui.frame.history_{size}', times, noise=1.0)
+        window.history.clear()
+        window.plot_pyramid.clear()
+
+    def bench_dial(self, results, duration):
+        """Koszt ``update_voltage_display`` wywoływanego przez pokrętło (z wysyłką VSET1: do kolejki)."""
+        simulator = SimulatedKorad()
+        window = self.window
+        with contextlib.redirect_stdout(io.StringIO()):
+            window.start_acquisition(simulator)
+            times = []
+            deadline = time.perf_counter() + duration
+            value = 0
+            while time.perf_counter() < deadline:
+                value = (value + 1) % 100
+                start = time.perf_counter_ns()
+                window.voltage_dial_fraction.setValue(value)
+                times.append(time.perf_counter_ns() - start)
+                if len(times) % 100 == 0:
+                    self.app.processEvents()
+            coalesced = window.acquisition.protocol.coalesced_count
+            window.stop_acquisition()
+        results.add_percentiles('setpoint.dial', times, unit='us', noise=20)
+        results.add('setpoint.dial.coalesced_fraction', coalesced / max(len(times), 1), '', 'higher', noise=0.1)
+
+    def bench_end_to_end(self, results, duration):
+        """Opóźnienie od wysłania VSET1: do narysowania zmierzonej wartości na wykresie."""
+        window = self.window
+        simulator = SimulatedKorad(load=SimulatedLoad(None))  # Bez obciążenia: VOUT = VSET
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            window.start_acquisition(simulator)
+            window.acquisition.interval = 0
+            window.send_command('OUT1')
+            deadline = time.perf_counter() + duration
+            step = 0
+            while time.perf_counter() < deadline:
+                step += 1
+                target = 1 + step % 20
+                start = time.perf_counter_ns()
+                window.send_command(f'VSET1:{target:.2f}')
+                timeout = start + 2_000_000_000
+                while time.perf_counter_ns() < timeout:
+                    self.frame()
+                    if len(window.history) and abs(window.history.last()[1] - target) < 0.005:
+                        latencies.append(time.perf_counter_ns() - start)
+                        break
+                    time.sleep(0.001)
+            window.stop_acquisition()
+        results.add_percentiles('latency.end_to_end', latencies, noise=5)
+
+    def memory_tick(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.frame()
+
+
+def bench_memory(results, duration, gui=None):
+    """Przyrost pamięci podczas ciągłej szybkiej akwizycji, przeliczony na godzinę.
+
+    Mierzona jest sterta Pythona (tracemalloc, obejmuje też bufory NumPy) i - na
+    Linuksie - pamięć rezydentna procesu. Historia jest wcześniej zapełniana, żeby
+    mierzyć stan ustalony (bufory kołowe nie rosną), a przyrost to nachylenie prostej
+    dopasowanej do odczytów - pojedyncze porcje próbek w locie go nie zaburzają.
+    """
+    simulator = SimulatedKorad(baudrate=None, latency=0)
+    if gui:
+        history, pyramid = gui.window.history, gui.window.plot_pyramid
+    else:
+        history = RingBuffer(200000)
+        pyramid = MinMaxPyramid(history)
+    # Zapełnij historię próbkami sprzed startu osi czasu
+    t = np.arange(-history.capacity, 0, dtype=np.float64)
+    rows = np.column_stack((t, np.zeros_like(t), np.zeros_like(t)))
+    history.clear()
+    pyramid.clear()
+    history.extend(rows)
+    pyramid.extend(rows)
+
+    if gui:
+        with contextlib.redirect_stdout(io.StringIO()):
+            gui.window.start_acquisition(simulator)
+            gui.window.set_fast_capture(True)
+        tick = gui.memory_tick
+        stop = gui.window.stop_acquisition
+    else:
+        worker = _start_worker(simulator, fast=True)
+
+        def tick():
+            samples = drain(worker.samples)
+            if samples:
+                rows = np.array(samples, dtype=np.float64)
+                history.extend(rows)
+                pyramid.extend(rows)
+        stop = worker.stop
+
+    try:
+        warmup = time.perf_counter() + min(duration / 5, 1.0)
+        while time.perf_counter() < warmup:
+            tick()
+            time.sleep(0.05)
+        tracemalloc.start()
+        readings = []  # (czas [s], sterta [B], RSS [B] albo None)
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            tick()
+            readings.append((time.perf_counter() - start, tracemalloc.get_traced_memory()[0], _rss_bytes()))
+            time.sleep(0.05)
+    finally:
+        tracemalloc.stop()
+        stop()
+    elapsed = np.array([reading[0] for reading in readings])
+    heap = np.array([reading[1] for reading in readings], dtype=np.float64)
+    results.add('memory.heap_growth', np.polyfit(elapsed, heap, 1)[0] * 3600 / 2 ** 20, 'MiB/h', 'lower', noise=5)
+    if readings[0][2] is not None:
+        rss = np.array([reading[2] for reading in readings], dtype=np.float64)
+        results.add('memory.rss_growth', np.polyfit(elapsed, rss, 1)[0] * 3600 / 2 ** 20, 'MiB/h', 'lower',
+                    noise=50)
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Porównaj metryki z wynikami bazowymi; zwraca listę regresji (nazwa, stara, nowa, jednostka)."""
+    regressions = []
+    for name, metric in current.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        allowed = max(tolerance * abs(old['value']), metric.get('noise', 0.0))
+        if metric['better'] == 'higher':
+            worse = old['value'] - metric['value'] > allowed
+        else:
+            worse = metric['value'] - old['value'] > allowed
+        if worse:
+            regressions.append((name, old['value'], metric['value'], metric['unit']))
+    return regressions
+
+
+def run(duration=5.0, gui=True, offscreen=False):
+    """Uruchom cały zestaw; zwraca Results."""
+    results = Results()
+    print('Akwizycja:', flush=True)
+    bench_acquisition(results, duration)
+    bench_command_latency(results, duration)
+
+    gui_bench = None
+    if gui:
+        if offscreen:
+            os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        try:
+            gui_bench = GuiBench()
+        except ImportError as e:
+            print(f'Pominięto benchmarki GUI: {e}', flush=True)
+    if gui_bench:
+        try:
+            print('GUI:', flush=True)
+            gui_bench.bench_frame_time(results, duration)
+            gui_bench.bench_dial(results, duration)
+            gui_bench.bench_end_to_end(results, duration)
+            print('Pamięć:', flush=True)
+            bench_memory(results, duration, gui_bench)
+        finally:
+            gui_bench.close()
+    else:
+        print('Pamięć:', flush=True)
+        bench_memory(results, duration)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarki KORAD PS na symulatorze zasilacza.')
+    parser.add_argument('--duration', type=float, default=5.0, help='czas każdego pomiaru [s]')
+    parser.add_argument('--quick', action='store_true', help='krótkie pomiary (1 s)')
+    parser.add_argument('--no-gui', action='store_true', help='pomiń benchmarki okna (bez PyQt5)')
+    parser.add_argument('--offscreen', action='store_true', help='rysuj bez ekranu (QT_QPA_PLATFORM=offscreen)')
+    parser.add_argument('--save', help='zapisz wyniki do pliku JSON')
+    parser.add_argument('--baseline', help='porównaj z wynikami z pliku JSON')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='dopuszczalne względne pogorszenie (domyślnie 0.2)')
+    args = parser.parse_args(argv)
+
+    results = run(1.0 if args.quick else args.duration, gui=not args.no_gui, offscreen=args.offscreen)
+    report = results.to_dict()
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+        print(f'Zapisano wyniki do {args.save}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report['metrics'], baseline['metrics'], args.tolerance)
+        print(f'Porównanie z {baseline.get("version") or args.baseline}:')
+        for name, old, new, unit in regressions:
+            print(f'  REGRESJA {name}: {old:.3f} -> {new:.3f} {unit}')
+        if regressions:
+            return 1
+        print('  bez regresji')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Most SCPI przez TCP: wiele programów korzysta z jednego portu szeregowego zasilacza.
+
+Klient łączy się gniazdem TCP (domyślnie 127.0.0.1:5025) i wysyła komendy zasilacza
+(``VSET1:5.00``, ``IOUT1?``, ``*IDN?``...) zakończone znakiem nowej linii; odpowiedź na
+zapytanie wraca jako jedna linia. Komendy trafiają do kolejki protokołu wątku
+akwizycji przez sprawiedliwy harmonogram: każdy klient ma najwyżej jedno zapytanie w
+toku, a kolejni klienci są obsługiwani po kolei (round-robin), więc skrypt wysyłający
+tysiące zapytań nie zagłodzi pozostałych.
+
+Zapytania VOUT1?/IOUT1? są obsługiwane z ostatniego cyklicznego odczytu, jeśli jest
+świeższy niż ``cache_ttl`` - dziesięć skryptów odpytujących ``VOUT1?`` nie zwiększa
+ruchu na porcie. VSET1?/ISET1? zwracają nastawę z modelu stanu (``korad_state``), jeśli
+jest potwierdzona odczytem. ``*IDN?`` jest pamiętane po pierwszym odczycie. Nieudane zapytanie
+dostaje pustą linię (klient nie czeka na limit czasu).
+"""
+import asyncio
+import collections
+import logging
+import socket
+import threading
+import time
+
+from korad_metrics import REGISTRY, Counter, Gauge
+
+# Domyślny port mostu (jak w przyrządach SCPI z gniazdem "raw socket")
+BRIDGE_PORT = 5025
+
+# Najwięcej zapytań mostu jednocześnie w kolejce protokołu
+BRIDGE_IN_FLIGHT = 2
+
+# Najdłuższa komenda przyjmowana od klienta [bajty]
+MAX_LINE = 64
+
+logger = logging.getLogger('korad.bridge')
+
+
+class BridgeClient:
+    """Połączenie klienta: komendy czekające na wysłanie i liczba zapytań w toku."""
+
+    def __init__(self, name, writer):
+        self.name = name
+        self.writer = writer
+        self.pending = collections.deque()  # (komenda, future z odpowiedzią)
+        self.busy = False  # Zapytanie klienta jest w kolejce protokołu
+
+
+class ScpiBridge(threading.Thread):
+    """Serwer TCP przekazujący komendy klientów do wątku akwizycji ``worker``.
+
+    ``cache_ttl`` - najstarszy odczyt [s], którym można odpowiedzieć na VOUT1?/IOUT1?
+    (domyślnie dwa okresy odpytywania, co najmniej 0,5 s).
+    """
+
+    def __init__(self, worker=None, host='127.0.0.1', port=BRIDGE_PORT, cache_ttl=None):
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.cache_ttl = cache_ttl
+        # Port zajęty -> OSError już tutaj, w wątku wywołującym
+        self.socket = socket.create_server((host, port))
+        self.port = self.socket.getsockname()[1]
+        self.loop = asyncio.new_event_loop()
+        self.clients = collections.deque()  # Kolejność obsługi round-robin
+        self._in_flight = 0
+        self._wakeup = None
+        self._stopped = None
+        self._tasks = set()  # Obsługa połączeń klientów - anulowana przy zatrzymaniu
+        self._identity = {}  # Worker -> odpowiedź na *IDN?
+
+        labels = {'port': str(self.port)}
+        self.commands = Counter('korad_bridge_commands_total', 'Komendy przekazane do zasilacza przez most', labels)
+        self.cache_hits = Counter('korad_bridge_cache_hits_total', 'Zapytania obsłużone z ostatniego odczytu', labels)
+        self.metrics = [self.commands, self.cache_hits,
+                        Gauge('korad_bridge_clients', 'Podłączeni klienci mostu', labels, lambda: len(self.clients))]
+        REGISTRY.register(*self.metrics)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            REGISTRY.unregister(*self.metrics)
+            self.loop.close()
+
+    def stop(self, timeout=3.0):
+        if self.is_alive():
+            self.loop.call_soon_threadsafe(lambda: self._stopped and self._stopped.set())
+            self.join(timeout)
+        else:
+            self.socket.close()
+            REGISTRY.unregister(*self.metrics)
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        server = await asyncio.start_server(self._handle, sock=self.socket)
+        scheduler = asyncio.ensure_future(self._schedule())
+        logger.info('Most SCPI nasłuchuje na %s:%d', *self.socket.getsockname()[:2])
+        await self._stopped.wait()
+        scheduler.cancel()
+        server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client = BridgeClient(f'{peer[0]}:{peer[1]}' if peer else '?', writer)
+        self.clients.append(client)
+        logger.info('Klient mostu %s połączony', client.name)
+        self._tasks.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if len(line) > MAX_LINE:
+                    logger.warning('%s: za długa komenda - rozłączono', client.name)
+                    break
+                command = line.decode('ascii', 'replace').strip()
+                if not command:
+                    continue
+                reply = await self._execute(client, command)
+                if reply is not None:
+                    writer.write(reply.encode('latin-1', 'replace') + b'\n')  # Bajt STATUS? bez zmian
+                    await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):  # Anulowanie przy zatrzymaniu mostu
+            pass
+        finally:
+            self.clients.remove(client)
+            self._tasks.discard(asyncio.current_task())
+            for _, future in client.pending:
+                future.cancel()
+            writer.close()
+            logger.info('Klient mostu %s rozłączony', client.name)
+
+    async def _execute(self, client, command):
+        """Wykonaj komendę klienta; zwraca odpowiedź (zapytania) albo None."""
+        worker = self.worker
+        if worker is None:
+            return '' if command.endswith('?') else None
+        cached = self._cached(worker, command)
+        if cached is not None:
+            self.cache_hits.inc()
+            return cached
+        if not command.endswith('?'):
+            # Zapis nie ma odpowiedzi - kolejność względem zapytań zapewniają priorytety protokołu
+            worker.send(command)
+            self.commands.inc()
+            return None
+        future = self.loop.create_future()
+        client.pending.append((command, future))
+        self._wakeup.set()
+        try:
+            reply = await future
+        except Exception as e:
+            logger.warning('%s: %s nie powiodło się: %s', client.name, command, e)
+            return ''
+        if command == '*IDN?':
+            self._identity[worker] = reply
+        return reply
+
+    def _cached(self, worker, command):
+        if command == '*IDN?':
+            return self._identity.get(worker)
+        if command in ('VSET1?', 'ISET1?'):
+            # Nastawa potwierdzona odczytem i bez późniejszego zapisu - model stanu odświeża ją w tle
+            entry = worker.state.entries['voltage' if command == 'VSET1?' else 'current']
+            if not entry.confirmed:
+                return None
+            return f'{entry.value:05.2f}' if command == 'VSET1?' else f'{entry.value:.3f}'
+        if command not in ('VOUT1?', 'IOUT1?'):
+            return None
+        last = worker.stats.last  # (czas_ns, napięcie, prąd, moc) - ostatni cykliczny odczyt
+        if last is None:
+            return None
+        ttl = self.cache_ttl
+        if ttl is None:
+            ttl = max(2 * (worker.interval or 0), 0.5)
+        if time.perf_counter_ns() - last[0] > ttl * 1e9:
+            return None
+        return f'{last[1]:05.2f}' if command == 'VOUT1?' else f'{last[2]:.3f}'
+
+    async def _schedule(self):
+        """Przekazuj zapytania klientów do protokołu po kolei (round-robin), najwyżej ``BRIDGE_IN_FLIGHT`` naraz."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            for _ in range(len(self.clients)):
+                if self._in_flight >= BRIDGE_IN_FLIGHT:
+                    break
+                client = self.clients[0]
+                self.clients.rotate(-1)
+                if client.busy or not client.pending:
+                    continue
+                command, future = client.pending.popleft()
+                if future.cancelled():
+                    continue
+                self._submit(client, command, future)
+
+    def _submit(self, client, command, future):
+        worker = self.worker
+        if worker is None:
+            future.set_exception(ConnectionError('Brak połączenia z zasilaczem'))
+            return
+        client.busy = True
+        self._in_flight += 1
+        self.commands.inc()
+
+        def on_done(request):
+            # Wątek akwizycji - wynik przekazywany do pętli asyncio
+            self.loop.call_soon_threadsafe(self._finish, client, future, request)
+
+        worker.protocol.submit(command, callback=on_done)
+
+    def _finish(self, client, future, request):
+        client.busy = False
+        self._in_flight -= 1
+        if not future.cancelled():
+            if request.error:
+                future.set_exception(request.error)
+            else:
+                future.set_result(request.reply)
+        self._wakeup.set()
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Bufor kołowy o stałej pojemności na kolumny próbek (np. czas, napięcie, prąd).
+
+    Dane są zapisywane podwójnie (pod indeksem i oraz i + capacity), dzięki czemu
+    ostatnie ``len(self)`` próbek zawsze tworzy ciągły fragment tablicy i można je
+    zwrócić jako widok bez kopiowania. Dopisanie próbki ma koszt O(1).
+    """
+
+    def __init__(self, capacity, columns=3, dtype=np.float64):
+        if capacity <= 0:
+            raise ValueError('Pojemność bufora musi być dodatnia')
+        self.capacity = int(capacity)
+        self.columns = columns
+        self._data = np.zeros((columns, 2 * self.capacity), dtype=dtype)
+        self._head = 0  # Indeks następnego zapisu w zakresie [0, capacity)
+        self._count = 0
+        self.total = 0  # Liczba wszystkich dopisanych próbek (także już nadpisanych)
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Usuń wszystkie próbki (bez zwalniania pamięci)."""
+        self._head = 0
+        self._count = 0
+        self.total = 0
+
+    def append(self, *values):
+        """Dopisz jedną próbkę - po jednej wartości na kolumnę."""
+        self._data[:, self._head] = values
+        self._data[:, self._head + self.capacity] = values
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        self.total += 1
+
+    def extend(self, rows):
+        """Dopisz wiele próbek naraz; ``rows`` ma kształt (n, columns)."""
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, self.columns)
+        n = len(rows)
+        if n == 0:
+            return
+        self.total += n
+
+        # Z paczki większej niż bufor zostaje tylko jej koniec
+        if n > self.capacity:
+            self._head = (self._head + n - self.capacity) % self.capacity
+            rows = rows[-self.capacity:]
+            n = self.capacity
+
+        first = min(n, self.capacity - self._head)
+        for offset in (0, self.capacity):
+            self._data[:, self._head + offset:self._head + offset + first] = rows[:first].T
+            self._data[:, offset:offset + n - first] = rows[first:].T
+
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+
+    def view(self):
+        """Zwróć widok (columns, len) na próbki od najstarszej do najnowszej - bez kopiowania."""
+        start = (self._head - self._count) % self.capacity
+        return self._data[:, start:start + self._count]
+
+    def column(self, index):
+        """Widok na pojedynczą kolumnę (np. 0 - czas)."""
+        return self.view()[index]
+
+    def last(self):
+        """Ostatnia dopisana próbka albo None, gdy bufor jest pusty."""
+        if not self._count:
+            return None
+        return self._data[:, (self._head - 1) % self.capacity]
@@ -0,0 +1,523 @@
+"""Wiersz poleceń zasilacza KORAD - działa bez PyQt5 i pyqtgraph.
+
+Przykłady:
+    korad-ps get
+    korad-ps set --port COM3 --voltage 5 --current 0.5 --output on
+    korad-ps log --duration 60 --file pomiar.kps
+    korad-ps sweep --start 0 --stop 12 --step 0.5
+    korad-ps --metrics-port 9108 log --fast --quiet
+    korad-ps sequence profil.csv --repeat 10 --timing czasy.csv
+    korad-ps sequence --ramp 0 12 --duration 60 --step-time 0.05 --output on
+    korad-ps serve --http-port 8765
+    korad-ps serve --no-http --scpi-port 5025
+    korad-ps log --store --quiet
+    korad-ps serve --store --adaptive 5
+    korad-ps query --since 30d --above 2
+    korad-ps query --since 2026-09-01 --aggregate --by-session
+    korad-ps report pomiary/*.kps --html raport.html --csv raport.csv --voltage-band 4.9 5.1
+"""
+import argparse
+import logging
+import sys
+import time
+
+# Podkomendy obsługiwane przez CLI; pozostałe argumenty trafiają do GUI
+COMMANDS = ('set', 'get', 'log', 'sweep', 'sequence', 'serve', 'query', 'report')
+
+# Podkomendy działające bez zasilacza
+OFFLINE_COMMANDS = ('query', 'report')
+
+
+def _on_off(value):
+    value = value.lower()
+    if value in ('on', '1', 'true'):
+        return True
+    if value in ('off', '0', 'false'):
+        return False
+    raise argparse.ArgumentTypeError('oczekiwano on/off')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='korad-ps', description='Sterowanie zasilaczem KORAD bez GUI.')
+    parser.add_argument('--port', help='port szeregowy (domyślnie: automatyczne wyszukiwanie)')
+    parser.add_argument('--verbose', action='store_true', help='szczegółowe logi (poziom DEBUG)')
+    parser.add_argument('--metrics-port', type=int, help='udostępnij metryki pod http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--metrics-file', help='zapisuj metryki do pliku (format Prometheusa)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    set_parser = commands.add_parser('set', help='ustaw napięcie, prąd i/lub wyjście')
+    set_parser.add_argument('--voltage', '-v', type=float, help='napięcie [V]')
+    set_parser.add_argument('--current', '-i', type=float, help='prąd [A]')
+    set_parser.add_argument('--output', '-o', type=_on_off, help='wyjście on/off')
+
+    get_parser = commands.add_parser('get', help='odczytaj zmierzone (i ustawione) napięcie i prąd')
+    get_parser.add_argument('--settings', action='store_true', help='pokaż też wartości ustawione')
+
+    log_parser = commands.add_parser('log', help='rejestruj odczyty (CSV na stdout i/lub plik .kps)')
+    log_parser.add_argument('--interval', type=float, default=0.3, help='okres odczytu [s]')
+    log_parser.add_argument('--fast', action='store_true', help='szybka akwizycja (maksymalna częstotliwość)')
+    log_parser.add_argument('--adaptive', type=float, nargs='?', const=2.0, metavar='OKRES',
+                            help='odczyt adaptacyjny: przy wyłączonym wyjściu co OKRES [s] (domyślnie 2)')
+    log_parser.add_argument('--duration', type=float, help='czas rejestracji [s] (domyślnie do Ctrl+C)')
+    log_parser.add_argument('--file', help='zapisz do pliku .kps')
+    log_parser.add_argument('--quiet', action='store_true', help='nie wypisuj próbek na stdout')
+    log_parser.add_argument('--trip-current', type=float, help='wyzwalacz: prąd powyżej [A]')
+    log_parser.add_argument('--trip-drop', type=float, help='wyzwalacz: spadek napięcia o więcej niż [V]')
+    log_parser.add_argument('--drop-window', type=float, default=50, help='okno spadku napięcia [ms]')
+    log_parser.add_argument('--trip-mode', action='store_true', help='wyzwalacz: zmiana trybu CV/CC')
+    log_parser.add_argument('--trip-action', choices=('off', 'none'), default='off',
+                            help='akcja wyzwalacza: wyłącz wyjście (domyślnie) lub tylko zapisz zdarzenie')
+    log_parser.add_argument('--capture', help='zapisz przebiegi wyzwoleń do plików PREFIX_N.csv')
+    log_parser.add_argument('--store', nargs='?', const='', metavar='PLIK',
+                            help='zapisz sesję do bazy sesji (domyślnie ~/.korad_ps/sessions.sqlite)')
+
+    sweep_parser = commands.add_parser('sweep', help='charakterystyka I-U: przestrój nastawę i zapisz punkty pracy')
+    sweep_parser.add_argument('--start', type=float, required=True, help='nastawa początkowa [V lub A]')
+    sweep_parser.add_argument('--stop', type=float, required=True, help='nastawa końcowa [V lub A]')
+    sweep_parser.add_argument('--step', type=float, required=True, help='krok siatki zgrubnej [V lub A]')
+    sweep_parser.add_argument('--sweep-current', action='store_true', help='przestrajaj prąd zamiast napięcia')
+    sweep_parser.add_argument('--limit', type=float,
+                              help='druga nastawa: ograniczenie prądu [A] (lub napięcia [V] przy --sweep-current)')
+    sweep_parser.add_argument('--current', '-i', type=float, help=argparse.SUPPRESS)  # Zgodność: --limit
+    sweep_parser.add_argument('--min-step', type=float, help='najmniejszy krok zagęszczania (domyślnie krok/8)')
+    sweep_parser.add_argument('--no-refine', action='store_true', help='bez zagęszczania w miejscach załamania')
+    sweep_parser.add_argument('--max-points', type=int, default=500, help='limit liczby punktów')
+    sweep_parser.add_argument('--dwell', type=float, default=0.05, help='minimalny czas po zmianie nastawy [s]')
+    sweep_parser.add_argument('--settle-timeout', type=float, default=5.0, help='limit czasu ustalania [s]')
+    sweep_parser.add_argument('--settle-span', type=float, default=0.3,
+                              help='czas, przez który odczyt nie może się zmieniać [s] (>= stała czasowa wyjścia)')
+    sweep_parser.add_argument('--voltage-tolerance', type=float, default=0.02, help='tolerancja ustalenia [V]')
+    sweep_parser.add_argument('--current-tolerance', type=float, default=0.002, help='tolerancja ustalenia [A]')
+    sweep_parser.add_argument('--output', '-o', type=_on_off, help='załącz/wyłącz wyjście przed pomiarem')
+    sweep_parser.add_argument('--file', help='zapisz wynik do CSV (posortowany według nastawy)')
+
+    sequence_parser = commands.add_parser('sequence', help='wykonaj sekwencję ustawień (profil lub generator)')
+    sequence_parser.add_argument('profile', nargs='?', help='profil .csv/.json: t, voltage, current, output')
+    sequence_parser.add_argument('--ramp', nargs=2, type=float, metavar=('START', 'STOP'), help='rampa napięcia [V]')
+    sequence_parser.add_argument('--sine', nargs=3, type=float, metavar=('OFFSET', 'AMPLITUDE', 'PERIOD'),
+                                 help='sinusoida napięcia [V, V, s]')
+    sequence_parser.add_argument('--duration', type=float, default=10.0, help='czas generatora [s]')
+    sequence_parser.add_argument('--step-time', type=float, default=0.1, help='okres kroków generatora [s]')
+    sequence_parser.add_argument('--current', '-i', type=float, help='ograniczenie prądu generatora [A]')
+    sequence_parser.add_argument('--output', '-o', type=_on_off, help='wyjście na początku generatora on/off')
+    sequence_parser.add_argument('--repeat', type=int, default=1, help='liczba przebiegów (0 - bez końca)')
+    sequence_parser.add_argument('--timing', help='zapisz zadane i osiągnięte czasy kroków do CSV')
+
+    serve_parser = commands.add_parser('serve', help='udostępnij sterowanie (REST) i strumień próbek (WebSocket)')
+    serve_parser.add_argument('--http-port', type=int, default=8765, help='port serwera API')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='adres nasłuchu (domyślnie tylko lokalnie)')
+    serve_parser.add_argument('--no-http', action='store_true', help='bez serwera REST/WebSocket')
+    serve_parser.add_argument('--allow-host', action='append', default=[], metavar='NAZWA',
+                              help='dodatkowa nazwa hosta serwera API w nagłówkach Host/Origin (można powtarzać)')
+    serve_parser.add_argument('--scpi-port', type=int, help='most SCPI przez TCP na porcie (np. 5025)')
+    serve_parser.add_argument('--interval', type=float, default=0.3, help='okres odczytu [s]')
+    serve_parser.add_argument('--adaptive', type=float, nargs='?', const=2.0, metavar='OKRES',
+                              help='odczyt adaptacyjny: przy wyłączonym wyjściu co OKRES [s] (domyślnie 2)')
+    serve_parser.add_argument('--duration', type=float, help='czas działania [s] (domyślnie do Ctrl+C)')
+    serve_parser.add_argument('--store', nargs='?', const='', metavar='PLIK',
+                              help='zapisuj sesję do bazy sesji i udostępnij zapytania (/api/sessions)')
+
+    query_parser = commands.add_parser('query', help='przeszukaj bazę sesji (bez zasilacza)')
+    query_parser.add_argument('--store', default='', metavar='PLIK', help='plik bazy sesji')
+    query_parser.add_argument('--since', help='od: 30d, 12h, 2026-09-01, 2026-09-01T08:00')
+    query_parser.add_argument('--until', help='do (format jak --since)')
+    query_parser.add_argument('--device', help='tylko sesje zasilacza (np. COM3)')
+    query_parser.add_argument('--channel', choices=('current', 'voltage'), default='current',
+                              help='kanał warunku --above/--below')
+    query_parser.add_argument('--above', type=float, help='sesje, w których kanał przekroczył wartość')
+    query_parser.add_argument('--below', type=float, help='sesje, w których kanał spadł poniżej wartości')
+    query_parser.add_argument('--aggregate', action='store_true', help='statystyki zakresu zamiast listy sesji')
+    query_parser.add_argument('--by-session', action='store_true', help='statystyki osobno dla każdej sesji')
+    query_parser.add_argument('--session', type=int, help='wypisz próbki sesji (CSV)')
+    query_parser.add_argument('--import', dest='import_files', nargs='+', metavar='KPS',
+                              help='zaimportuj zapisy .kps jako sesje')
+
+    report_parser = commands.add_parser('report', help='analiza zapisów: szum, ustalanie, CV/CC, energia, pasma')
+    report_parser.add_argument('files', nargs='*', metavar='KPS', help='zapisy .kps')
+    report_parser.add_argument('--store', nargs='?', const='', metavar='PLIK',
+                               help='analizuj sesje z bazy sesji (z --since/--until/--device)')
+    report_parser.add_argument('--since', help='sesje od (format jak w query)')
+    report_parser.add_argument('--until', help='sesje do')
+    report_parser.add_argument('--device', help='tylko sesje zasilacza')
+    report_parser.add_argument('--html', help='zapisz raport HTML z wykresami')
+    report_parser.add_argument('--csv', help='zapisz zestawienie CSV (wiersz na zapis)')
+    report_parser.add_argument('--segments', help='zapisz odcinki wszystkich zapisów do CSV')
+    report_parser.add_argument('--workers', type=int, help='liczba procesów (domyślnie liczba rdzeni)')
+    report_parser.add_argument('--voltage-band', nargs=2, type=float, metavar=('MIN', 'MAX'),
+                               help='dopuszczalne napięcie ustalone [V]')
+    report_parser.add_argument('--current-band', nargs=2, type=float, metavar=('MIN', 'MAX'),
+                               help='dopuszczalny prąd ustalony [A]')
+    report_parser.add_argument('--limits', nargs=2, type=float, metavar=('VSET', 'ISET'),
+                               help='nastawy zasilacza - dokładniejsza klasyfikacja CV/CC')
+    report_parser.add_argument('--voltage-step', type=float, default=0.1, help='skok napięcia dzielący odcinki [V]')
+    report_parser.add_argument('--current-step', type=float, default=0.01, help='skok prądu dzielący odcinki [A]')
+    report_parser.add_argument('--voltage-tolerance', type=float, default=0.02, help='tolerancja ustalenia [V]')
+    report_parser.add_argument('--current-tolerance', type=float, default=0.002, help='tolerancja ustalenia [A]')
+    return parser
+
+
+def cmd_set(device, args):
+    if args.voltage is not None:
+        device.set_voltage(args.voltage)
+    if args.current is not None:
+        device.set_current(args.current)
+    if args.output is not None:
+        device.set_output(args.output)
+    voltage, current = device.settings()
+    print(f'VSET={voltage:.2f} V ISET={current:.3f} A')
+
+
+def cmd_get(device, args):
+    voltage, current = device.read()
+    print(f'VOUT={voltage:.2f} V IOUT={current:.3f} A')
+    if args.settings:
+        voltage, current = device.settings()
+        status = device.status()
+        output = 'on' if status['output'] else 'off'
+        print(f'VSET={voltage:.2f} V ISET={current:.3f} A {status["mode"]} wyjście={output}')
+
+
+def cmd_log(device, args):
+    recorder = None
+    if args.file:
+        from korad_recorder import Recorder
+        recorder = Recorder(args.file, {'port': device.name})
+        device.worker.recorder = recorder
+    store, store_writer = _open_store_writer(device, args.store)
+    device.worker.interval = args.interval
+    if args.adaptive is not None:
+        device.worker.set_adaptive(True, args.adaptive)
+    triggers = _log_triggers(args)
+    if triggers:
+        device.worker.request_settings()  # Nastawy dla wyzwalacza CV/CC
+        device.worker.triggers.set_triggers(triggers)
+    if args.fast:
+        device.worker.set_fast_capture(True)
+    else:
+        device.worker.protocol.wake()
+
+    start_ns = time.perf_counter_ns()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    count = 0
+    events = []
+    if not args.quiet:
+        print('time_s,voltage_V,current_A')
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.2)
+            samples = device.samples()
+            count += len(samples)
+            if not args.quiet:
+                sys.stdout.write(''.join(f'{(t - start_ns) / 1e9:.6f},{voltage:.2f},{current:.3f}\n'
+                                         for t, voltage, current in samples))
+                sys.stdout.flush()
+            # Błędy zalogował już wątek akwizycji
+            events += [payload for kind, payload in device.events() if kind == 'trigger']
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.worker.recorder = None
+        if recorder:
+            recorder.close()
+        _close_store_writer(device, store, store_writer)
+    print(f'Zarejestrowano {count} próbek', file=sys.stderr)
+    if recorder and recorder.error is not None:
+        print(f'Zapis do {recorder.path} przerwany: {recorder.error} (odrzucono {recorder.samples_dropped} próbek)',
+              file=sys.stderr)
+    for number, event in enumerate(events, 1):
+        reaction = '' if event.reaction_ns is None else f', reakcja {event.reaction_ns / 1e6:.1f} ms'
+        print(f'Wyzwolenie {number}: {event.name} przy {(event.timestamp_ns - start_ns) / 1e9:.3f} s, '
+              f'U={event.voltage:.2f} V, I={event.current:.3f} A{reaction}', file=sys.stderr)
+        if args.capture and event.capture is not None:
+            from korad_triggers import write_capture
+            write_capture(event, f'{args.capture}_{number}.csv')
+    stats = device.statistics()
+    if stats['total']['voltage']['count']:
+        totals = stats['total']
+        print(f"Energia {stats['energy_wh']:.6f} Wh, ładunek {stats['charge_ah']:.6f} Ah, "
+              f"U średnie {totals['voltage']['mean']:.3f} V, I średnie {totals['current']['mean']:.4f} A, "
+              f"P maks. {totals['power']['max']:.3f} W", file=sys.stderr)
+
+
+def _open_store_writer(device, path):
+    """Baza sesji i zapis bieżącej sesji (``path`` None - bez bazy, '' - plik domyślny)."""
+    if path is None:
+        return None, None
+    from korad_store import STORE_PATH, SessionStore, StoreWriter
+
+    store = SessionStore(path or STORE_PATH)
+    writer = StoreWriter(store, device.name, {'port': device.name, 'interval': device.worker.interval})
+    device.worker.subscribe(writer)
+    print(f'Sesja {writer.session} w bazie {store.path}', file=sys.stderr)
+    return store, writer
+
+
+def _close_store_writer(device, store, writer):
+    if writer is not None:
+        device.worker.unsubscribe(writer)
+        writer.close()
+        if writer.error is not None:
+            print(f'Zapis sesji {writer.session} przerwany: {writer.error} '
+                  f'(odrzucono {writer.samples_dropped} próbek)', file=sys.stderr)
+    if store is not None:
+        store.close()
+
+
+def _log_triggers(args):
+    """Wyzwalacze z opcji polecenia ``log``."""
+    from korad_triggers import Change, ModeChange, Threshold, Trigger
+
+    action = 'OUT0' if args.trip_action == 'off' else None
+    # Przebieg po wyzwoleniu: do 2 s, ale nie mniej niż 10 próbek
+    post = max(int(2 / args.interval), 10) if args.interval else 10
+    triggers = []
+    if args.trip_current is not None:
+        triggers.append(Trigger(Threshold('current', above=args.trip_current), action, post=post))
+    if args.trip_drop is not None:
+        triggers.append(Trigger(Change('voltage', -abs(args.trip_drop), args.drop_window / 1000), action, post=post))
+    if args.trip_mode:
+        triggers.append(Trigger(ModeChange(), action, post=post))
+    return triggers
+
+
+def cmd_sweep(device, args):
+    from korad_sweep import Sweep, write_csv
+
+    sweep = Sweep(device, args.start, args.stop, args.step,
+                  quantity='current' if args.sweep_current else 'voltage',
+                  limit=args.limit if args.limit is not None else args.current,
+                  min_step=args.min_step, refine=not args.no_refine, max_points=args.max_points,
+                  voltage_tolerance=args.voltage_tolerance, current_tolerance=args.current_tolerance,
+                  settle_timeout=args.settle_timeout, min_wait=args.dwell, span=args.settle_span)
+    if args.output is not None:
+        device.set_output(args.output)
+    start = time.monotonic()
+    print('setpoint,voltage_V,current_A,mode,settle_s')
+
+    def on_point(point):
+        print(f'{point.setpoint:.3f},{point.voltage:.3f},{point.current:.4f},{point.mode},{point.settle_time:.3f}',
+              flush=True)
+
+    points = sweep.run(on_point)
+    if args.file:
+        write_csv(points, args.file)
+    print(f'Zmierzono {len(points)} punktów w {time.monotonic() - start:.1f} s', file=sys.stderr)
+
+
+def cmd_sequence(device, args):
+    from korad_sequence import SequenceRunner, load_profile, ramp, sine
+
+    if args.ramp:
+        steps = ramp(*args.ramp, args.duration, args.step_time, args.current, args.output)
+    elif args.sine:
+        steps = sine(*args.sine, args.duration, args.step_time, args.current, args.output)
+    elif args.profile:
+        steps = load_profile(args.profile)
+    else:
+        raise ValueError('Podaj plik profilu albo --ramp/--sine')
+
+    runner = SequenceRunner(device.worker.send, steps, repeat=args.repeat, timing_path=args.timing)
+    runner.start()
+    try:
+        while runner.is_alive():
+            runner.join(0.5)
+            runner.resolve()  # Czasy kroków na bieżąco do podsumowania i pliku --timing
+    except KeyboardInterrupt:
+        runner.stop()
+    # Poczekaj, aż ostatnie komendy trafią do zasilacza
+    if runner.last is not None:
+        for _, request in runner.last.requests:
+            request.wait(5)
+    runner.close_timing()
+    if runner.error:
+        raise runner.error
+    stats = runner.stats()
+    print(' '.join(f'{key}={value:.3f}' if isinstance(value, float) else f'{key}={value}'
+                   for key, value in stats.items()), file=sys.stderr)
+
+
+def cmd_serve(device, args):
+    from korad_bridge import ScpiBridge
+    from korad_server import ApiServer
+
+    if args.no_http and args.scpi_port is None:
+        raise ValueError('Nic do udostępnienia: podaj --scpi-port albo usuń --no-http')
+    device.worker.interval = args.interval
+    if args.adaptive is not None:
+        device.worker.set_adaptive(True, args.adaptive)
+    device.worker.protocol.wake()
+    device.worker.request_settings()
+    servers = []
+    store, store_writer = _open_store_writer(device, args.store)
+    if not args.no_http:
+        server = ApiServer(device.worker, host=args.host, port=args.http_port, store=store,
+                           allowed_hosts=args.allow_host)
+        servers.append(server)
+        print(f'API: http://{args.host}:{server.port}/api/state, strumień: ws://{args.host}:{server.port}/ws/samples',
+              file=sys.stderr)
+    if args.scpi_port is not None:
+        bridge = ScpiBridge(device.worker, host=args.host, port=args.scpi_port)
+        servers.append(bridge)
+        print(f'Most SCPI: {args.host}:{bridge.port}', file=sys.stderr)
+    for server in servers:
+        server.start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(0.5)
+            device.events()  # Błędy zalogował już wątek akwizycji
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.stop()
+        _close_store_writer(device, store, store_writer)
+
+
+def cmd_query(args):
+    from korad_store import STORE_PATH, SessionStore, import_log, parse_time
+
+    t0 = parse_time(args.since) if args.since else None
+    t1 = parse_time(args.until) if args.until else None
+    with SessionStore(args.store or STORE_PATH) as store:
+        if args.import_files:
+            for path in args.import_files:
+                session = import_log(store, path, args.device)
+                print(f'{path}: sesja {session}', file=sys.stderr)
+            return
+        if args.session is not None:
+            columns = store.read(args.session, t0, t1)
+            print('time_unix_s,voltage_V,current_A')
+            sys.stdout.write(''.join(f'{t / 1e9:.6f},{voltage:.3f},{current:.4f}\n' for t, voltage, current
+                                     in zip(columns['time_ns'], columns['voltage'], columns['current'])))
+            return
+        if args.aggregate:
+            result = store.aggregate(t0, t1, args.device, by_session=args.by_session)
+            for session in result.get('sessions', []):
+                print(f"{session['id']:>6} {session['device']:<12} {_format_aggregate(session)}")
+            print(f"Razem ({result['sessions_count']} sesji): {_format_aggregate(result)}")
+            return
+        sessions = store.sessions(t0, t1, args.device, args.channel, args.above, args.below)
+        threshold = args.above is not None or args.below is not None
+        print('id,device,start,end,samples,v_max_V,i_max_A,energy_Wh' + (',first_crossing' if threshold else ''))
+        for session in sessions:
+            row = [session['id'], session['device'], _format_time(session['start_ns']),
+                   _format_time(session['end_ns']), session['samples'], _format_value(session['voltage']['max'], 3),
+                   _format_value(session['current']['max'], 4), f"{session['energy_wh']:.6f}"]
+            if threshold:
+                row.append(_format_time(session['first_ns']))
+            print(','.join(str(value) for value in row))
+        print(f'Znaleziono {len(sessions)} sesji', file=sys.stderr)
+
+
+def cmd_report(args):
+    from korad_analysis import analyse_many, summary_row, write_csv, write_html, write_segments_csv
+
+    sources = list(args.files)
+    if args.store is not None:
+        from korad_store import STORE_PATH, SessionStore, parse_time
+
+        path = args.store or STORE_PATH
+        with SessionStore(path) as store:
+            sessions = store.sessions(parse_time(args.since) if args.since else None,
+                                      parse_time(args.until) if args.until else None, args.device)
+        sources += [(path, session['id']) for session in sessions]
+    if not sources:
+        raise ValueError('Podaj pliki .kps albo --store')
+    start = time.monotonic()
+    results = analyse_many(sources, workers=args.workers, plot=bool(args.html),
+                           voltage_band=args.voltage_band, current_band=args.current_band, limits=args.limits,
+                           voltage_step=args.voltage_step, current_step=args.current_step,
+                           voltage_tolerance=args.voltage_tolerance, current_tolerance=args.current_tolerance)
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.segments:
+        write_segments_csv(results, args.segments)
+    if args.html:
+        write_html(results, args.html)
+    if not (args.csv or args.html or args.segments):
+        for result in results:
+            row = summary_row(result)
+            status = {True: 'OK', False: 'NIEZGODNY', None: ''}[row['pass']]
+            if row['error']:
+                print(f"{row['name']}: błąd: {row['error']}")
+                continue
+            parts = [f"{row['duration_s'] or 0:.1f} s", f"{row['energy_wh'] or 0:.6f} Wh", f"skoki {row['steps']}"]
+            if row['settle_max_s'] is not None:
+                parts.append(f"ustalanie maks. {row['settle_max_s']:.2f} s")
+            if row['voltage_pp'] is not None:
+                parts.append(f"szum U {row['voltage_pp']:.3f} V p-p")
+            if row['current_pp'] is not None:
+                parts.append(f"szum I {row['current_pp']:.4f} A p-p")
+            print(f"{row['name']}: {', '.join(parts)} {status}".rstrip())
+    failed = sum(1 for result in results if result.get('error') or result.get('pass') is False)
+    print(f'Przeanalizowano {len(results)} zapisów w {time.monotonic() - start:.1f} s, niezgodnych/błędnych: '
+          f'{failed}', file=sys.stderr)
+
+
+def _format_time(t_ns):
+    return '' if t_ns is None else time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t_ns / 1e9))
+
+
+def _format_value(value, digits):
+    return '' if value is None else f'{value:.{digits}f}'
+
+
+def _format_aggregate(result):
+    voltage, current = result['voltage'], result['current']
+    return (f"{_format_time(result['start_ns'])} - {_format_time(result['end_ns'])}, {result['samples']} próbek, "
+            f"U {_format_value(voltage['min'], 3)}..{_format_value(voltage['max'], 3)} V "
+            f"(śr. {_format_value(voltage['mean'], 3)}), I {_format_value(current['min'], 4)}.."
+            f"{_format_value(current['max'], 4)} A (śr. {_format_value(current['mean'], 4)}), "
+            f"{result['energy_wh']:.6f} Wh, {result['charge_ah']:.6f} Ah")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Import dopiero tutaj: samo --help nie ładuje pyserial
+    import sqlite3
+
+    import serial
+    from korad_core import KoradDevice
+    from korad_metrics import FileExporter, MetricsServer, setup_logging
+    from korad_protocol import ProtocolError
+
+    setup_logging(logging.DEBUG if args.verbose else logging.WARNING)
+    if args.command in OFFLINE_COMMANDS:
+        try:
+            {'query': cmd_query, 'report': cmd_report}[args.command](args)
+        except (sqlite3.Error, ValueError, OSError) as e:
+            print(f'Błąd: {e}', file=sys.stderr)
+            return 1
+        return 0
+    exporters = []
+    handlers = {'set': cmd_set, 'get': cmd_get, 'log': cmd_log, 'sweep': cmd_sweep, 'sequence': cmd_sequence,
+                'serve': cmd_serve}
+    try:
+        if args.metrics_port is not None:
+            exporters.append(MetricsServer(port=args.metrics_port))
+        if args.metrics_file:
+            exporters.append(FileExporter(args.metrics_file))
+        for exporter in exporters:
+            exporter.start()
+        with KoradDevice.open(args.port) as device:
+            try:
+                handlers[args.command](device, args)
+            finally:
+                # Przed zamknięciem zasilacza - ostatni zapis metryk zawiera jeszcze jego liczniki
+                _stop_exporters(exporters)
+    except (serial.SerialException, ProtocolError, sqlite3.Error, ValueError, OSError) as e:
+        print(f'Błąd: {e}', file=sys.stderr)
+        return 1
+    finally:
+        _stop_exporters(exporters)
+    return 0
+
+
+def _stop_exporters(exporters):
+    while exporters:
+        exporters.pop().stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
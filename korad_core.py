@@ -0,0 +1,96 @@
+import serial
+
+from korad_acquisition import AcquisitionWorker, drain
+from korad_sim import open_port
+from korad_state import parse_status
+
+# Zakresy ustawień zasilacza (jak w GUI)
+MAX_VOLTAGE = 31.0
+MAX_CURRENT = 5.1
+
+
+class KoradDevice:
+    """Synchroniczny dostęp do zasilacza bez GUI - dla CLI, skryptów i testów.
+
+    Port jest obsługiwany przez ten sam wątek akwizycji co w GUI, więc komendy
+    przechodzą przez kolejkę protokołu (priorytety, scalanie, dopasowanie odpowiedzi).
+    Przy ``interval=None`` zasilacz nie jest odpytywany cyklicznie.
+    """
+
+    def __init__(self, connection, interval=None, name=None):
+        self.name = name
+        self.worker = AcquisitionWorker(connection, interval=interval, name=name)
+        self.worker.start()
+
+    @classmethod
+    def open(cls, port=None, interval=None, baudrate=9600, timeout=2):
+        """Otwórz zasilacz na podanym porcie (lub symulator ``sim://``) albo znajdź go automatycznie."""
+        if port:
+            return cls(open_port(port, baudrate=baudrate, timeout=timeout), interval, port)
+        from korad_discovery import discover
+        found = discover(first_only=True)
+        if not found:
+            raise serial.SerialException('Nie znaleziono zasilacza KORAD')
+        for other in found[1:]:
+            other.connection.close()
+        return cls(found[0].connection, interval, found[0].port)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Zatrzymaj wątek akwizycji i zamknij port."""
+        self.worker.stop()
+
+    def command(self, command, priority=None, timeout=5.0):
+        """Wyślij komendę i poczekaj na jej wykonanie; dla zapytań zwraca odpowiedź."""
+        return self.worker.send(command, priority).wait(timeout)
+
+    def identify(self):
+        return self.command('*IDN?')
+
+    def set_voltage(self, voltage):
+        if not 0 <= voltage <= MAX_VOLTAGE:
+            raise ValueError(f'Napięcie poza zakresem 0-{MAX_VOLTAGE} V')
+        self.command(f'VSET1:{voltage:.2f}')
+
+    def set_current(self, current):
+        if not 0 <= current <= MAX_CURRENT:
+            raise ValueError(f'Prąd poza zakresem 0-{MAX_CURRENT} A')
+        self.command(f'ISET1:{current:.3f}')
+
+    def set_output(self, enabled):
+        self.command('OUT1' if enabled else 'OUT0')
+
+    def settings(self):
+        """Ustawione napięcie i prąd (VSET1?/ISET1?)."""
+        return float(self.command('VSET1?')), float(self.command('ISET1?'))
+
+    def status(self):
+        """Zdekodowany bajt STATUS?: tryb CV/CC, wyjście, blokada panelu."""
+        return parse_status(self.command('STATUS?'))
+
+    def state(self):
+        """Ostatni znany stan (nastawy, wyjście, STATUS?) bez komunikacji z zasilaczem."""
+        return self.worker.state.snapshot()
+
+    def read(self):
+        """Zmierzone napięcie i prąd (VOUT1?/IOUT1?)."""
+        return float(self.command('VOUT1?')), float(self.command('IOUT1?'))
+
+    def samples(self):
+        """Próbki z cyklicznego odczytu zebrane od ostatniego wywołania: (czas_ns, napięcie, prąd)."""
+        return drain(self.worker.samples)
+
+    def events(self):
+        return drain(self.worker.events)
+
+    def statistics(self):
+        """Statystyki cyklicznego odczytu od startu (lub ``reset_statistics``): energia, ładunek, min/max/..."""
+        return self.worker.stats.snapshot()
+
+    def reset_statistics(self):
+        self.worker.stats.reset()
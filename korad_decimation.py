@@ -0,0 +1,110 @@
+import numpy as np
+
+from korad_buffer import RingBuffer
+
+
+class MinMaxPyramid:
+    """Wielopoziomowe podsumowanie min/max próbek do szybkiego rysowania wykresów.
+
+    Poziom k przechowuje bloki po ``factor ** k`` próbek jako wiersze
+    (czas początku, czas końca, min kanałów..., max kanałów...). Poziomy są
+    uzupełniane przyrostowo przy każdym ``extend``, a ``query`` wybiera najdrobniejszy
+    poziom, który w danym zakresie czasu mieści się w szerokości wykresu. Dzięki
+    parom min/max żadna szpilka nie znika, a koszt rysowania zależy od liczby pikseli,
+    nie od długości historii.
+    """
+
+    def __init__(self, history, factor=8, min_blocks=16):
+        self.history = history  # RingBuffer z surowymi próbkami (czas, kanał 1, kanał 2, ...)
+        self.factor = factor
+        self.channels = history.columns - 1
+        self.levels = []  # Poziomy 1..n (poziom 0 to surowa historia)
+        self._pending = []  # Niepełne bloki czekające na scalenie, osobno dla każdego poziomu
+
+        block = factor
+        while history.capacity // block >= min_blocks:
+            self.levels.append(RingBuffer(history.capacity // block + 2, columns=2 + 2 * self.channels))
+            self._pending.append(np.empty((0, 2 + 2 * self.channels)))
+            block *= factor
+
+    def clear(self):
+        """Wyczyść wszystkie poziomy."""
+        for index, level in enumerate(self.levels):
+            level.clear()
+            self._pending[index] = self._pending[index][:0]
+
+    def extend(self, rows):
+        """Dołącz nowe surowe próbki (te same, które trafiły do historii)."""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 1 + self.channels)
+        if not len(rows):
+            return
+        values = rows[:, 1:]
+        # Surowa próbka to blok o zerowej długości: min = max = wartość
+        blocks = np.column_stack((rows[:, 0], rows[:, 0], values, values))
+
+        for index, level in enumerate(self.levels):
+            blocks = np.concatenate((self._pending[index], blocks))
+            complete = len(blocks) - len(blocks) % self.factor
+            self._pending[index] = blocks[complete:]
+            if not complete:
+                break
+            blocks = reduce_blocks(blocks[:complete], self.factor, self.channels)
+            level.extend(blocks)
+
+    def query(self, t0, t1, pixels, channel):
+        """Zwróć (x, y) kanału ``channel`` (od 0) dla zakresu czasu [t0, t1].
+
+        Wynik ma co najwyżej około ``2 * pixels`` punktów, chyba że w zakresie jest
+        mniej surowych próbek - wtedy zwracane są pełne dane z historii.
+        """
+        pixels = max(int(pixels), 1)
+        raw = self.history.view()
+        times = raw[0]
+        lo, hi = _window(times, t0, t1)
+        if hi - lo <= 2 * pixels or not self.levels:
+            return times[lo:hi], raw[1 + channel, lo:hi]
+
+        for index, level in enumerate(self.levels):
+            data = level.view()
+            lo, hi = _window(data[0], t0, t1)
+            if hi - lo <= pixels or index == len(self.levels) - 1:
+                break
+
+        # Wybrany poziom + niepełne bloki niższych poziomów, czyli najnowsze dane
+        # jeszcze nieujęte w pełnych blokach (w kolejności chronologicznej)
+        parts = [data[:, lo:hi]] + [pending.T for pending in reversed(self._pending[:index + 1])]
+        blocks = np.concatenate(parts, axis=1)
+        blocks = blocks[:, (blocks[1] >= t0) & (blocks[0] <= t1)]
+
+        return minmax_pairs(blocks, channel, self.channels)
+
+
+def reduce_blocks(blocks, factor, channels):
+    """Scal każde ``factor`` kolejnych bloków (wiersze: początek, koniec, min..., max...) w jeden."""
+    grouped = blocks.reshape(-1, factor, blocks.shape[1])
+    return np.column_stack((
+        grouped[:, 0, 0],
+        grouped[:, -1, 1],
+        # fmin/fmax pomijają NaN - przerwa w danych nie zasłania skrajnych wartości bloku
+        np.fmin.reduce(grouped[:, :, 2:2 + channels], axis=1),
+        np.fmax.reduce(grouped[:, :, 2 + channels:], axis=1),
+    ))
+
+
+def minmax_pairs(blocks, channel, channels):
+    """Zamień bloki (kolumny jak w ``reduce_blocks``, transponowane) na punkty (x, y) do narysowania.
+
+    Każdy blok rysowany jest jako pionowy odcinek min-max w środku swojego przedziału.
+    """
+    x = np.repeat((blocks[0] + blocks[1]) / 2, 2)
+    y = np.empty_like(x)
+    y[0::2] = blocks[2 + channel]
+    y[1::2] = blocks[2 + channels + channel]
+    return x, y
+
+
+def _window(times, t0, t1):
+    """Zakres indeksów [lo, hi) posortowanych czasów leżących w [t0, t1], z jednym punktem zapasu."""
+    lo = max(np.searchsorted(times, t0, side='left') - 1, 0)
+    hi = min(np.searchsorted(times, t1, side='right') + 1, len(times))
+    return lo, hi
@@ -0,0 +1,183 @@
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+logger = logging.getLogger('korad.discovery')
+
+# Plik z zapamiętanym przypisaniem sprzętu USB do odpowiedzi *IDN?
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.korad_ps', 'ports.json')
+
+# Kolejne limity czasu odpowiedzi na *IDN? dla portów bez wpisu w pamięci podręcznej [s]
+PROBE_TIMEOUTS = (0.3, 1.0, 2.0)
+
+
+def hardware_key(port):
+    """Trwały identyfikator adaptera USB (VID:PID:numer seryjny) albo nazwa portu."""
+    if port.vid is not None:
+        return f'{port.vid:04X}:{port.pid:04X}:{port.serial_number or ""}'
+    return port.device
+
+
+class DiscoveryCache:
+    """Pamięć podręczna na dysku: identyfikator sprzętu -> odpowiedź *IDN? i czas odpowiedzi."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, key):
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key, device, idn, response_time):
+        with self._lock:
+            self.entries[key] = {'port': device, 'idn': idn, 'response_time': response_time}
+            self._save()
+
+    def forget(self, key):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error('Błąd zapisu pamięci podręcznej portów: %s', e)
+
+
+class FoundDevice:
+    """Zasilacz znaleziony przez ``discover`` - z otwartym już połączeniem."""
+
+    def __init__(self, port, key, idn, connection):
+        self.port = port
+        self.key = key
+        self.idn = idn
+        self.connection = connection
+
+
+def probe_port(device, timeout, baudrate=9600):
+    """Wyślij *IDN? na port; zwraca (odpowiedź, czas odpowiedzi [s], otwarte połączenie) albo None."""
+    try:
+        # Wyłączny dostęp - port otwarty przez inny wątek akwizycji nie dostanie obcego *IDN?
+        connection = serial.Serial(device, baudrate=baudrate, timeout=timeout, exclusive=True)
+    except (serial.SerialException, OSError):
+        return None
+    try:
+        connection.reset_input_buffer()
+        start = time.perf_counter()
+        connection.write(b'*IDN?\n')
+        response = connection.readline().decode(errors='replace').strip()
+        elapsed = time.perf_counter() - start
+        if 'KORAD' in response:
+            # Przywróć domyślny limit czasu używany przez protokół
+            connection.timeout = 2
+            return response, elapsed, connection
+    except (serial.SerialException, OSError):
+        pass
+    connection.close()
+    return None
+
+
+def _adaptive_timeout(entry):
+    """Limit czasu dla znanego sprzętu: kilkukrotność zmierzonego czasu odpowiedzi."""
+    return min(max(3 * entry.get('response_time', PROBE_TIMEOUTS[0]), 0.1), PROBE_TIMEOUTS[-1])
+
+
+def discover(cache=None, ports=None, first_only=False):
+    """Znajdź zasilacze KORAD, sprawdzając porty równolegle.
+
+    Najpierw sprawdzane są porty, których sprzęt jest w pamięci podręcznej (z limitem
+    dopasowanym do zmierzonego wcześniej czasu odpowiedzi), potem pozostałe - w rundach
+    z coraz dłuższym limitem, przy czym każda runda dotyczy tylko portów, które nie
+    odpowiedziały wcześniej. Zwraca listę FoundDevice (z otwartymi połączeniami).
+    """
+    cache = cache if cache is not None else DiscoveryCache()
+    ports = list(serial.tools.list_ports.comports()) if ports is None else list(ports)
+    keys = {port.device: hardware_key(port) for port in ports}
+    found = []
+
+    def run_round(devices, timeout_for):
+        remaining = []
+        if not devices:
+            return remaining
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            futures = {pool.submit(probe_port, device, timeout_for(device)): device for device in devices}
+            for future in concurrent.futures.as_completed(futures):
+                device = futures[future]
+                result = future.result()
+                if result is None:
+                    remaining.append(device)
+                    continue
+                idn, elapsed, connection = result
+                cache.put(keys[device], device, idn, elapsed)
+                found.append(FoundDevice(device, keys[device], idn, connection))
+        return remaining
+
+    known = [port.device for port in ports if cache.get(keys[port.device])]
+    unknown = [port.device for port in ports if port.device not in known]
+
+    missing = run_round(known, lambda device: _adaptive_timeout(cache.get(keys[device])))
+    if first_only and found:
+        return found
+    unknown += missing
+
+    exhausted = False  # Nieodpowiadające porty przeszły rundę z najdłuższym limitem
+    for timeout in PROBE_TIMEOUTS:
+        unknown = run_round(unknown, lambda device: timeout)
+        exhausted = timeout == PROBE_TIMEOUTS[-1]
+        if not unknown or (first_only and found):
+            break
+
+    # Sprzęt z pamięci podręcznej, który nie odpowiedział jak KORAD nawet z najdłuższym
+    # limitem, jest zapominany (po wcześniejszym przerwaniu szukania nic nie wiadomo)
+    if exhausted:
+        for device in missing:
+            if device in unknown:
+                cache.forget(keys[device])
+    return found
+
+
+class PortWatcher(threading.Thread):
+    """Wątek wykrywający podłączenie i odłączenie portów (hot-plug) przez okresowe sprawdzanie listy.
+
+    Zmiany trafiają do ``changes`` jako krotki (dodane, usunięte) z obiektami portów.
+    """
+
+    def __init__(self, changes, interval=1.0):
+        super().__init__(daemon=True)
+        self.changes = changes  # deque współdzielona z GUI
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._known = {port.device: port for port in serial.tools.list_ports.comports()}
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                current = {port.device: port for port in serial.tools.list_ports.comports()}
+            except OSError as e:
+                logger.warning('Błąd odczytu listy portów: %s', e)
+                continue
+            added = [port for device, port in current.items() if device not in self._known]
+            removed = [port for device, port in self._known.items() if device not in current]
+            self._known = current
+            if added or removed:
+                self.changes.append((added, removed))
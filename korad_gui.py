@@ -0,0 +1,1638 @@
+import collections
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import serial
+import serial.tools.list_ports
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QGridLayout, QPushButton, QLabel, \
+    QComboBox, QWidget, QDial, QLCDNumber, QFrame, QGroupBox, QLineEdit, QRadioButton, QButtonGroup, QCheckBox, \
+    QFileDialog
+from PyQt5.QtCore import QTimer
+import pyqtgraph as pg  # Importujemy PyQtGraph do wykresów
+from korad_acquisition import AcquisitionWorker, drain
+from korad_bridge import BRIDGE_PORT, ScpiBridge
+from korad_buffer import RingBuffer
+from korad_decimation import MinMaxPyramid
+from korad_discovery import DiscoveryCache, PortWatcher, discover, hardware_key
+from korad_manager import DeviceManager
+from korad_metrics import REGISTRY, Histogram, MetricsServer, METRICS_PORT, setup_logging
+from korad_protocol import PRIORITY_CONTROL
+from korad_recorder import MappedLog, Recorder, export_csv
+from korad_sequence import SequenceRunner, load_profile
+from korad_server import API_PORT, ApiServer
+from korad_sim import open_port
+from korad_store import STORE_PATH, SessionStore, StoreWriter
+from korad_triggers import Change, ModeChange, Threshold, Trigger, write_capture
+from korad_view import FRAME_MS, ViewModel
+
+# Najwięcej znaczników zadziałania wyzwalaczy na wykresach
+MAX_TRIGGER_MARKERS = 20
+# Liczba próbek zapisywanych po zadziałaniu wyzwalacza (przy odczycie co 300 ms - 30 s)
+TRIGGER_POST = 100
+
+# Domyślna pojemność historii wykresów (ok. 18 h przy odczycie co 300ms)
+HISTORY_CAPACITY = 200000
+
+# Domyślne okresy [ms]: odczytu z zasilacza, odświeżania wyświetlaczy i przerysowania wykresów
+POLL_INTERVAL_MS = 300
+DISPLAY_INTERVAL_MS = 250
+PLOT_INTERVAL_MS = 500
+# Najkrótszy okres odczytu i odświeżania [ms]
+MIN_INTERVAL_MS = 20
+
+logger = logging.getLogger('korad.gui')
+
+
+def create_view_model(parent):
+    """Model widoku odświeżany jednorazowym timerem o okresie klatki (patrz ``korad_view``)."""
+    timer = QTimer(parent)
+    timer.setSingleShot(True)
+    timer.setInterval(FRAME_MS)
+    view = ViewModel(timer.start)
+    timer.timeout.connect(view.flush)
+    return view
+
+
+def set_dials(dials, values):
+    """Ustaw pokrętła (część całkowita, ułamkowa) - wołane z zablokowanymi sygnałami pokręteł."""
+    for dial, value in zip(dials, values):
+        dial.setValue(value)
+
+
+class KoradController(QMainWindow):
+    def __init__(self, history_capacity=HISTORY_CAPACITY):
+        super().__init__()
+
+        self.acquisition = None  # Wątek akwizycji - właściciel portu szeregowego
+        self.voltage_value = 0.00  # Początkowa wartość napięcia
+        self.current_value = 0.000  # Początkowa wartość prądu
+
+        # Bufor kołowy (czas, napięcie, prąd) z danymi do wykresów
+        self.history = RingBuffer(history_capacity)
+        self.plot_pyramid = MinMaxPyramid(self.history)  # Podsumowania min/max do rysowania
+        self._refreshing_plots = False
+        self._plots_stale = False  # Nowe próbki od ostatniego przerysowania wykresów
+        self.start_time = time.perf_counter_ns()  # Początek osi czasu wykresów
+        self.render_time = Histogram('korad_plot_render_milliseconds', 'Czas decymacji i setData wykresów',
+                                     bounds=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+        REGISTRY.register(self.render_time)
+        self.metrics_server = None
+        self.view = create_view_model(self)  # Zbiorcze odświeżanie wyświetlaczy, najwyżej raz na klatkę
+
+        self.init_ui()
+        self.bind_view()
+
+    def bind_view(self):
+        """Powiąż wyświetlacze, pokrętła i etykiety odświeżane często z modelem widoku."""
+        view = self.view
+        voltage_dials = (self.voltage_dial_volts, self.voltage_dial_fraction)
+        current_dials = (self.current_dial_amperes, self.current_dial_fraction)
+        view.bind('voltage_dials', lambda values: set_dials(voltage_dials, values), *voltage_dials)
+        view.bind('current_dials', lambda values: set_dials(current_dials, values), *current_dials)
+        view.bind('voltage_setpoint', self.voltage_display.display)
+        view.bind('current_setpoint', self.current_display.display)
+        view.bind('voltage_readout', self.voltage_readout_display.display)
+        view.bind('current_readout', self.current_readout_display.display)
+        view.bind('power', self.power_display.display)
+        view.bind('stats', self.stats_label.setText)
+        view.bind('sample_rate', self.sample_rate_label.setText)
+        view.bind('latency', self.latency_label.setText)
+        view.bind('metrics', self.metrics_label.setText)
+
+    def init_ui(self):
+        # Główne okno
+        self.setWindowTitle('KORAD PS Control J.J.')
+
+        # Główna siatka layoutu
+        main_layout = QVBoxLayout()
+
+        # Lista rozwijaną z portami COM
+        self.com_ports = QComboBox()
+        self.refresh_ports()
+
+        # Przycisk do połączenia z wybranym portem COM
+        connect_button = QPushButton('Połącz')
+        connect_button.clicked.connect(self.connect_serial)
+
+        # Przycisk do rozłączenia z portem COM
+        disconnect_button = QPushButton('Rozłącz')
+        disconnect_button.clicked.connect(self.disconnect_serial)
+
+        # Przycisk Autoconnect
+        autoconnect_button = QPushButton('Autoconnect')
+        autoconnect_button.clicked.connect(lambda: self.autoconnect())
+
+        # Przycisk okna wielu zasilaczy
+        multi_button = QPushButton('Wiele zasilaczy')
+        multi_button.clicked.connect(self.show_multi_instrument_window)
+        self.multi_window = None
+
+        # Etykieta statusu połączenia
+        self.status_label = QLabel('Status: Niepołączony')
+
+        # Layout do portów
+        port_layout = QHBoxLayout()
+        port_layout.addWidget(QLabel('Port:'))
+        port_layout.addWidget(self.com_ports)
+        port_layout.addWidget(connect_button)
+        port_layout.addWidget(disconnect_button)
+        port_layout.addWidget(autoconnect_button)
+        port_layout.addWidget(multi_button)
+        main_layout.addLayout(port_layout)
+
+        # Layout do statusu
+        status_layout = QHBoxLayout()  # Użyj HBoxLayout dla mniejszej przestrzeni
+        status_layout.addWidget(self.status_label)
+        main_layout.addLayout(status_layout)
+
+        # Separator poziomy
+        separator = QFrame()
+        separator.setFrameShape(QFrame.HLine)
+        separator.setFrameShadow(QFrame.Sunken)
+        main_layout.addWidget(separator)
+
+        # Layout dla sekcji regulacji napięcia i prądu
+        split_layout = QHBoxLayout()
+
+        # Sekcja napięcia (lewa strona)
+        voltage_layout = QVBoxLayout()
+
+        # Duży wyświetlacz napięcia
+        self.voltage_display = QLCDNumber()
+        self.voltage_display.setDigitCount(5)  # Wyświetlacz do 31.00 V
+        self.voltage_display.setSegmentStyle(QLCDNumber.Flat)
+        self.voltage_display.display(self.voltage_value)  # Początkowa wartość
+        self.voltage_display.setStyleSheet("border: 1px solid black; color: green; background: black;")
+        self.voltage_display.setFixedHeight(100)  # Powiększony wyświetlacz
+        voltage_layout.addWidget(QLabel('Napięcie [V]:'))
+        voltage_layout.addWidget(self.voltage_display)
+
+        # Pole do ręcznego wpisania napięcia
+        voltage_input_layout = QHBoxLayout()
+        self.voltage_input = QLineEdit()
+        self.voltage_input.setPlaceholderText('Napięcie')
+        self.voltage_input.returnPressed.connect(self.set_voltage_from_input)  # Zatwierdzanie ENTEREM
+        voltage_set_button = QPushButton('Ustaw')
+        voltage_set_button.clicked.connect(self.set_voltage_from_input)  # Przycisk Ustaw
+        voltage_input_layout.addWidget(self.voltage_input)
+        voltage_input_layout.addWidget(voltage_set_button)
+        voltage_layout.addLayout(voltage_input_layout)
+
+        # Layout dla regulacji napięcia w ramkach
+        voltage_control_layout = QHBoxLayout()
+
+        # Grupa 1: Pokrętło jednostek napięcia i przyciski +1V, -1V
+        voltage_unit_group = QGroupBox("Jednostki napięcia [V]")
+        voltage_unit_layout = QVBoxLayout()
+
+        # Pokrętło do zmiany wartości napięcia (część całkowita)
+        self.voltage_dial_volts = QDial()
+        self.voltage_dial_volts.setRange(0, 31)  # Zakres 0 do 31 voltów
+        self.voltage_dial_volts.setNotchesVisible(True)
+        self.voltage_dial_volts.valueChanged.connect(self.update_voltage_display)
+        voltage_unit_layout.addWidget(self.voltage_dial_volts)
+
+        # Przyciski +1V i -1V
+        voltage_plus_1v = QPushButton('+ 1 V')
+        voltage_plus_1v.clicked.connect(self.increment_voltage_1v)
+        voltage_unit_layout.addWidget(voltage_plus_1v)
+
+        voltage_minus_1v = QPushButton('- 1 V')
+        voltage_minus_1v.clicked.connect(self.decrement_voltage_1v)
+        voltage_unit_layout.addWidget(voltage_minus_1v)
+
+        voltage_unit_group.setLayout(voltage_unit_layout)
+        voltage_control_layout.addWidget(voltage_unit_group)
+
+        # Grupa 2: Pokrętło setnych części napięcia i przyciski +0.1V, -0.1V, +0.01V, -0.01V
+        voltage_fraction_group = QGroupBox("[mV]")
+        voltage_fraction_layout = QVBoxLayout()
+
+        # Pokrętło do zmiany wartości napięcia (część setna)
+        self.voltage_dial_fraction = QDial()
+        self.voltage_dial_fraction.setRange(0, 99)  # Zakres 0.00 do 0.99V
+        self.voltage_dial_fraction.setNotchesVisible(True)
+        self.voltage_dial_fraction.valueChanged.connect(self.update_voltage_display)
+        voltage_fraction_layout.addWidget(self.voltage_dial_fraction)
+
+        # GridLayout dla przycisków +0.1V, -0.1V, +0.01V, -0.01V
+        voltage_buttons_grid = QGridLayout()
+
+        self.voltage_plus_01v = QPushButton('+ 0.1 V')
+        self.voltage_plus_01v.clicked.connect(self.increment_voltage_01v)
+        voltage_buttons_grid.addWidget(self.voltage_plus_01v, 0, 0)
+
+        self.voltage_minus_01v = QPushButton('- 0.1 V')
+        self.voltage_minus_01v.clicked.connect(self.decrement_voltage_01v)
+        voltage_buttons_grid.addWidget(self.voltage_minus_01v, 1, 0)
+
+        self.voltage_plus_001v = QPushButton('+ 0.01 V')
+        self.voltage_plus_001v.clicked.connect(self.increment_voltage_001v)
+        voltage_buttons_grid.addWidget(self.voltage_plus_001v, 0, 1)
+
+        self.voltage_minus_001v = QPushButton('- 0.01 V')
+        self.voltage_minus_001v.clicked.connect(self.decrement_voltage_001v)
+        voltage_buttons_grid.addWidget(self.voltage_minus_001v, 1, 1)
+
+        voltage_fraction_layout.addLayout(voltage_buttons_grid)
+        voltage_fraction_group.setLayout(voltage_fraction_layout)
+
+        voltage_control_layout.addWidget(voltage_fraction_group)
+        voltage_layout.addLayout(voltage_control_layout)
+
+        # Sekcja prądu (prawa strona)
+        current_layout = QVBoxLayout()
+
+        # Duży wyświetlacz prądu
+        self.current_display = QLCDNumber()
+        self.current_display.setDigitCount(6)  # Wyświetlacz do 5.100 A
+        self.current_display.setSegmentStyle(QLCDNumber.Flat)
+        self.current_display.display(self.current_value)  # Początkowa wartość
+        self.current_display.setStyleSheet("border: 1px solid black; color: green; background: black;")
+        self.current_display.setFixedHeight(100)  # Powiększony wyświetlacz
+        current_layout.addWidget(QLabel('Prąd [A]:'))
+        current_layout.addWidget(self.current_display)
+
+        # Pole do ręcznego wpisania prądu
+        current_input_layout = QHBoxLayout()
+        self.current_input = QLineEdit()
+        self.current_input.setPlaceholderText('Prąd')
+        self.current_input.returnPressed.connect(self.set_current_from_input)  # Zatwierdzanie ENTEREM
+        current_set_button = QPushButton('Ustaw')
+        current_set_button.clicked.connect(self.set_current_from_input)  # Przycisk Ustaw
+        current_input_layout.addWidget(self.current_input)
+        current_input_layout.addWidget(current_set_button)
+        current_layout.addLayout(current_input_layout)
+
+        # Layout dla regulacji prądu w ramkach
+        current_control_layout = QHBoxLayout()
+
+        # Grupa 1: Pokrętło jednostek prądu i przyciski +1A, -1A
+        current_unit_group = QGroupBox("Jednostki prądu [A]")
+        current_unit_layout = QVBoxLayout()
+
+        # Pokrętło do zmiany wartości prądu (część całkowita)
+        self.current_dial_amperes = QDial()
+        self.current_dial_amperes.setRange(0, 5)  # Zakres 0 do 5 amperów
+        self.current_dial_amperes.setNotchesVisible(True)
+        self.current_dial_amperes.valueChanged.connect(self.update_current_display)
+        current_unit_layout.addWidget(self.current_dial_amperes)
+
+        # Przyciski +1A i -1A
+        current_plus_1a = QPushButton('+ 1 A')
+        current_plus_1a.clicked.connect(self.increment_current_1a)
+        current_unit_layout.addWidget(current_plus_1a)
+
+        current_minus_1a = QPushButton('- 1 A')
+        current_minus_1a.clicked.connect(self.decrement_current_1a)
+        current_unit_layout.addWidget(current_minus_1a)
+
+        current_unit_group.setLayout(current_unit_layout)
+        current_control_layout.addWidget(current_unit_group)
+
+        # Grupa 2: Pokrętło dziesiętnych i setnych części prądu oraz przyciski +0.1A, -0.1A, +0.01A, -0.01A, +0.001A, -0.001A
+        self.current_fraction_group = QGroupBox("[mA]")
+        self.current_fraction_layout = QVBoxLayout()
+
+        # Pokrętło do zmiany wartości prądu (część setna)
+        self.current_dial_fraction = QDial()
+        self.current_dial_fraction.setRange(0, 999)  # Zakres 0.000 do 0.999A
+        self.current_dial_fraction.setNotchesVisible(True)
+        self.current_dial_fraction.valueChanged.connect(self.update_current_display)
+        self.current_fraction_layout.addWidget(self.current_dial_fraction)
+
+        # GridLayout dla przycisków +0.1A, -0.1A, +0.01A, -0.01A, +0.001A, -0.001A
+        self.current_buttons_grid = QGridLayout()
+
+        self.current_plus_01a = QPushButton('+ 100 mA')
+        self.current_plus_01a.clicked.connect(self.increment_current_01a)
+        self.current_buttons_grid.addWidget(self.current_plus_01a, 0, 0)
+
+        self.current_minus_01a = QPushButton('- 100 mA')
+        self.current_minus_01a.clicked.connect(self.decrement_current_01a)
+        self.current_buttons_grid.addWidget(self.current_minus_01a, 1, 0)
+
+        self.current_plus_001a = QPushButton('+ 10 mA')
+        self.current_plus_001a.clicked.connect(self.increment_current_001a)
+        self.current_buttons_grid.addWidget(self.current_plus_001a, 0, 1)
+
+        self.current_minus_001a = QPushButton('- 10 mA')
+        self.current_minus_001a.clicked.connect(self.decrement_current_001a)
+        self.current_buttons_grid.addWidget(self.current_minus_001a, 1, 1)
+
+        self.current_plus_0001a = QPushButton('+ 1 mA')
+        self.current_plus_0001a.clicked.connect(self.increment_current_0001a)
+        self.current_buttons_grid.addWidget(self.current_plus_0001a, 0, 2)
+
+        self.current_minus_0001a = QPushButton('- 1 mA')
+        self.current_minus_0001a.clicked.connect(self.decrement_current_0001a)
+        self.current_buttons_grid.addWidget(self.current_minus_0001a, 1, 2)
+
+        self.current_fraction_layout.addLayout(self.current_buttons_grid)
+
+        self.current_fraction_group.setLayout(self.current_fraction_layout)
+
+        current_control_layout.addWidget(self.current_fraction_group)
+        current_layout.addLayout(current_control_layout)
+
+        # Separator pionowy pomiędzy napięciem i prądem
+        vertical_separator = QFrame()
+        vertical_separator.setFrameShape(QFrame.VLine)
+        vertical_separator.setFrameShadow(QFrame.Sunken)
+
+        # Dodanie layoutów sekcji napięcia i prądu do głównego layoutu
+        split_layout.addLayout(voltage_layout)
+        split_layout.addWidget(vertical_separator)
+        split_layout.addLayout(current_layout)
+
+        # Dodanie podzielonego layoutu do głównego layoutu
+        main_layout.addLayout(split_layout)
+
+        # Separator poziomy przed RadioButtons i przyciskami
+        separator2 = QFrame()
+        separator2.setFrameShape(QFrame.HLine)
+        separator2.setFrameShadow(QFrame.Sunken)
+        main_layout.addWidget(separator2)
+
+        # Layout dla RadioButtons i przycisków Załącz/Wyłącz z pionowym separatorem
+        controls_layout = QHBoxLayout()
+
+        # Grupa: Sterowanie - załączanie i wyłączanie wyjścia
+        control_group = QGroupBox("Sterowanie")
+        control_group_layout = QVBoxLayout()
+        enable_output_button = QPushButton("Załącz")
+        enable_output_button.clicked.connect(self.enable_output)
+        disable_output_button = QPushButton("Wyłącz")
+        disable_output_button.clicked.connect(self.disable_output)
+        control_group_layout.addWidget(enable_output_button)
+        control_group_layout.addWidget(disable_output_button)
+        control_group.setLayout(control_group_layout)
+
+        # Grupa: Jednostki - RadioButtons
+        unit_group = QGroupBox("Jednostki")
+        unit_group_layout = QVBoxLayout()
+        self.radio_mA = QRadioButton("mA")
+        self.radio_001A = QRadioButton("0.001A")
+        self.radio_mA.setChecked(True)  # Domyślnie zaznaczone mA
+
+        # Dodaj RadioButtons do grupy, aby były wzajemnie wykluczające się
+        radio_group = QButtonGroup(self)
+        radio_group.addButton(self.radio_mA)
+        radio_group.addButton(self.radio_001A)
+
+        self.radio_mA.toggled.connect(self.update_current_button_labels)
+
+        unit_group_layout.addWidget(self.radio_mA)
+        unit_group_layout.addWidget(self.radio_001A)
+        unit_group.setLayout(unit_group_layout)
+
+        # Grupa: Akwizycja - tryb szybki i osiągnięta częstotliwość próbkowania
+        acquisition_group = QGroupBox("Akwizycja")
+        acquisition_group_layout = QVBoxLayout()
+        self.fast_capture_checkbox = QCheckBox("Szybka akwizycja")
+        self.fast_capture_checkbox.toggled.connect(self.set_fast_capture)
+        self.sample_rate_label = QLabel('Próbki/s: -')
+        self.latency_label = QLabel('Opóźnienie p95: -')
+        acquisition_group_layout.addWidget(self.fast_capture_checkbox)
+        acquisition_group_layout.addWidget(self.sample_rate_label)
+        acquisition_group_layout.addWidget(self.latency_label)
+
+        # Niezależne okresy odczytu, wyświetlaczy i wykresów; odczyt adaptacyjny zwalnia w spoczynku
+        rates_layout = QGridLayout()
+        self.poll_interval_input = QLineEdit(str(POLL_INTERVAL_MS))
+        self.display_interval_input = QLineEdit(str(DISPLAY_INTERVAL_MS))
+        self.plot_interval_input = QLineEdit(str(PLOT_INTERVAL_MS))
+        self.adaptive_checkbox = QCheckBox('Adaptacyjny odczyt')
+        self.adaptive_slow_input = QLineEdit('2')
+        for field in (self.poll_interval_input, self.display_interval_input, self.plot_interval_input,
+                      self.adaptive_slow_input):
+            field.editingFinished.connect(self.apply_rates)
+        self.adaptive_checkbox.toggled.connect(self.apply_rates)
+        rates_layout.addWidget(QLabel('Odczyt [ms]'), 0, 0)
+        rates_layout.addWidget(self.poll_interval_input, 0, 1)
+        rates_layout.addWidget(QLabel('Wyświetlacze [ms]'), 1, 0)
+        rates_layout.addWidget(self.display_interval_input, 1, 1)
+        rates_layout.addWidget(QLabel('Wykresy [ms]'), 2, 0)
+        rates_layout.addWidget(self.plot_interval_input, 2, 1)
+        rates_layout.addWidget(self.adaptive_checkbox, 3, 0, 1, 2)
+        rates_layout.addWidget(QLabel('Spoczynek [s]'), 4, 0)
+        rates_layout.addWidget(self.adaptive_slow_input, 4, 1)
+        acquisition_group_layout.addLayout(rates_layout)
+
+        # Zapis odczytów na dysk i eksport do CSV
+        self.recorder = None
+        self.record_button = QPushButton('Nagrywaj')
+        self.record_button.setCheckable(True)
+        self.record_button.toggled.connect(self.toggle_recording)
+        export_button = QPushButton('Eksport CSV')
+        export_button.clicked.connect(self.export_recording_csv)
+        view_log_button = QPushButton('Otwórz zapis')
+        view_log_button.clicked.connect(self.open_log_viewer)
+        self.log_viewers = []
+        acquisition_group_layout.addWidget(self.record_button)
+        acquisition_group_layout.addWidget(export_button)
+        acquisition_group_layout.addWidget(view_log_button)
+
+        # Zapis odczytów do bazy sesji (zapytania: korad-ps query, /api/sessions)
+        self.session_store = None
+        self.store_writer = None
+        self.store_checkbox = QCheckBox("Zapisuj do bazy sesji")
+        self.store_checkbox.toggled.connect(self.toggle_session_store)
+        acquisition_group_layout.addWidget(self.store_checkbox)
+
+        # Lokalne API: sterowanie przez REST i strumień próbek przez WebSocket
+        self.api_server = None
+        self.api_server_checkbox = QCheckBox(f"Serwer API :{API_PORT}")
+        self.api_server_checkbox.toggled.connect(self.toggle_api_server)
+        acquisition_group_layout.addWidget(self.api_server_checkbox)
+        self.scpi_bridge = None
+        self.scpi_bridge_checkbox = QCheckBox(f"Most SCPI :{BRIDGE_PORT}")
+        self.scpi_bridge_checkbox.toggled.connect(self.toggle_scpi_bridge)
+        acquisition_group_layout.addWidget(self.scpi_bridge_checkbox)
+        acquisition_group.setLayout(acquisition_group_layout)
+
+        # Grupa: Metryki - panel wydajności i eksport w formacie Prometheusa
+        metrics_group = QGroupBox("Metryki")
+        metrics_group_layout = QVBoxLayout()
+        metrics_checkbox = QCheckBox("Pokaż panel")
+        self.metrics_label = QLabel()
+        self.metrics_label.setVisible(False)
+        metrics_checkbox.toggled.connect(self.metrics_label.setVisible)
+        metrics_checkbox.toggled.connect(self.update_metrics_panel)
+        self.metrics_server_checkbox = QCheckBox(f"Serwer :{METRICS_PORT}")
+        self.metrics_server_checkbox.toggled.connect(self.toggle_metrics_server)
+        save_metrics_button = QPushButton('Zapisz metryki')
+        save_metrics_button.clicked.connect(self.save_metrics)
+        metrics_group_layout.addWidget(metrics_checkbox)
+        metrics_group_layout.addWidget(self.metrics_label)
+        metrics_group_layout.addWidget(self.metrics_server_checkbox)
+        metrics_group_layout.addWidget(save_metrics_button)
+        metrics_group.setLayout(metrics_group_layout)
+
+        # Grupa: Sekwencja - profil ustawień wykonywany w osobnym wątku
+        sequence_group = QGroupBox("Sekwencja")
+        sequence_group_layout = QVBoxLayout()
+        self.sequence = None
+        sequence_start_button = QPushButton('Uruchom profil')
+        sequence_start_button.clicked.connect(self.start_sequence)
+        sequence_stop_button = QPushButton('Zatrzymaj')
+        sequence_stop_button.clicked.connect(self.stop_sequence)
+        self.sequence_label = QLabel('Brak sekwencji')
+        sequence_group_layout.addWidget(sequence_start_button)
+        sequence_group_layout.addWidget(sequence_stop_button)
+        sequence_group_layout.addWidget(self.sequence_label)
+        sequence_group.setLayout(sequence_group_layout)
+
+        # Grupa: Statystyki - moc, energia i ładunek liczone przy każdej próbce w wątku akwizycji
+        stats_group = QGroupBox("Statystyki")
+        stats_group_layout = QVBoxLayout()
+        self.power_display = QLCDNumber()
+        self.power_display.setDigitCount(6)
+        self.power_display.setSegmentStyle(QLCDNumber.Flat)
+        self.power_display.setStyleSheet("border: 1px solid black; color: #FFBF00; background: black;")
+        self.power_display.setFixedHeight(40)
+        self.stats_label = QLabel('-')
+        reset_stats_button = QPushButton('Zeruj')
+        reset_stats_button.clicked.connect(self.reset_statistics)
+        stats_group_layout.addWidget(QLabel('P [W]:'))
+        stats_group_layout.addWidget(self.power_display)
+        stats_group_layout.addWidget(self.stats_label)
+        stats_group_layout.addWidget(reset_stats_button)
+        stats_group.setLayout(stats_group_layout)
+
+        # Grupa: Wyzwalacze - sprawdzane w wątku akwizycji, z opcjonalnym wyłączeniem wyjścia
+        trigger_group = QGroupBox("Wyzwalacze")
+        trigger_group_layout = QGridLayout()
+        self.trigger_current_input = QLineEdit()
+        self.trigger_current_input.setPlaceholderText('A')
+        self.trigger_drop_input = QLineEdit()
+        self.trigger_drop_input.setPlaceholderText('V')
+        self.trigger_window_input = QLineEdit('50')
+        self.trigger_mode_checkbox = QCheckBox('Zmiana CV/CC')
+        self.trigger_out_checkbox = QCheckBox('Wyłącz wyjście')
+        self.trigger_out_checkbox.setChecked(True)
+        self.trigger_arm_button = QPushButton('Uzbrój')
+        self.trigger_arm_button.setCheckable(True)
+        self.trigger_arm_button.toggled.connect(self.apply_triggers)
+        save_capture_button = QPushButton('Zapisz przebieg')
+        save_capture_button.clicked.connect(self.save_trigger_capture)
+        self.trigger_label = QLabel('Brak zdarzeń')
+        self.triggers = []  # Skonfigurowane wyzwalacze - przenoszone do nowego połączenia
+        self.trigger_events = []
+        self.trigger_markers = []
+        trigger_group_layout.addWidget(QLabel('I >'), 0, 0)
+        trigger_group_layout.addWidget(self.trigger_current_input, 0, 1)
+        trigger_group_layout.addWidget(QLabel('Spadek U'), 1, 0)
+        trigger_group_layout.addWidget(self.trigger_drop_input, 1, 1)
+        trigger_group_layout.addWidget(QLabel('w [ms]'), 2, 0)
+        trigger_group_layout.addWidget(self.trigger_window_input, 2, 1)
+        trigger_group_layout.addWidget(self.trigger_mode_checkbox, 3, 0, 1, 2)
+        trigger_group_layout.addWidget(self.trigger_out_checkbox, 4, 0, 1, 2)
+        trigger_group_layout.addWidget(self.trigger_arm_button, 5, 0, 1, 2)
+        trigger_group_layout.addWidget(save_capture_button, 6, 0, 1, 2)
+        trigger_group_layout.addWidget(self.trigger_label, 7, 0, 1, 2)
+        trigger_group.setLayout(trigger_group_layout)
+
+        # Dodanie layoutów do controls_layout z separatorem pionowym
+        controls_layout.addWidget(control_group)
+        controls_layout.addWidget(unit_group)
+        controls_layout.addWidget(acquisition_group)
+        controls_layout.addWidget(metrics_group)
+        controls_layout.addWidget(sequence_group)
+        controls_layout.addWidget(stats_group)
+        controls_layout.addWidget(trigger_group)
+
+        main_layout.addLayout(controls_layout)
+
+        # Separator poziomy przed sekcją odczytu danych
+        separator3 = QFrame()
+        separator3.setFrameShape(QFrame.HLine)
+        separator3.setFrameShadow(QFrame.Sunken)
+        main_layout.addWidget(separator3)
+
+        # Nowa sekcja dla odczytanych wartości napięcia i prądu
+        readout_layout = QHBoxLayout()
+
+        # Wyświetlacz napięcia odczytanego
+        voltage_readout_layout = QVBoxLayout()
+        self.voltage_readout_display = QLCDNumber()
+        self.voltage_readout_display.setDigitCount(5)
+        self.voltage_readout_display.setSegmentStyle(QLCDNumber.Flat)
+        self.voltage_readout_display.setStyleSheet("border: 1px solid black; color: #FFBF00; background: black;")
+        self.voltage_readout_display.setFixedHeight(100)
+        voltage_readout_layout.addWidget(QLabel('Napięcie odczytane [V]:'))
+        voltage_readout_layout.addWidget(self.voltage_readout_display)
+
+        # Wyświetlacz prądu odczytanego
+        current_readout_layout = QVBoxLayout()
+        self.current_readout_display = QLCDNumber()
+        self.current_readout_display.setDigitCount(6)
+        self.current_readout_display.setSegmentStyle(QLCDNumber.Flat)
+        self.current_readout_display.setStyleSheet("border: 1px solid black; color: #FFBF00; background: black;")
+        self.current_readout_display.setFixedHeight(100)
+        current_readout_layout.addWidget(QLabel('Prąd odczytany [A]:'))
+        current_readout_layout.addWidget(self.current_readout_display)
+
+        # Dodanie wyświetlaczy do layoutu
+        readout_layout.addLayout(voltage_readout_layout)
+        readout_layout.addLayout(current_readout_layout)
+
+        # Dodanie nowej sekcji do głównego layoutu
+        main_layout.addLayout(readout_layout)
+
+        # **Dodanie wykresów poniżej wyświetlaczy**
+
+        # Tworzenie wykresów
+        plots_layout = QHBoxLayout()
+
+        # Wykres napięcia
+        self.voltage_plot_widget = pg.PlotWidget(title='Wykres Napięcia')
+        self.voltage_plot_widget.setLabel('left', 'Napięcie [V]')
+        self.voltage_plot_widget.setLabel('bottom', 'Czas [s]')
+        self.voltage_curve = self.voltage_plot_widget.plot(pen='g')  # Zielony wykres
+        self.voltage_plot_widget.sigXRangeChanged.connect(self.refresh_plots)
+        plots_layout.addWidget(self.voltage_plot_widget)
+
+        # Wykres prądu
+        self.current_plot_widget = pg.PlotWidget(title='Wykres Prądu')
+        self.current_plot_widget.setLabel('left', 'Prąd [A]')
+        self.current_plot_widget.setLabel('bottom', 'Czas [s]')
+        self.current_curve = self.current_plot_widget.plot(pen='r')  # Czerwony wykres
+        self.current_plot_widget.sigXRangeChanged.connect(self.refresh_plots)
+        plots_layout.addWidget(self.current_plot_widget)
+
+        # Dodanie wykresów do głównego layoutu
+        main_layout.addLayout(plots_layout)
+
+        # Osobne timery wyświetlaczy i wykresów (odczyt odbywa się w wątku akwizycji we własnym rytmie)
+        self.readout_timer = QTimer(self)
+        self.readout_timer.timeout.connect(self.update_readouts)
+        self.readout_timer.start(DISPLAY_INTERVAL_MS)
+        self.plot_timer = QTimer(self)
+        self.plot_timer.timeout.connect(self.refresh_stale_plots)
+        self.plot_timer.start(PLOT_INTERVAL_MS)
+
+        # Wyniki wyszukiwania zasilacza i zmiany listy portów (hot-plug) z wątków w tle
+        self.discovery_cache = DiscoveryCache()
+        self.discovery_results = collections.deque()
+        self.port_changes = collections.deque()
+        self._discovery_thread = None
+        self.port_watcher = PortWatcher(self.port_changes)
+        self.port_watcher.start()
+        self.ports_timer = QTimer(self)
+        self.ports_timer.timeout.connect(self.process_port_events)
+        self.ports_timer.start(500)
+
+        # Ustawienie głównego widgetu
+        container = QWidget()
+        container.setLayout(main_layout)
+        self.setCentralWidget(container)
+
+    # Reszta metod pozostaje bez zmian...
+
+    def refresh_ports(self):
+        """Odśwież listę dostępnych portów COM."""
+        ports = serial.tools.list_ports.comports()
+        self.com_ports.clear()
+        for port in ports:
+            self.com_ports.addItem(port.device)
+        if os.environ.get('KORAD_PS_SIMULATOR'):
+            self.com_ports.addItem(os.environ['KORAD_PS_SIMULATOR'])  # Np. sim://?load=10
+
+    def connect_serial(self):
+        """Połącz się z wybranym portem COM i pobierz aktualne ustawienia zasilacza."""
+        port = self.com_ports.currentText()
+        try:
+            self.start_acquisition(open_port(port, baudrate=9600, timeout=2))
+            self.status_label.setText(f'Status: Połączono z {port}')
+            logger.info('Połączono z %s', port)
+
+            # Pobierz ustawienia zasilacza po połączeniu
+            self.fetch_voltage_current_settings()
+        except serial.SerialException as e:
+            self.status_label.setText(f'Status: Błąd połączenia z {port}')
+            logger.error('Błąd połączenia z %s: %s', port, e)
+
+    def disconnect_serial(self):
+        """Rozłącz się z zasilaczem."""
+        if self.acquisition:
+            self.stop_acquisition()
+            self.status_label.setText('Status: Rozłączono')
+            logger.info('Rozłączono od zasilacza.')
+
+    def start_acquisition(self, connection):
+        """Przekaż otwarty port do nowego wątku akwizycji."""
+        self.stop_acquisition()
+        self.acquisition = AcquisitionWorker(connection)
+        self.acquisition.recorder = self.recorder
+        self.apply_rates()
+        self.acquisition.triggers.set_triggers(self.triggers)
+        self.acquisition.start()
+        for server in (self.api_server, self.scpi_bridge):
+            if server:
+                server.worker = self.acquisition
+        if self.store_checkbox.isChecked():
+            self.start_store_session()
+        if self.fast_capture_checkbox.isChecked():
+            self.acquisition.set_fast_capture(True)
+
+    def stop_acquisition(self):
+        """Zatrzymaj wątek akwizycji (zamyka port)."""
+        self.stop_sequence()
+        self.stop_store_session()
+        for server in (self.api_server, self.scpi_bridge):
+            if server:
+                server.worker = None
+        if self.acquisition:
+            self.acquisition.stop()
+            self.acquisition = None
+
+    def send_command(self, command, priority=None):
+        """Zakolejkuj komendę do zasilacza w protokole wątku akwizycji."""
+        if self.acquisition:
+            self.acquisition.send(command, priority)
+            return True
+        return False
+
+    def closeEvent(self, event):
+        """Zatrzymaj akwizycję przy zamykaniu okna."""
+        self.port_watcher.stop()
+        self.stop_sequence()
+        self.stop_acquisition()
+        self.stop_recording()
+        self.toggle_metrics_server(False)
+        self.toggle_api_server(False)
+        self.toggle_scpi_bridge(False)
+        if self.session_store:
+            self.session_store.close()
+        REGISTRY.unregister(self.render_time)
+        if self.multi_window:
+            self.multi_window.close()
+        super().closeEvent(event)
+
+    def show_multi_instrument_window(self):
+        """Pokaż okno jednoczesnej obsługi wielu zasilaczy."""
+        if self.multi_window is None:
+            self.multi_window = MultiInstrumentWindow()
+        self.multi_window.show()
+        self.multi_window.raise_()
+
+    def autoconnect(self, ports=None):
+        """Autoconnect - równoległe wyszukiwanie zasilacza Korad w tle (wynik w process_port_events)."""
+        if self._discovery_thread and self._discovery_thread.is_alive():
+            return
+        self.status_label.setText('Status: Wyszukiwanie zasilacza...')
+
+        def run():
+            try:
+                self.discovery_results.append(discover(self.discovery_cache, ports, first_only=True))
+            except Exception as e:
+                logger.error('Błąd autoconnect: %s', e)
+                self.discovery_results.append([])
+
+        self._discovery_thread = threading.Thread(target=run, daemon=True)
+        self._discovery_thread.start()
+
+    def process_port_events(self):
+        """Obsłuż wyniki autoconnect i zmiany listy portów zgłoszone przez wątki w tle."""
+        for found in drain(self.discovery_results):
+            if not found:
+                self.status_label.setText('Nie znaleziono zasilacza KORAD')
+                continue
+            device, others = found[0], found[1:]
+            for other in others:
+                other.connection.close()
+            self.start_acquisition(device.connection)
+            self.status_label.setText(f'Połączono z portem {device.port}, urządzenie: {device.idn}')
+            logger.info('Połączono z portem %s, urządzenie: %s', device.port, device.idn)
+
+            # Ustaw port COM w rozwijanej liście jako wybrany
+            self.set_selected_com_port(device.port)
+
+            # Pobierz ustawienia zasilacza po połączeniu
+            self.fetch_voltage_current_settings()
+
+        for added, removed in drain(self.port_changes):
+            selected = self.com_ports.currentText()
+            self.refresh_ports()
+            self.set_selected_com_port(selected)
+            # Znany zasilacz podłączony ponownie - połącz bez ręcznego wyszukiwania
+            known = [port for port in added if self.discovery_cache.get(hardware_key(port))]
+            if known and not self.acquisition:
+                self.autoconnect(known)
+
+    def set_selected_com_port(self, port_name):
+        """Ustaw wskazany port COM jako wybrany w rozwijanej liście."""
+        index = self.com_ports.findText(port_name)
+        if index >= 0:
+            self.com_ports.setCurrentIndex(index)
+
+    def toggle_recording(self, enabled):
+        """Rozpocznij lub zakończ zapis odczytów do pliku .kps."""
+        if not enabled:
+            self.stop_recording()
+            return
+        default_name = time.strftime('korad_%Y%m%d_%H%M%S.kps')
+        path, _ = QFileDialog.getSaveFileName(self, 'Zapis odczytów', default_name, 'Zapis KORAD PS (*.kps)')
+        if not path:
+            self.record_button.setChecked(False)
+            return
+        try:
+            self.recorder = Recorder(path, {'port': self.com_ports.currentText()})
+        except OSError as e:
+            logger.error('Błąd otwarcia pliku zapisu %s: %s', path, e)
+            self.record_button.setChecked(False)
+            return
+        if self.acquisition:
+            self.acquisition.recorder = self.recorder
+        self.record_button.setText('Zatrzymaj zapis')
+        logger.info('Zapis odczytów do %s', path)
+
+    def stop_recording(self):
+        """Zakończ zapis odczytów (dopisuje stopkę i zamyka plik)."""
+        if self.acquisition:
+            self.acquisition.recorder = None
+        if self.recorder:
+            self.recorder.close()
+            logger.info('Zapisano %d próbek do %s', self.recorder.samples_written, self.recorder.path)
+            if self.recorder.error is not None:
+                logger.error('Zapis do %s przerwany: %s (odrzucono %d próbek)', self.recorder.path,
+                             self.recorder.error, self.recorder.samples_dropped)
+            self.recorder = None
+        self.record_button.setText('Nagrywaj')
+
+    def export_recording_csv(self):
+        """Wyeksportuj wybrany plik .kps do CSV."""
+        log_path, _ = QFileDialog.getOpenFileName(self, 'Eksport do CSV', '', 'Zapis KORAD PS (*.kps)')
+        if not log_path:
+            return
+        csv_path, _ = QFileDialog.getSaveFileName(self, 'Zapisz CSV', log_path.rsplit('.', 1)[0] + '.csv',
+                                                  'CSV (*.csv)')
+        if not csv_path:
+            return
+        try:
+            count = export_csv(log_path, csv_path)
+            logger.info('Wyeksportowano %d próbek do %s', count, csv_path)
+        except (OSError, ValueError) as e:
+            logger.error('Błąd eksportu do CSV: %s', e)
+
+    def open_log_viewer(self):
+        """Otwórz zapis .kps w oknie przeglądarki (mmap, bez wczytywania do pamięci)."""
+        path, _ = QFileDialog.getOpenFileName(self, 'Otwórz zapis', '', 'Zapis KORAD PS (*.kps)')
+        if not path:
+            return
+        try:
+            viewer = LogViewerWindow(MappedLog(path))
+        except (OSError, ValueError) as e:
+            logger.error('Błąd otwarcia zapisu %s: %s', path, e)
+            return
+        self.log_viewers = [window for window in self.log_viewers if window.isVisible()] + [viewer]
+        viewer.show()
+
+    def apply_rates(self):
+        """Zastosuj okresy odczytu, wyświetlaczy i wykresów oraz tryb adaptacyjny z pól grupy Akwizycja."""
+        fields = (self.poll_interval_input, self.display_interval_input, self.plot_interval_input)
+        try:
+            poll, display, plot = (max(int(float(field.text().replace(',', '.'))), MIN_INTERVAL_MS)
+                                   for field in fields)
+            slow = max(float(self.adaptive_slow_input.text().replace(',', '.')), poll / 1000)
+        except ValueError:
+            logger.error('Błędny okres odczytu lub odświeżania')
+            poll = int(self.acquisition.interval * 1000) if self.acquisition else POLL_INTERVAL_MS
+            display, plot = self.readout_timer.interval(), self.plot_timer.interval()
+            slow = 2.0
+        for field, value in zip(fields, (poll, display, plot)):
+            field.setText(str(value))
+        self.adaptive_slow_input.setText(f'{slow:g}')
+        if self.readout_timer.interval() != display:
+            self.readout_timer.setInterval(display)
+        if self.plot_timer.interval() != plot:
+            self.plot_timer.setInterval(plot)
+        if self.acquisition:
+            self.acquisition.interval = poll / 1000
+            adaptive = self.acquisition.adaptive
+            if not self.adaptive_checkbox.isChecked():
+                if adaptive is not None:
+                    self.acquisition.set_adaptive(False)
+            elif adaptive is None or adaptive.slow != slow:
+                self.acquisition.set_adaptive(True, slow)
+            self.acquisition.protocol.wake()
+
+    def set_fast_capture(self, enabled):
+        """Przełącz tryb szybkiej akwizycji (zapytania potokowe, maksymalna częstotliwość)."""
+        if self.acquisition:
+            self.acquisition.set_fast_capture(enabled)
+
+    def fetch_voltage_current_settings(self):
+        """Pokaż nastawy z modelu stanu; niepotwierdzone są pobierane z zasilacza (wynik wraca jako zdarzenie)."""
+        if not self.acquisition:
+            return
+        state = self.acquisition.state.snapshot()
+        if state['voltage']['confirmed'] and state['current']['confirmed']:
+            self.set_voltage(state['voltage']['value'])
+            self.set_current(state['current']['value'])
+        else:
+            self.acquisition.request_settings()
+
+    def toggle_metrics_server(self, enabled):
+        """Uruchom lub zatrzymaj lokalny serwer metryk (http://127.0.0.1:9108/metrics)."""
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if not enabled:
+            return
+        try:
+            self.metrics_server = MetricsServer(REGISTRY)
+        except OSError as e:
+            logger.error('Nie można uruchomić serwera metryk: %s', e)
+            self.metrics_server_checkbox.setChecked(False)
+            return
+        self.metrics_server.start()
+        logger.info('Metryki dostępne pod http://127.0.0.1:%d/metrics', self.metrics_server.port)
+
+    def open_session_store(self):
+        """Baza sesji (otwierana przy pierwszym użyciu); None - nie można jej otworzyć."""
+        if self.session_store is None:
+            try:
+                self.session_store = SessionStore(STORE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                logger.error('Nie można otworzyć bazy sesji %s: %s', STORE_PATH, e)
+        return self.session_store
+
+    def toggle_session_store(self, enabled):
+        """Włącz lub wyłącz zapis odczytów bieżącego połączenia do bazy sesji."""
+        if not enabled:
+            self.stop_store_session()
+        elif self.open_session_store() is None:
+            self.store_checkbox.setChecked(False)
+        elif self.acquisition:
+            self.start_store_session()
+
+    def start_store_session(self):
+        """Nowa sesja w bazie dla bieżącego wątku akwizycji."""
+        self.stop_store_session()
+        store = self.open_session_store()
+        if store is None or self.acquisition is None:
+            return
+        port = self.acquisition.name
+        try:
+            self.store_writer = StoreWriter(store, port, {'port': port, 'interval': self.acquisition.interval})
+        except sqlite3.Error as e:
+            logger.error('Nie można rozpocząć sesji w bazie: %s', e)
+            return
+        self.acquisition.subscribe(self.store_writer)
+        logger.info('Zapis odczytów do bazy sesji (sesja %d)', self.store_writer.session)
+
+    def stop_store_session(self):
+        """Zakończ zapis bieżącej sesji (zaległe próbki trafiają do bazy)."""
+        if self.store_writer is None:
+            return
+        if self.acquisition:
+            self.acquisition.unsubscribe(self.store_writer)
+        self.store_writer.close()
+        logger.info('Zapisano %d próbek w sesji %d', self.store_writer.samples_written, self.store_writer.session)
+        if self.store_writer.error is not None:
+            logger.error('Zapis sesji %d przerwany: %s (odrzucono %d próbek)', self.store_writer.session,
+                         self.store_writer.error, self.store_writer.samples_dropped)
+        self.store_writer = None
+
+    def toggle_api_server(self, enabled):
+        """Uruchom lub zatrzymaj lokalne API (REST i WebSocket) dla bieżącego połączenia."""
+        if self.api_server:
+            self.api_server.stop()
+            self.api_server = None
+        if not enabled:
+            return
+        try:
+            self.api_server = ApiServer(self.acquisition, store=self.open_session_store())
+        except OSError as e:
+            logger.error('Nie można uruchomić serwera API: %s', e)
+            self.api_server_checkbox.setChecked(False)
+            return
+        self.api_server.start()
+
+    def toggle_scpi_bridge(self, enabled):
+        """Uruchom lub zatrzymaj most SCPI przez TCP (skrypty współdzielą port zasilacza)."""
+        if self.scpi_bridge:
+            self.scpi_bridge.stop()
+            self.scpi_bridge = None
+        if not enabled:
+            return
+        try:
+            self.scpi_bridge = ScpiBridge(self.acquisition)
+        except OSError as e:
+            logger.error('Nie można uruchomić mostu SCPI: %s', e)
+            self.scpi_bridge_checkbox.setChecked(False)
+            return
+        self.scpi_bridge.start()
+
+    def save_metrics(self):
+        """Zapisz bieżące metryki do pliku tekstowego (format Prometheusa)."""
+        path, _ = QFileDialog.getSaveFileName(self, 'Zapisz metryki', time.strftime('korad_%Y%m%d_%H%M%S.prom'),
+                                              'Metryki (*.prom *.txt)')
+        if not path:
+            return
+        try:
+            REGISTRY.write(path)
+        except OSError as e:
+            logger.error('Błąd zapisu metryk do %s: %s', path, e)
+
+    def start_sequence(self):
+        """Wczytaj profil CSV/JSON i wykonaj go w wątku sekwencji."""
+        if not self.acquisition:
+            self.sequence_label.setText('Brak połączenia')
+            return
+        path, _ = QFileDialog.getOpenFileName(self, 'Profil sekwencji', '', 'Profil (*.csv *.json)')
+        if not path:
+            return
+        try:
+            steps = load_profile(path)
+        except (OSError, ValueError) as e:
+            logger.error('Błąd wczytania profilu %s: %s', path, e)
+            self.sequence_label.setText('Błędny profil')
+            return
+        self.stop_sequence()
+        self.sequence = SequenceRunner(self.acquisition.send, steps)
+        self.sequence.start()
+        logger.info('Uruchomiono sekwencję %s (%d kroków)', path, len(steps))
+
+    def stop_sequence(self):
+        """Przerwij wykonywaną sekwencję."""
+        if self.sequence:
+            self.sequence.stop()
+            self.update_sequence_label()
+            self.sequence = None
+
+    def update_sequence_label(self):
+        """Postęp sekwencji i opóźnienie zapisu kroków do portu."""
+        if not self.sequence:
+            return
+        stats = self.sequence.stats()
+        text = f'Krok {self.sequence.position}/{len(self.sequence.steps) * max(self.sequence.repeat, 1)}'
+        if 'write_p95_ms' in stats:
+            text += f'\nOpóźnienie p95: ≤{stats["write_p95_ms"]:g} ms'
+        if self.sequence.finished:
+            text += '\nZakończono' if not self.sequence.error else f'\nBłąd: {self.sequence.error}'
+        self.sequence_label.setText(text)
+
+    def reset_statistics(self):
+        """Wyzeruj energię, ładunek i statystyki bieżącego połączenia."""
+        if self.acquisition:
+            self.acquisition.stats.reset()
+        self.update_statistics()
+
+    def update_statistics(self):
+        """Pokaż moc, energię, ładunek oraz min/średnią/max/RMS (całość i ostatnia minuta)."""
+        if not self.acquisition:
+            return
+        stats = self.acquisition.stats.snapshot()
+        if not stats['total']['voltage']['count']:
+            self.view.set('power', '-')
+            self.view.set('stats', '-')
+            return
+        self.view.set('power', f"{stats['power']:.3f}")
+        voltage, current = stats['total']['voltage'], stats['total']['current']
+        window = stats['window']
+        self.view.set('stats',
+            f"E: {stats['energy_wh']:.4f} Wh  Q: {stats['charge_ah']:.4f} Ah\n"
+            f"U min/śr/max: {voltage['min']:.2f}/{voltage['mean']:.2f}/{voltage['max']:.2f} V\n"
+            f"I min/śr/max: {current['min']:.3f}/{current['mean']:.3f}/{current['max']:.3f} A\n"
+            f"U/I RMS: {voltage['rms']:.2f} V / {current['rms']:.3f} A\n"
+            f"Ostatnia minuta: U śr. {window['voltage']['mean']:.2f} V, I śr. {window['current']['mean']:.3f} A, "
+            f"P maks. {window['power']['max']:.2f} W\n"
+            f"Czas: {stats['duration_s']:.0f} s")
+
+    def apply_triggers(self, armed):
+        """Zbuduj wyzwalacze z pól grupy i przekaż je do wątku akwizycji (``armed=False`` - rozbrój)."""
+        triggers = []
+        if armed:
+            action = 'OUT0' if self.trigger_out_checkbox.isChecked() else None
+            try:
+                current = self.trigger_current_input.text().replace(',', '.').strip()
+                if current:
+                    triggers.append(Trigger(Threshold('current', above=float(current)), action, post=TRIGGER_POST))
+                drop = self.trigger_drop_input.text().replace(',', '.').strip()
+                if drop:
+                    window = float(self.trigger_window_input.text().replace(',', '.')) / 1000
+                    triggers.append(Trigger(Change('voltage', -abs(float(drop)), window), action,
+                                            post=TRIGGER_POST))
+            except ValueError as e:
+                logger.error('Błędne ustawienia wyzwalacza: %s', e)
+                self.trigger_label.setText('Błędne ustawienia')
+                self.trigger_arm_button.setChecked(False)
+                return
+            if self.trigger_mode_checkbox.isChecked():
+                triggers.append(Trigger(ModeChange(), action, post=TRIGGER_POST))
+        self.triggers = triggers
+        if self.acquisition:
+            if triggers and self.acquisition.setpoints['voltage'] is None:
+                self.acquisition.request_settings()  # Wyzwalacz CV/CC potrzebuje nastaw
+            self.acquisition.triggers.set_triggers(triggers)
+            self.acquisition.protocol.wake()  # Wyzwalacze - odczyt adaptacyjny bez zwłoki
+        self.trigger_arm_button.setText('Rozbrój' if triggers else 'Uzbrój')
+        logger.info('Wyzwalacze: %s', ', '.join(trigger.name for trigger in triggers) or 'brak')
+
+    def show_trigger_event(self, event):
+        """Pokaż zadziałanie wyzwalacza w grupie i znacznik na wykresach."""
+        self.trigger_events = (self.trigger_events + [event])[-MAX_TRIGGER_MARKERS:]
+        text = f'{event.name}\nU={event.voltage:.2f} V, I={event.current:.3f} A'
+        if event.reaction_ns is not None:
+            text += f'\nReakcja: {event.reaction_ns / 1e6:.1f} ms'
+        self.trigger_label.setText(text)
+        position = (event.timestamp_ns - self.start_time) / 1e9
+        for widget in (self.voltage_plot_widget, self.current_plot_widget):
+            marker = pg.InfiniteLine(pos=position, angle=90, pen=pg.mkPen('y', style=2))
+            widget.addItem(marker)
+            self.trigger_markers.append((widget, marker))
+        while len(self.trigger_markers) > 2 * MAX_TRIGGER_MARKERS:
+            widget, marker = self.trigger_markers.pop(0)
+            widget.removeItem(marker)
+
+    def save_trigger_capture(self):
+        """Zapisz przebieg ostatniego zdarzenia (przed i po zadziałaniu) do CSV."""
+        events = [event for event in self.trigger_events if event.capture is not None]
+        if not events:
+            self.trigger_label.setText('Brak zapisanego przebiegu')
+            return
+        path, _ = QFileDialog.getSaveFileName(self, 'Zapisz przebieg', 'wyzwolenie.csv', 'CSV (*.csv)')
+        if not path:
+            return
+        try:
+            write_capture(events[-1], path)
+        except OSError as e:
+            logger.error('Błąd zapisu przebiegu do %s: %s', path, e)
+
+    def update_metrics_panel(self):
+        """Odśwież panel metryk (tylko gdy jest widoczny)."""
+        if not self.metrics_label.isVisible():
+            return
+        lines = [f'Rysowanie p95: ≤{self.render_time.percentile(0.95) or 0:g} ms',
+                 f'Widok: odświeżenia {self.view.flushes}, zmiany {self.view.applied}, '
+                 f'pominięte {self.view.skipped}']
+        if self.acquisition:
+            protocol = self.acquisition.protocol
+            lines[:0] = [
+                f'RTT p50/p95: ≤{protocol.round_trip.percentile(0.5) or 0:g} / '
+                f'≤{protocol.round_trip.percentile(0.95) or 0:g} ms',
+                f'Przekroczenia czasu: {protocol.timeouts.value}',
+                f'Błędne odpowiedzi: {protocol.reply_errors.value}',
+                f'Kolejka / w locie: {protocol.queue_depth} / {protocol.in_flight}',
+                f'Próbki: {self.acquisition.samples_total.value}, utracone: {self.acquisition.samples_dropped.value}',
+            ]
+        self.view.set('metrics', '\n'.join(lines))
+
+    def update_readouts(self):
+        """Przenieś próbki z wątku akwizycji do wyświetlaczy i wykresów."""
+        self.update_metrics_panel()
+        self.update_sequence_label()
+        if not self.acquisition:
+            return
+        self.update_statistics()
+
+        # Błędy są już zalogowane przez wątek akwizycji; tu obsługiwane są tylko wyniki
+        for kind, payload in drain(self.acquisition.events):
+            if kind == 'settings':
+                voltage, current = payload
+                # Aktualizuj wyświetlacze i pokrętła
+                self.set_voltage(voltage)
+                self.set_current(current)
+                logger.info('Pobrano ustawione napięcie: %.2f V, prąd: %.3f A', voltage, current)
+            elif kind == 'trigger':
+                self.show_trigger_event(payload)
+            elif kind == 'divergence':
+                # Nastawa zmieniona poza aplikacją (np. na panelu zasilacza) - pokaż stan zasilacza
+                name, expected, actual = payload
+                if name == 'voltage':
+                    self.set_voltage(actual)
+                elif name == 'current':
+                    self.set_current(actual)
+                self.status_label.setText(f'Status: {name} w zasilaczu {actual} (oczekiwano {expected})')
+            elif kind == 'writer':
+                writer, error = payload
+                if writer is self.recorder:
+                    self.record_button.setChecked(False)  # Zamyka zapis i przywraca przycisk
+                    self.status_label.setText(f'Status: Zapis do pliku przerwany: {error}')
+                elif writer is self.store_writer:
+                    self.store_checkbox.setChecked(False)  # Kończy sesję w bazie
+                    self.status_label.setText(f'Status: Zapis do bazy sesji przerwany: {error}')
+            elif kind == 'link':
+                if payload == 'lost':
+                    self.status_label.setText('Status: Utracono połączenie - ponowne łączenie...')
+                else:
+                    self.status_label.setText(f'Status: Połączono ponownie z {self.acquisition.supervisor.port}')
+
+        self.view.set('sample_rate', f'Próbki/s: {self.acquisition.sample_rate:.1f}')
+        latency_p95 = self.acquisition.protocol.latency.percentile(0.95)
+        if latency_p95 is not None:
+            self.view.set('latency', f'Opóźnienie p95: ≤{latency_p95:g} ms')
+
+        samples = drain(self.acquisition.samples)
+        if not samples:
+            return
+
+        # Dopisz nowe dane do bufora historii (czas w sekundach od startu aplikacji)
+        rows = np.array(samples, dtype=np.float64)
+        rows[:, 0] = (np.array([sample[0] for sample in samples], dtype=np.int64) - self.start_time) / 1e9
+        self.history.extend(rows)
+        self.plot_pyramid.extend(rows)
+
+        # Zaktualizuj wyświetlacze odczytanych wartości (ostatnia próbka; NaN - przerwa w danych)
+        _, voltage, current = samples[-1]
+        self.view.set('voltage_readout', f"{voltage:.2f}" if voltage == voltage else '-')
+        self.view.set('current_readout', f"{current:.3f}" if current == current else '-')
+
+        # Wykresy przerysowuje osobny timer (własny okres)
+        self._plots_stale = True
+
+        logger.debug('Odczytane napięcie: %.2f V, prąd: %.3f A', voltage, current)
+
+    def refresh_stale_plots(self):
+        """Przerysuj wykresy, jeśli od ostatniego rysowania przybyły próbki (timer wykresów)."""
+        if self._plots_stale:
+            self.refresh_plots()
+
+    def refresh_plots(self):
+        """Przerysuj wykresy z danych zdecymowanych do szerokości widoku (min/max na piksel)."""
+        if self._refreshing_plots or not len(self.history):
+            return
+        self._refreshing_plots = True
+        self._plots_stale = False
+        start_ns = time.perf_counter_ns()
+        try:
+            time_data = self.history.column(0)
+            for channel, (widget, curve) in enumerate(((self.voltage_plot_widget, self.voltage_curve),
+                                                       (self.current_plot_widget, self.current_curve))):
+                view_box = widget.getPlotItem().getViewBox()
+                pixels = max(int(view_box.width()), 100)
+                if view_box.autoRangeEnabled()[0]:
+                    t0, t1 = time_data[0], time_data[-1]
+                else:
+                    # Przy powiększeniu pobierz dane z zapasem szerokości widoku po obu stronach
+                    t0, t1 = view_box.viewRange()[0]
+                    span = t1 - t0
+                    t0, t1 = t0 - span, t1 + span
+                    pixels *= 3
+                curve.setData(*self.plot_pyramid.query(t0, t1, pixels, channel))
+        finally:
+            self._refreshing_plots = False
+        self.render_time.observe((time.perf_counter_ns() - start_ns) / 1e6)
+
+    def set_voltage(self, voltage):
+        """Ustaw napięcie w pamięci i zaktualizuj interfejs (bez wysyłania nastawy do zasilacza)."""
+        self.voltage_value = voltage
+        # Pokrętła od razu (przyciski +/- liczą od ich położenia), z zablokowanymi sygnałami
+        self.view.apply('voltage_dials', divmod(round(voltage * 100), 100))
+        self.view.set('voltage_setpoint', f"{voltage:.2f}")
+
+    def set_current(self, current):
+        """Ustaw prąd w pamięci i zaktualizuj interfejs (bez wysyłania nastawy do zasilacza)."""
+        self.current_value = current
+        self.view.apply('current_dials', divmod(round(current * 1000), 1000))
+        self.view.set('current_setpoint', f"{current:.3f}")
+
+    def set_voltage_from_input(self):
+        """Ustaw napięcie z wpisanego pola."""
+        try:
+            # Akceptacja zarówno kropki, jak i przecinka jako separatora dziesiętnego
+            voltage_input = self.voltage_input.text().replace(',', '.')
+            voltage = float(voltage_input)
+            if 0 <= voltage <= 31.0:
+                self.set_voltage(voltage)
+                if self.send_command(f'VSET1:{voltage:.2f}'):
+                    logger.info('Ustawiono napięcie: %.2f V', voltage)
+        except ValueError:
+            logger.warning('Błędna wartość napięcia!')
+
+    def set_current_from_input(self):
+        """Ustaw prąd z wpisanego pola."""
+        try:
+            # Akceptacja zarówno kropki, jak i przecinka jako separatora dziesiętnego
+            current_input = self.current_input.text().replace(',', '.')
+            current = float(current_input)
+            if 0 <= current <= 5.1:
+                self.set_current(current)
+                if self.send_command(f'ISET1:{current:.3f}'):
+                    logger.info('Ustawiono prąd: %.3f A', current)
+        except ValueError:
+            logger.warning('Błędna wartość prądu!')
+
+    def update_voltage_display(self):
+        """Aktualizuj wyświetlacz napięcia na podstawie pokręteł."""
+        volts = self.voltage_dial_volts.value()  # Wartość z pokrętła voltów
+        fraction = self.voltage_dial_fraction.value()  # Wartość z pokrętła setnych
+        self.view.note('voltage_dials', (volts, fraction))  # Pokrętła ustawił użytkownik
+        voltage = volts + fraction / 100.0  # Oblicz pełne napięcie
+        self.voltage_value = voltage
+        self.view.set('voltage_setpoint', f"{voltage:.2f}")  # Wyświetl wynik
+
+        # Wyślij polecenie ustawienia napięcia do zasilacza
+        if self.send_command(f'VSET1:{voltage:.2f}'):
+            logger.debug('Ustawiono napięcie: %.2f V', voltage)
+
+    def update_current_display(self):
+        """Aktualizuj wyświetlacz prądu na podstawie pokręteł."""
+        amperes = self.current_dial_amperes.value()  # Wartość z pokrętła amperów
+        fraction = self.current_dial_fraction.value()  # Wartość z pokrętła setnych i tysięcznych
+        self.view.note('current_dials', (amperes, fraction))  # Pokrętła ustawił użytkownik
+        current = amperes + fraction / 1000.0  # Oblicz pełny prąd
+        self.current_value = current
+        self.view.set('current_setpoint', f"{current:.3f}")  # Wyświetl wynik
+
+        # Wyślij polecenie ustawienia prądu do zasilacza
+        if self.send_command(f'ISET1:{current:.3f}'):
+            logger.debug('Ustawiono prąd: %.3f A', current)
+
+    def increment_voltage_1v(self):
+        """Zwiększ napięcie o 1 V."""
+        if self.voltage_value + 1.0 <= 31.0:
+            self.voltage_dial_volts.setValue(self.voltage_dial_volts.value() + 1)
+
+    def decrement_voltage_1v(self):
+        """Zmniejsz napięcie o 1 V."""
+        if self.voltage_value - 1.0 >= 0.0:
+            self.voltage_dial_volts.setValue(self.voltage_dial_volts.value() - 1)
+
+    def increment_voltage_01v(self):
+        """Zwiększ napięcie o 0.1 V."""
+        if self.voltage_value + 0.1 <= 31.0:
+            self.voltage_dial_fraction.setValue(self.voltage_dial_fraction.value() + 10)
+
+    def decrement_voltage_01v(self):
+        """Zmniejsz napięcie o 0.1 V."""
+        if self.voltage_value - 0.1 >= 0.0:
+            self.voltage_dial_fraction.setValue(self.voltage_dial_fraction.value() - 10)
+
+    def increment_voltage_001v(self):
+        """Zwiększ napięcie o 0.01 V."""
+        if self.voltage_value + 0.01 <= 31.0:
+            self.voltage_dial_fraction.setValue(self.voltage_dial_fraction.value() + 1)
+
+    def decrement_voltage_001v(self):
+        """Zmniejsz napięcie o 0.01 V."""
+        if self.voltage_value - 0.01 >= 0.0:
+            self.voltage_dial_fraction.setValue(self.voltage_dial_fraction.value() - 1)
+
+    def increment_current_1a(self):
+        """Zwiększ prąd o 1 A."""
+        if self.current_value + 1.0 <= 5.1:
+            self.current_dial_amperes.setValue(self.current_dial_amperes.value() + 1)
+
+    def decrement_current_1a(self):
+        """Zmniejsz prąd o 1 A."""
+        if self.current_value - 1.0 >= 0.0:
+            self.current_dial_amperes.setValue(self.current_dial_amperes.value() - 1)
+
+    def increment_current_01a(self):
+        """Zwiększ prąd o 0.1 A."""
+        if self.current_value + 0.1 <= 5.1:
+            self.current_dial_amperes.setValue(self.current_dial_amperes.value() + 1)
+
+    def decrement_current_01a(self):
+        """Zmniejsz prąd o 0.1 A."""
+        if self.current_value - 0.1 >= 0.0:
+            self.current_dial_amperes.setValue(self.current_dial_amperes.value() - 1)
+
+    def increment_current_001a(self):
+        """Zwiększ prąd o 0.01 A."""
+        if self.current_value + 0.01 <= 5.1:
+            self.current_dial_fraction.setValue(self.current_dial_fraction.value() + 10)
+
+    def decrement_current_001a(self):
+        """Zmniejsz prąd o 0.01 A."""
+        if self.current_value - 0.01 >= 0.0:
+            self.current_dial_fraction.setValue(self.current_dial_fraction.value() - 10)
+
+    def increment_current_0001a(self):
+        """Zwiększ prąd o 0.001 A."""
+        if self.current_value + 0.001 <= 5.1:
+            self.current_dial_fraction.setValue(self.current_dial_fraction.value() + 1)
+
+    def decrement_current_0001a(self):
+        """Zmniejsz prąd o 0.001 A."""
+        if self.current_value - 0.001 >= 0.0:
+            self.current_dial_fraction.setValue(self.current_dial_fraction.value() - 1)
+
+    def enable_output(self):
+        """Załącz wyjście zasilacza."""
+        if self.send_command('OUT1'):
+            logger.info('Wyjście załączone')
+
+    def disable_output(self):
+        """Wyłącz wyjście zasilacza."""
+        if self.send_command('OUT0', PRIORITY_CONTROL):
+            logger.info('Wyjście wyłączone')
+
+    def update_current_button_labels(self):
+        """Zmieniaj dynamicznie etykiety przycisków w zależności od wybranego RadioButton."""
+        if self.radio_mA.isChecked():
+            self.current_fraction_group.setTitle("[mA]")
+            self.current_plus_01a.setText('+ 100 mA')
+            self.current_minus_01a.setText('- 100 mA')
+            self.current_plus_001a.setText('+ 10 mA')
+            self.current_minus_001a.setText('- 10 mA')
+            self.current_plus_0001a.setText('+ 1 mA')
+            self.current_minus_0001a.setText('- 1 mA')
+        else:
+            self.current_fraction_group.setTitle("[A]")
+            self.current_plus_01a.setText('+ 0.1 A')
+            self.current_minus_01a.setText('- 0.1 A')
+            self.current_plus_001a.setText('+ 0.01 A')
+            self.current_minus_001a.setText('- 0.01 A')
+            self.current_plus_0001a.setText('+ 0.001 A')
+            self.current_minus_0001a.setText('- 0.001 A')
+
+
+class InstrumentPanel(QGroupBox):
+    """Kompaktowy panel jednego zasilacza w oknie wielu zasilaczy."""
+
+    def __init__(self, name, manager, view):
+        super().__init__(name)
+        self.name = name
+        self.manager = manager
+        self.view = view  # Model widoku okna - wspólne odświeżanie wszystkich paneli raz na klatkę
+
+        layout = QGridLayout()
+        self.voltage_readout_display = QLCDNumber()
+        self.voltage_readout_display.setDigitCount(5)
+        self.voltage_readout_display.setSegmentStyle(QLCDNumber.Flat)
+        self.voltage_readout_display.setStyleSheet("border: 1px solid black; color: #FFBF00; background: black;")
+        self.voltage_readout_display.setFixedHeight(40)
+        self.current_readout_display = QLCDNumber()
+        self.current_readout_display.setDigitCount(6)
+        self.current_readout_display.setSegmentStyle(QLCDNumber.Flat)
+        self.current_readout_display.setStyleSheet("border: 1px solid black; color: #FFBF00; background: black;")
+        self.current_readout_display.setFixedHeight(40)
+        layout.addWidget(QLabel('U [V]:'), 0, 0)
+        layout.addWidget(self.voltage_readout_display, 0, 1)
+        layout.addWidget(QLabel('I [A]:'), 1, 0)
+        layout.addWidget(self.current_readout_display, 1, 1)
+
+        enable_output_button = QPushButton("Załącz")
+        enable_output_button.clicked.connect(lambda: self.manager.send(self.name, 'OUT1'))
+        disable_output_button = QPushButton("Wyłącz")
+        disable_output_button.clicked.connect(lambda: self.manager.send(self.name, 'OUT0', PRIORITY_CONTROL))
+        remove_button = QPushButton("Usuń")
+        remove_button.clicked.connect(self.remove)
+        self.energy_label = QLabel('-')
+        layout.addWidget(self.energy_label, 2, 0, 1, 2)
+        layout.addWidget(enable_output_button, 3, 0)
+        layout.addWidget(disable_output_button, 3, 1)
+        layout.addWidget(remove_button, 4, 0, 1, 2)
+        self.setLayout(layout)
+
+        view.bind((name, 'voltage'), self.voltage_readout_display.display)
+        view.bind((name, 'current'), self.current_readout_display.display)
+        view.bind((name, 'energy'), self.energy_label.setText)
+
+    def show_sample(self, sample):
+        """Wyświetl ostatnią próbkę (czas_ns, napięcie, prąd) oraz moc i energię od połączenia."""
+        _, voltage, current = sample
+        # NaN - znacznik przerwy po utracie łącza
+        self.view.set((self.name, 'voltage'), f"{voltage:.2f}" if voltage == voltage else '-')
+        self.view.set((self.name, 'current'), f"{current:.3f}" if current == current else '-')
+        worker = self.manager.workers.get(self.name)
+        if worker:
+            stats = worker.stats.snapshot()
+            self.view.set((self.name, 'energy'), f"P: {stats['power']:.2f} W  E: {stats['energy_wh']:.4f} Wh  "
+                                                 f"Q: {stats['charge_ah']:.4f} Ah")
+
+    def remove(self):
+        """Odłącz zasilacz i usuń panel."""
+        self.view.unbind((self.name, 'voltage'), (self.name, 'current'), (self.name, 'energy'))
+        self.manager.remove(self.name)
+        self.setParent(None)
+        self.deleteLater()
+
+
+class MultiInstrumentWindow(QWidget):
+    """Okno obsługi wielu zasilaczy - po jednym panelu na port."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle('KORAD PS - wiele zasilaczy')
+        self.manager = DeviceManager()
+        self.panels = {}
+        self.view = create_view_model(self)
+
+        main_layout = QVBoxLayout()
+
+        port_layout = QHBoxLayout()
+        self.com_ports = QComboBox()
+        self.refresh_ports()
+        add_button = QPushButton('Dodaj')
+        add_button.clicked.connect(self.add_selected_port)
+        refresh_button = QPushButton('Odśwież')
+        refresh_button.clicked.connect(self.refresh_ports)
+        all_on_button = QPushButton('Załącz wszystkie')
+        all_on_button.clicked.connect(lambda: self.manager.broadcast('OUT1'))
+        all_off_button = QPushButton('Wyłącz wszystkie')
+        all_off_button.clicked.connect(lambda: self.manager.broadcast('OUT0', PRIORITY_CONTROL))
+        port_layout.addWidget(QLabel('Port:'))
+        port_layout.addWidget(self.com_ports)
+        port_layout.addWidget(add_button)
+        port_layout.addWidget(refresh_button)
+        port_layout.addWidget(all_on_button)
+        port_layout.addWidget(all_off_button)
+        main_layout.addLayout(port_layout)
+
+        self.status_label = QLabel('Zasilacze: 0')
+        main_layout.addWidget(self.status_label)
+        self.view.bind('status', self.status_label.setText)
+
+        # Panele zasilaczy w siatce po 4 w rzędzie
+        self.panels_layout = QGridLayout()
+        main_layout.addLayout(self.panels_layout)
+        self.setLayout(main_layout)
+
+        self.readout_timer = QTimer(self)
+        self.readout_timer.timeout.connect(self.update_readouts)
+        self.readout_timer.start(300)
+
+    def refresh_ports(self):
+        """Odśwież listę dostępnych portów COM."""
+        self.com_ports.clear()
+        for port in serial.tools.list_ports.comports():
+            self.com_ports.addItem(port.device)
+        if os.environ.get('KORAD_PS_SIMULATOR'):
+            self.com_ports.addItem(os.environ['KORAD_PS_SIMULATOR'])
+
+    def add_selected_port(self):
+        """Dodaj zasilacz z wybranego portu."""
+        port = self.com_ports.currentText()
+        if not port or port in self.manager:
+            return
+        try:
+            self.manager.open(port)
+        except serial.SerialException as e:
+            self.view.set('status', f'Błąd połączenia z {port}')
+            logger.error('Błąd połączenia z %s: %s', port, e)
+            return
+        self.add_panel(port)
+
+    def add_panel(self, name):
+        """Dodaj panel zasilacza już obecnego w menedżerze."""
+        self.panels[name] = InstrumentPanel(name, self.manager, self.view)
+        self.prune_panels()
+        self.reflow_panels()
+
+    def prune_panels(self):
+        """Zapomnij panele usunięte przyciskiem (ich zasilacza nie ma już w menedżerze); True - coś usunięto."""
+        removed = [name for name in self.panels if name not in self.manager]
+        for name in removed:
+            del self.panels[name]
+        return bool(removed)
+
+    def reflow_panels(self):
+        """Rozmieść panele w siatce po 4 w rzędzie, bez luk po usuniętych."""
+        for panel in self.panels.values():
+            self.panels_layout.removeWidget(panel)
+        for index, panel in enumerate(self.panels.values()):
+            self.panels_layout.addWidget(panel, index // 4, index % 4)
+
+    def update_readouts(self):
+        """Przenieś nowe próbki ze wszystkich zasilaczy do paneli."""
+        if self.prune_panels():
+            self.reflow_panels()
+
+        self.manager.events()  # Błędy zalogował już wątek akwizycji każdego zasilacza
+        self.manager.collect()
+        for name, sample in self.manager.latest.items():
+            if name in self.panels:
+                self.panels[name].show_sample(sample)
+        self.view.set('status', f'Zasilacze: {len(self.manager)}, próbki/s: {self.manager.sample_rate:.1f}')
+
+    def closeEvent(self, event):
+        """Zatrzymaj akwizycję wszystkich zasilaczy przy zamykaniu okna."""
+        self.manager.close()
+        for panel in self.panels.values():
+            panel.setParent(None)
+        self.panels.clear()
+        super().closeEvent(event)
+
+
+class LogViewerWindow(QWidget):
+    """Przeglądarka zapisu .kps - te same wykresy co w oknie głównym, z kursorem czasu."""
+
+    def __init__(self, log):
+        super().__init__()
+        self.log = log
+        self.setWindowTitle(f'KORAD PS - zapis {log.path}')
+        self._refreshing_plots = False
+
+        main_layout = QVBoxLayout()
+        self.cursor_label = QLabel('Kursor: -')
+        main_layout.addWidget(self.cursor_label)
+
+        plots_layout = QHBoxLayout()
+        self.voltage_plot_widget = pg.PlotWidget(title='Wykres Napięcia')
+        self.voltage_plot_widget.setLabel('left', 'Napięcie [V]')
+        self.voltage_plot_widget.setLabel('bottom', 'Czas [s]')
+        self.voltage_curve = self.voltage_plot_widget.plot(pen='g')
+        self.current_plot_widget = pg.PlotWidget(title='Wykres Prądu')
+        self.current_plot_widget.setLabel('left', 'Prąd [A]')
+        self.current_plot_widget.setLabel('bottom', 'Czas [s]')
+        self.current_curve = self.current_plot_widget.plot(pen='r')
+        self.current_plot_widget.setXLink(self.voltage_plot_widget)
+        plots_layout.addWidget(self.voltage_plot_widget)
+        plots_layout.addWidget(self.current_plot_widget)
+        main_layout.addLayout(plots_layout)
+        self.setLayout(main_layout)
+
+        # Kursory czasu na obu wykresach, przesuwane razem
+        start, end = log.duration
+        self.cursors = []
+        for widget in (self.voltage_plot_widget, self.current_plot_widget):
+            cursor = pg.InfiniteLine(pos=(start + end) / 2, angle=90, movable=True, pen='y')
+            cursor.sigPositionChanged.connect(self.move_cursor)
+            widget.addItem(cursor)
+            self.cursors.append(cursor)
+
+        self.voltage_plot_widget.sigXRangeChanged.connect(self.refresh_plots)
+        self.voltage_plot_widget.setXRange(start, end, padding=0)
+        self.refresh_plots()
+        self.move_cursor(self.cursors[0])
+
+    def refresh_plots(self):
+        """Pobierz z indeksu min/max tylko to, co mieści się w widocznym zakresie."""
+        if self._refreshing_plots:
+            return
+        self._refreshing_plots = True
+        try:
+            view_box = self.voltage_plot_widget.getPlotItem().getViewBox()
+            t0, t1 = view_box.viewRange()[0]
+            pixels = max(int(view_box.width()), 100)
+            self.voltage_curve.setData(*self.log.query(t0, t1, pixels, 0))
+            self.current_curve.setData(*self.log.query(t0, t1, pixels, 1))
+        finally:
+            self._refreshing_plots = False
+
+    def move_cursor(self, moved):
+        """Zsynchronizuj kursory i pokaż U, I, P w wybranej chwili."""
+        position = moved.value()
+        for cursor in self.cursors:
+            if cursor is not moved and cursor.value() != position:
+                cursor.setValue(position)
+        sample = self.log.value_at(position)
+        if sample:
+            t, voltage, current, power = sample
+            self.cursor_label.setText(f'Kursor: t = {t:.3f} s, U = {voltage:.2f} V, '
+                                      f'I = {current:.3f} A, P = {power:.3f} W')
+
+    def closeEvent(self, event):
+        self.voltage_curve.setData([], [])
+        self.current_curve.setData([], [])
+        self.log.close()
+        super().closeEvent(event)
+
+
+def main(argv=None):
+    """Uruchom aplikację okienkową."""
+    setup_logging(logging.DEBUG if os.environ.get('KORAD_PS_DEBUG') else logging.INFO)
+    app = QApplication(sys.argv if argv is None else argv)
+    window = KoradController()
+    window.show()
+    return app.exec_()
@@ -0,0 +1,107 @@
+import bisect
+import collections
+import heapq
+import time
+
+from korad_acquisition import AcquisitionWorker, drain
+from korad_sim import open_port
+
+
+class DeviceManager:
+    """Menedżer wielu zasilaczy - po jednym wątku akwizycji na port.
+
+    Każdy zasilacz jest odpytywany niezależnie, więc łączna przepustowość rośnie
+    z liczbą portów. Wszystkie wątki znakują próbki tym samym zegarem
+    (``time.perf_counter_ns``), dzięki czemu ``collect`` może scalić je w jeden
+    uporządkowany w czasie strumień.
+    """
+
+    def __init__(self, interval=0.3, max_samples=1000000):
+        self.interval = interval
+        self.workers = {}  # Nazwa (port) -> AcquisitionWorker
+        self.latest = {}  # Nazwa -> ostatnia próbka (czas_ns, napięcie, prąd)
+        self.stream = collections.deque(maxlen=max_samples)  # Scalony strumień (czas_ns, nazwa, napięcie, prąd)
+        self._held = []  # Próbki czekające na znak wodny (patrz ``collect``)
+
+    def __len__(self):
+        return len(self.workers)
+
+    def __contains__(self, name):
+        return name in self.workers
+
+    def open(self, port, baudrate=9600, timeout=2):
+        """Otwórz port (lub symulator ``sim://``) i dodaj zasilacz pod nazwą portu."""
+        return self.add(port, open_port(port, baudrate=baudrate, timeout=timeout))
+
+    def add(self, name, connection):
+        """Dodaj zasilacz z już otwartym połączeniem i uruchom jego wątek akwizycji."""
+        if name in self.workers:
+            raise ValueError(f'Zasilacz {name} jest już dodany')
+        worker = AcquisitionWorker(connection, interval=self.interval, name=name)
+        self.workers[name] = worker
+        worker.start()
+        return worker
+
+    def remove(self, name):
+        """Zatrzymaj akwizycję i zamknij port wskazanego zasilacza."""
+        worker = self.workers.pop(name, None)
+        self.latest.pop(name, None)
+        if worker:
+            worker.stop()
+
+    def close(self):
+        """Zatrzymaj wszystkie wątki akwizycji."""
+        # Najpierw zasygnalizuj wszystkim, żeby zamykanie portów szło równolegle
+        for worker in self.workers.values():
+            worker.stop(wait=False)
+        for name in list(self.workers):
+            self.remove(name)
+
+    def send(self, name, command, priority=None):
+        """Zakolejkuj komendę dla jednego zasilacza."""
+        return self.workers[name].send(command, priority)
+
+    def broadcast(self, command, priority=None):
+        """Zakolejkuj tę samą komendę dla wszystkich zasilaczy."""
+        return {name: worker.send(command, priority) for name, worker in self.workers.items()}
+
+    def set_fast_capture(self, enabled):
+        for worker in self.workers.values():
+            worker.set_fast_capture(enabled)
+
+    def collect(self, max_lag=2.0):
+        """Pobierz nowe próbki ze wszystkich wątków i scal je w kolejności czasu.
+
+        Próbka może dotrzeć z jednego zasilacza później niż nowsza z innego, dlatego
+        wydawane są tylko próbki starsze niż najnowsza próbka każdego z zasilaczy
+        (znak wodny); zasilacz milczący dłużej niż ``max_lag`` sekund nie wstrzymuje
+        strumienia. Zwraca listę (czas_ns, nazwa, napięcie, prąd); te same wiersze
+        trafiają do ``stream``.
+        """
+        per_device = [self._held]
+        for name, worker in self.workers.items():
+            samples = drain(worker.samples)
+            if samples:
+                self.latest[name] = samples[-1]
+                per_device.append([(t, name, voltage, current) for t, voltage, current in samples])
+        # Próbki każdego zasilacza są już posortowane - wystarczy scalanie k list
+        merged = list(heapq.merge(*per_device))
+
+        watermark = time.perf_counter_ns() - int(max_lag * 1e9)
+        if self.latest:
+            watermark = max(watermark, min(sample[0] for sample in self.latest.values()))
+        split = bisect.bisect_right(merged, (watermark, '\uffff'))
+        ready, self._held = merged[:split], merged[split:]
+        self.stream.extend(ready)
+        return ready
+
+    def events(self):
+        """Pobierz zdarzenia (błędy, odpowiedzi) ze wszystkich wątków jako (nazwa, rodzaj, dane)."""
+        return [(name, kind, payload)
+                for name, worker in self.workers.items()
+                for kind, payload in drain(worker.events)]
+
+    @property
+    def sample_rate(self):
+        """Łączna liczba próbek na sekundę ze wszystkich zasilaczy."""
+        return sum(worker.sample_rate for worker in self.workers.values())
@@ -0,0 +1,302 @@
+"""Metryki wydajności (liczniki, wskaźniki, histogramy) i logowanie z ograniczeniem częstotliwości.
+
+Metryki zarejestrowane w ``REGISTRY`` można wyeksportować w formacie tekstowym
+Prometheusa - do pliku (``FileExporter``) albo przez lokalny serwer HTTP
+(``MetricsServer``, domyślnie http://127.0.0.1:9108/metrics). Moduł nie zależy od PyQt5.
+"""
+import abc
+import bisect
+import http.server
+import logging
+import os
+import sys
+import threading
+import time
+
+# Domyślny port lokalnego serwera metryk
+METRICS_PORT = 9108
+
+logger = logging.getLogger('korad.metrics')
+
+
+class Metric(abc.ABC):
+    """Wspólna część metryk: nazwa, opis i etykiety (np. ``{'port': 'COM3'}``)."""
+
+    type = 'untyped'
+
+    def __init__(self, name, help_text, labels=None):
+        self.name = name
+        self.help = help_text
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+
+    def label_text(self, extra=None):
+        labels = dict(self.labels, **(extra or {}))
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in sorted(labels.items())) + '}'
+
+    @abc.abstractmethod
+    def samples(self):
+        """Wiersze eksportu: (przyrostek nazwy, dodatkowe etykiety, wartość)."""
+
+
+class Counter(Metric):
+    """Licznik rosnący (zdarzenia, błędy, próbki)."""
+
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=None):
+        super().__init__(name, help_text, labels)
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [('', None, self.value)]
+
+
+class Gauge(Metric):
+    """Wartość chwilowa - ustawiana przez ``set`` albo odczytywana z funkcji ``function``."""
+
+    type = 'gauge'
+
+    def __init__(self, name, help_text, labels=None, function=None):
+        super().__init__(name, help_text, labels)
+        self.function = function
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self.function() if self.function else self._value
+
+    def samples(self):
+        return [('', None, self.value)]
+
+
+class Histogram(Metric):
+    """Histogram w przedziałach o górnych granicach ``bounds`` (ostatni przedział: powyżej)."""
+
+    type = 'histogram'
+    BOUNDS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self, name='', help_text='', labels=None, bounds=None):
+        super().__init__(name, help_text, labels)
+        self.bounds = tuple(bounds or self.BOUNDS)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.total += 1
+            self.sum += value
+
+    def percentile(self, fraction):
+        """Górna granica przedziału, w którym leży zadany percentyl (np. 0.95)."""
+        with self._lock:
+            if not self.total:
+                return None
+            threshold = fraction * self.total
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+                cumulative += count
+                if cumulative >= threshold:
+                    return bound
+        return float('inf')
+
+    def snapshot(self):
+        """Kopia liczników: lista (górna granica, liczba obserwacji)."""
+        with self._lock:
+            return list(zip(self.bounds + (float('inf'),), self.counts))
+
+    def samples(self):
+        with self._lock:
+            counts, total, total_sum = list(self.counts), self.total, self.sum
+        rows = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + (float('inf'),), counts):
+            cumulative += count
+            rows.append(('_bucket', {'le': '+Inf' if bound == float('inf') else f'{bound:g}'}, cumulative))
+        rows.append(('_sum', None, total_sum))
+        rows.append(('_count', None, total))
+        return rows
+
+
+class Registry:
+    """Zbiór metryk do eksportu. Metryki z tą samą nazwą i różnymi etykietami tworzą jedną rodzinę."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = []
+
+    def register(self, *metrics):
+        with self._lock:
+            for metric in metrics:
+                if metric not in self._metrics:
+                    self._metrics.append(metric)
+
+    def unregister(self, *metrics):
+        with self._lock:
+            self._metrics = [metric for metric in self._metrics if not any(metric is m for m in metrics)]
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics)
+
+    def render(self):
+        """Wszystkie metryki w formacie tekstowym Prometheusa."""
+        families = {}
+        for metric in self.metrics():
+            families.setdefault(metric.name, []).append(metric)
+        lines = []
+        for name, metrics in families.items():
+            lines.append(f'# HELP {name} {metrics[0].help}')
+            lines.append(f'# TYPE {name} {metrics[0].type}')
+            for metric in metrics:
+                try:
+                    samples = metric.samples()
+                except Exception as e:  # Np. funkcja wskaźnika odwołująca się do zamkniętego obiektu
+                    logger.debug('Pominięto metrykę %s: %s', name, e)
+                    continue
+                for suffix, labels, value in samples:
+                    lines.append(f'{name}{suffix}{metric.label_text(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Zapisz metryki do pliku (atomowo - czytelnik nie zobaczy połowy pliku)."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return f'{value:.6g}'
+
+
+# Rejestr globalny używany przez protokół, wątki akwizycji i GUI
+REGISTRY = Registry()
+
+
+class FileExporter(threading.Thread):
+    """Wątek zapisujący metryki do pliku co ``interval`` sekund (i raz przy zatrzymaniu)."""
+
+    def __init__(self, path, registry=REGISTRY, interval=5.0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(self.interval + 1)
+
+    def run(self):
+        while True:
+            stopping = self._stop_event.wait(self.interval)
+            try:
+                self.registry.write(self.path)
+            except OSError as e:
+                logger.error('Błąd zapisu metryk do %s: %s', self.path, e)
+            if stopping:
+                return
+
+
+class MetricsServer(threading.Thread):
+    """Lokalny serwer HTTP z metrykami pod adresem ``/metrics``."""
+
+    def __init__(self, registry=REGISTRY, port=METRICS_PORT, host='127.0.0.1'):
+        super().__init__(daemon=True)
+        registry_ = registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug('HTTP %s', format % args)
+
+        # Port zajęty -> OSError już tutaj, w wątku wywołującym
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+
+    def run(self):
+        self.server.serve_forever(poll_interval=0.5)
+
+    def stop(self):
+        if self.is_alive():
+            self.server.shutdown()
+        self.server.server_close()
+
+
+class RateLimitFilter(logging.Filter):
+    """Przepuszcza najwyżej ``burst`` komunikatów o tym samym szablonie na ``interval`` sekund.
+
+    Liczba pominiętych komunikatów jest dopisywana do pierwszego przepuszczonego
+    w kolejnym okresie - powtarzający się błąd odczytu nie zaleje konsoli.
+    """
+
+    def __init__(self, interval=10.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._windows = {}  # (logger, szablon) -> [początek okresu, przepuszczone, pominięte]
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f'{record.getMessage()} (pominięto {suppressed} podobnych komunikatów)'
+                    record.args = None
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def setup_logging(level=logging.INFO, stream=None, interval=10.0, burst=5):
+    """Skonfiguruj logger ``korad`` (poziom, format, ograniczenie częstotliwości); wywołanie jest idempotentne."""
+    root = logging.getLogger('korad')
+    root.setLevel(level)
+    if not any(getattr(handler, '_korad', False) for handler in root.handlers):
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler._korad = True
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s', '%H:%M:%S'))
+        handler.addFilter(RateLimitFilter(interval, burst))
+        root.addHandler(handler)
+    return root
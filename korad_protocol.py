@@ -0,0 +1,301 @@
+import collections
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+
+import serial
+
+from korad_metrics import Counter, Gauge, Histogram
+
+# Priorytety komend - mniejsza liczba oznacza wcześniejsze wysłanie
+PRIORITY_CONTROL = 0  # OUT0 - wyłączenie wyjścia wyprzedza wszystkie komendy
+PRIORITY_SETPOINT = 1  # VSET1:/ISET1:/OUT1 - w kolejności zlecenia
+PRIORITY_QUERY = 2  # Zapytania zlecone przez użytkownika (VSET1?, *IDN?, ...)
+PRIORITY_POLL = 3  # Cykliczny odczyt VOUT1?/IOUT1?
+
+# Komendy ustawień, dla których liczy się tylko ostatnia oczekująca wartość
+COALESCED_PREFIXES = ('VSET1:', 'ISET1:')
+
+# Jedyna komenda, która może wyprzedzić wcześniej zlecone zapisy. OUT1 wysłane przed
+# zaległym VSET1:/ISET1: załączyłoby wyjście przy poprzedniej (np. wyższej) nastawie.
+PREEMPTIVE_COMMANDS = ('OUT0',)
+
+# Format odpowiedzi na zapytania liczbowe: napięcie ma 2 miejsca po przecinku, prąd 3.
+# Dzięki temu zgubiona odpowiedź w potoku VOUT1?/IOUT1? nie przesunie wartości między kanałami.
+VOLTAGE_REPLY = re.compile(r'\d{1,2}\.\d{2}')
+CURRENT_REPLY = re.compile(r'\d\.\d{3}')
+REPLY_PATTERNS = {
+    'VOUT1?': VOLTAGE_REPLY,
+    'VSET1?': VOLTAGE_REPLY,
+    'IOUT1?': CURRENT_REPLY,
+    'ISET1?': CURRENT_REPLY,
+}
+
+# Zapytania z odpowiedzią binarną o stałej długości, bez znaku końca linii (bajt stanu)
+REPLY_SIZES = {'STATUS?': 1}
+
+
+logger = logging.getLogger('korad.protocol')
+
+
+class ProtocolError(Exception):
+    """Błąd wymiany z zasilaczem (brak odpowiedzi, odpowiedź niepasująca do zapytania)."""
+
+
+class LatencyHistogram(Histogram):
+    """Histogram czasu realizacji komend w przedziałach w milisekundach."""
+
+    def observe(self, latency_ns):
+        super().observe(latency_ns / 1e6)
+
+
+class Request:
+    """Pojedyncza komenda w kolejce protokołu."""
+
+    def __init__(self, command, priority, callback=None):
+        self.command = command
+        self.priority = priority
+        self.callback = callback  # Wywoływany w wątku protokołu po zakończeniu
+        self.key = next((prefix for prefix in COALESCED_PREFIXES if command.startswith(prefix)), None)
+        self.expects_reply = command.endswith('?')
+        self.enqueued_ns = time.perf_counter_ns()
+        self.sent_ns = None
+        self.completed_ns = None
+        self.reply = None
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Czekaj na zakończenie; zwraca odpowiedź albo rzuca ProtocolError."""
+        if not self._done.wait(timeout):
+            raise ProtocolError(f'Przekroczono czas oczekiwania na {self.command}')
+        if self.error:
+            raise self.error
+        return self.reply
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+
+class KoradProtocol:
+    """Warstwa protokołu zasilacza: kolejka priorytetowa, scalanie ustawień i dopasowanie odpowiedzi.
+
+    ``submit`` może być wołane z dowolnego wątku; ``pump`` wywołuje wyłącznie wątek
+    będący właścicielem portu. Zasilacz odpowiada na zapytania w kolejności ich
+    otrzymania, więc odpowiedzi są przypisywane do zapytań w kolejności FIFO, a każda
+    jest sprawdzana pod kątem formatu. Po zgubionej lub błędnej odpowiedzi wszystkie
+    zapytania w locie są odrzucane, a bufor wejściowy czyszczony - odczyt nigdy nie
+    dostanie odpowiedzi przeznaczonej dla innego zapytania.
+    """
+
+    def __init__(self, connection, max_in_flight=1, name=''):
+        self.connection = connection
+        self.max_in_flight = max_in_flight  # Liczba zapytań wysłanych bez czekania na odpowiedź
+
+        # Metryki (do zarejestrowania w korad_metrics.REGISTRY przez właściciela protokołu)
+        labels = {'port': name}
+        self.latency = LatencyHistogram('korad_command_latency_milliseconds',
+                                        'Czas od zakolejkowania do zakończenia komendy', labels)
+        self.round_trip = LatencyHistogram('korad_serial_round_trip_milliseconds',
+                                           'Czas od wysłania zapytania do odebrania odpowiedzi', labels)
+        self.timeouts = Counter('korad_timeouts_total', 'Zapytania bez odpowiedzi w limicie czasu', labels)
+        self.reply_errors = Counter('korad_reply_errors_total', 'Odpowiedzi o niepasującym formacie', labels)
+        self.port_errors = Counter('korad_port_errors_total', 'Błędy zapisu/odczytu portu', labels)
+        self.metrics = [
+            self.latency, self.round_trip, self.timeouts, self.reply_errors, self.port_errors,
+            Gauge('korad_queue_depth', 'Komendy oczekujące w kolejce', labels, lambda: self.queue_depth),
+            Gauge('korad_in_flight', 'Zapytania wysłane bez odpowiedzi', labels, lambda: self.in_flight),
+        ]
+
+        self._cond = threading.Condition()
+        self._heap = []
+        self._sequence = itertools.count()
+        self._coalesced = {}  # Prefiks komendy ustawienia -> oczekujące żądanie
+        self._in_flight = collections.deque()
+        self.coalesced_count = 0  # Liczba komend zastąpionych nowszą wartością
+
+    def submit(self, command, priority=None, callback=None):
+        """Zakolejkuj komendę; zwraca obiekt Request (można na nim czekać przez ``wait``).
+
+        Zapis scalony z oczekującym (VSET1:/ISET1:) zwraca oczekujące żądanie; ``callback``
+        jest wtedy dołączany do jego wywołań zwrotnych - każdy zlecający dostaje swoje.
+        Tylko PREEMPTIVE_COMMANDS mogą mieć priorytet wyższy niż zapisy nastaw.
+        """
+        if priority is None:
+            priority = command_priority(command)
+        elif priority < PRIORITY_SETPOINT and command not in PREEMPTIVE_COMMANDS:
+            priority = PRIORITY_SETPOINT
+        request = Request(command, priority, callback)
+        with self._cond:
+            pending = self._coalesced.get(request.key) if request.key else None
+            if pending is not None:
+                # Ostatni zapis wygrywa - podmień wartość w oczekującym żądaniu
+                pending.command = command
+                pending.enqueued_ns = time.perf_counter_ns()
+                pending.callback = _chain(pending.callback, callback)
+                self.coalesced_count += 1
+                return pending
+
+            heapq.heappush(self._heap, (priority, next(self._sequence), request))
+            if request.key:
+                self._coalesced[request.key] = request
+            self._cond.notify()
+            return request
+
+    def wake(self):
+        """Obudź wątek czekający w ``pump`` (np. przy zatrzymywaniu)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    @property
+    def queue_depth(self):
+        return len(self._heap)
+
+    @property
+    def in_flight(self):
+        return len(self._in_flight)
+
+    def pump(self, timeout=0.0):
+        """Wyślij oczekujące komendy i odbierz jedną odpowiedź.
+
+        Gdy nie ma nic do zrobienia, czeka najwyżej ``timeout`` sekund na nowe komendy.
+        Zwraca True, jeśli cokolwiek zostało wysłane lub odebrane.
+        """
+        with self._cond:
+            if not self._heap and not self._in_flight and timeout > 0:
+                self._cond.wait(timeout)
+            to_send = []
+            queries = len(self._in_flight)
+            while self._heap:
+                request = self._heap[0][2]
+                if request.expects_reply:
+                    if queries >= self.max_in_flight:
+                        break
+                    queries += 1
+                heapq.heappop(self._heap)
+                if request.key and self._coalesced.get(request.key) is request:
+                    del self._coalesced[request.key]
+                to_send.append(request)
+
+        if not to_send and not self._in_flight:
+            return False
+
+        try:
+            if to_send:
+                # Wszystkie gotowe komendy idą jednym zapisem do portu
+                sent_ns = time.perf_counter_ns()
+                for request in to_send:
+                    request.sent_ns = sent_ns
+                    if request.expects_reply:
+                        self._in_flight.append(request)
+                self.connection.write(''.join(f'{request.command}\n' for request in to_send).encode())
+                for request in to_send:
+                    if not request.expects_reply:
+                        self._complete(request, None)
+            if self._in_flight:
+                self._read_reply()
+        except (serial.SerialException, OSError) as e:
+            self.port_errors.inc()
+            error = ProtocolError(f'Błąd portu: {e}')
+            for request in to_send:
+                if not request.done and not request.expects_reply:
+                    self._complete(request, None, error)
+            self.fail_all(error)
+        return True
+
+    def _read_reply(self):
+        request = self._in_flight[0]
+        size = REPLY_SIZES.get(request.command)
+        if size:
+            line = self.connection.read(size)
+            reply = line.decode('latin-1') if len(line) == size else ''
+        else:
+            line = self.connection.readline()
+            if line in (b'\n', b'\r\n'):
+                line = self.connection.readline()  # Zbędny znak końca linii po odpowiedzi binarnej
+            try:
+                reply = line.decode().strip()
+            except UnicodeDecodeError:
+                reply = ''
+        if not reply or not _reply_matches(request.command, reply):
+            # Odpowiedź zgubiona lub nie pasuje - nie wiadomo, do którego zapytania należą dalsze bajty
+            if line:
+                self.reply_errors.inc()
+                reason = f'nieoczekiwana odpowiedź {reply!r}'
+            else:
+                self.timeouts.inc()
+                reason = 'brak odpowiedzi'
+            self.fail_in_flight(ProtocolError(f'{request.command}: {reason}'))
+            self._resync()
+            return
+        self._in_flight.popleft()
+        self._complete(request, reply)
+        self.round_trip.observe(request.completed_ns - request.sent_ns)
+
+    def _complete(self, request, reply, error=None):
+        request.completed_ns = time.perf_counter_ns()
+        request.reply = reply
+        request.error = error
+        if error is None:
+            self.latency.observe(request.completed_ns - request.enqueued_ns)
+        request._done.set()
+        if request.callback:
+            try:
+                request.callback(request)
+            except Exception as e:
+                logger.exception('Błąd obsługi odpowiedzi %s: %s', request.command, e)
+
+    def fail_in_flight(self, error):
+        """Odrzuć wszystkie zapytania czekające na odpowiedź."""
+        while self._in_flight:
+            self._complete(self._in_flight.popleft(), None, error)
+
+    def fail_all(self, error):
+        """Odrzuć zapytania w locie i całą kolejkę (np. po zamknięciu portu)."""
+        self.fail_in_flight(error)
+        with self._cond:
+            pending = [entry[2] for entry in self._heap]
+            self._heap.clear()
+            self._coalesced.clear()
+        for request in pending:
+            self._complete(request, None, error)
+
+    def _resync(self):
+        """Odczekaj na spóźnione bajty i wyczyść bufor wejściowy portu."""
+        time.sleep(0.05)
+        reset = getattr(self.connection, 'reset_input_buffer', None)
+        if reset:
+            reset()
+
+
+def command_priority(command):
+    """Domyślny priorytet komendy."""
+    if command in PREEMPTIVE_COMMANDS:
+        return PRIORITY_CONTROL
+    if command.startswith(COALESCED_PREFIXES) or command == 'OUT1':
+        return PRIORITY_SETPOINT
+    return PRIORITY_QUERY
+
+
+def _chain(first, second):
+    """Wywołanie zwrotne wołające kolejno ``first`` i ``second`` (None - pominięte)."""
+    if first is None or second is None:
+        return first or second
+
+    def chained(request):
+        try:
+            first(request)
+        finally:
+            second(request)
+
+    return chained
+
+
+def _reply_matches(command, reply):
+    """Sprawdź, czy format odpowiedzi pasuje do zapytania."""
+    pattern = REPLY_PATTERNS.get(command)
+    return pattern is None or pattern.fullmatch(reply) is not None
@@ -0,0 +1,445 @@
+import collections
+import csv
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from korad_decimation import minmax_pairs, reduce_blocks
+
+logger = logging.getLogger('korad.recorder')
+
+# Format pliku zapisu (.kps):
+#   nagłówek pliku:  MAGIC, długość metadanych (uint32), metadane JSON (dopełnione do 8 bajtów)
+#   blok danych:     CHUNK_HEADER + kolumny: czas int64[n] (ns), napięcie float32[n], prąd float32[n]
+#   stopka (okresowo i przy zamknięciu): FOOTER_HEADER + przesunięcia bloków uint64[n] + TRAILER
+# Każdy blok ma sumę CRC32, więc po awarii plik da się odczytać sekwencyjnie aż do
+# ostatniego kompletnego bloku; stopka pozwala jedynie szybciej znaleźć bloki.
+MAGIC = b'KPSLOG1\0'
+CHUNK_TAG = b'CHNK'
+FOOTER_TAG = b'FOOT'
+TRAILER_MAGIC = b'KPSEND\0\0'
+CHUNK_HEADER = struct.Struct('<4sIqqddddI4x')  # tag, n, t_first, t_last, v_min, v_max, i_min, i_max, crc
+FOOTER_HEADER = struct.Struct('<4sI')  # tag, liczba bloków
+TRAILER = struct.Struct('<Q8s')  # przesunięcie stopki, magia
+SAMPLE_DTYPES = (np.int64, np.float32, np.float32)
+SAMPLE_SIZE = sum(np.dtype(dtype).itemsize for dtype in SAMPLE_DTYPES)
+
+
+class Chunk:
+    """Nagłówek bloku danych odczytany z pliku."""
+
+    def __init__(self, offset, count, t_first, t_last, v_min, v_max, i_min, i_max, crc):
+        self.offset = offset  # Przesunięcie nagłówka bloku w pliku
+        self.count = count
+        self.t_first = t_first
+        self.t_last = t_last
+        self.v_min = v_min
+        self.v_max = v_max
+        self.i_min = i_min
+        self.i_max = i_max
+        self.crc = crc
+
+    @property
+    def data_offset(self):
+        return self.offset + CHUNK_HEADER.size
+
+    @property
+    def data_size(self):
+        return self.count * SAMPLE_SIZE
+
+
+def encode_chunk(times, voltages, currents):
+    """Zakoduj blok próbek (nagłówek + kolumny) do zapisu."""
+    payload = b''.join((
+        np.ascontiguousarray(times, dtype=np.int64).tobytes(),
+        np.ascontiguousarray(voltages, dtype=np.float32).tobytes(),
+        np.ascontiguousarray(currents, dtype=np.float32).tobytes(),
+    ))
+    header = CHUNK_HEADER.pack(
+        CHUNK_TAG, len(times), int(times[0]), int(times[-1]),
+        # fmin/fmax pomijają NaN (znacznik przerwy) - NaN tylko, gdy blok nie ma żadnego odczytu
+        float(np.fmin.reduce(voltages)), float(np.fmax.reduce(voltages)),
+        float(np.fmin.reduce(currents)), float(np.fmax.reduce(currents)),
+        zlib.crc32(payload))
+    return header + payload
+
+
+def decode_columns(buffer, count):
+    """Widoki (czas, napięcie, prąd) na kolumny bloku w buforze (bytes, mmap) - bez kopiowania."""
+    times = np.frombuffer(buffer, dtype=np.int64, count=count)
+    voltages = np.frombuffer(buffer, dtype=np.float32, count=count, offset=8 * count)
+    currents = np.frombuffer(buffer, dtype=np.float32, count=count, offset=12 * count)
+    return times, voltages, currents
+
+
+class Recorder:
+    """Zapis strumienia próbek na dysk w wątku w tle.
+
+    ``append`` tylko odkłada próbkę do deque, więc może być wołane bezpośrednio z
+    wątku akwizycji. Wątek zapisu składa próbki w duże bloki kolumnowe, okresowo
+    wykonuje fsync i dopisuje stopkę z indeksem bloków.
+
+    Po błędzie zapisu (``error``) kolejne próbki są odrzucane i liczone w
+    ``samples_dropped`` - pamięć nie rośnie; ``on_error`` (jeśli ustawione) jest
+    wołane raz, z wątku zapisu, z argumentami (recorder, błąd).
+    """
+
+    def __init__(self, path, metadata=None, chunk_size=8192, flush_interval=10.0,
+                 fsync_interval=30.0, footer_interval=300.0):
+        self.path = path
+        self.chunk_size = chunk_size  # Maksymalna liczba próbek w bloku
+        self.flush_interval = flush_interval  # Najdłuższy czas trzymania próbek w pamięci [s]
+        self.fsync_interval = fsync_interval
+        self.footer_interval = footer_interval
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self.error = None  # Błąd, który przerwał zapis
+        self.on_error = None
+
+        self._pending = collections.deque()  # (czas_ns, napięcie, prąd)
+        self._chunk_offsets = []
+        self._stop_event = threading.Event()
+
+        metadata = dict(metadata or {})
+        # Czas próbek to perf_counter_ns - zapisz punkt odniesienia do czasu rzeczywistego
+        metadata.setdefault('start_wall_time', time.time())
+        metadata.setdefault('start_perf_ns', time.perf_counter_ns())
+        metadata.setdefault('columns', ['time_ns', 'voltage', 'current'])
+        self.metadata = metadata
+
+        self._file = open(path, 'wb')
+        encoded = json.dumps(metadata).encode()
+        encoded += b' ' * (-(len(encoded) + len(MAGIC) + 4) % 8)
+        self._file.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, sample):
+        """Dodaj próbkę (czas_ns, napięcie, prąd) do zapisu."""
+        if self.error is not None:
+            self.samples_dropped += 1
+            return
+        self._pending.append(sample)
+
+    def extend(self, samples):
+        if self.error is not None:
+            self.samples_dropped += len(samples)
+            return
+        self._pending.extend(samples)
+
+    def close(self):
+        """Zapisz zaległe próbki, stopkę i zamknij plik."""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        last_fsync = last_footer = time.monotonic()
+        buffered = []
+        first_buffered = None
+        try:
+            while True:
+                stopping = self._stop_event.wait(min(self.flush_interval, 0.5))
+                while self._pending:
+                    buffered.append(self._pending.popleft())
+                now = time.monotonic()
+                if buffered and first_buffered is None:
+                    first_buffered = now
+
+                while len(buffered) >= self.chunk_size:
+                    self._write_chunk(buffered[:self.chunk_size])
+                    buffered = buffered[self.chunk_size:]
+                if buffered and (stopping or now - first_buffered >= self.flush_interval):
+                    self._write_chunk(buffered)
+                    buffered = []
+                if not buffered:
+                    first_buffered = None
+
+                if stopping:
+                    break
+                if now - last_footer >= self.footer_interval:
+                    self._write_footer()
+                    last_footer = now
+                if now - last_fsync >= self.fsync_interval:
+                    self._sync()
+                    last_fsync = now
+            self._write_footer()
+            self._sync()
+        except OSError as e:
+            logger.error('Błąd zapisu pliku %s: %s', self.path, e)
+            self._fail(e, len(buffered))
+        finally:
+            try:
+                self._file.close()
+            except OSError as e:
+                logger.error('Błąd zamknięcia pliku %s: %s', self.path, e)
+
+    def _fail(self, error, unwritten):
+        """Przerwij zapis: odrzucaj kolejne próbki i zgłoś błąd."""
+        self.error = error
+        self.samples_dropped += unwritten + len(self._pending)
+        self._pending.clear()
+        if self.on_error is not None:
+            self.on_error(self, error)
+
+    def _write_chunk(self, samples):
+        columns = np.array(samples, dtype=np.float64).T
+        times = np.array([sample[0] for sample in samples], dtype=np.int64)  # Bez utraty precyzji ns
+        self._chunk_offsets.append(self._file.tell())
+        self._file.write(encode_chunk(times, columns[1], columns[2]))
+        self.samples_written += len(samples)
+
+    def _write_footer(self):
+        offset = self._file.tell()
+        self._file.write(FOOTER_HEADER.pack(FOOTER_TAG, len(self._chunk_offsets)))
+        self._file.write(np.array(self._chunk_offsets, dtype=np.uint64).tobytes())
+        self._file.write(TRAILER.pack(offset, TRAILER_MAGIC))
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+def read_metadata(buffer):
+    """Odczytaj metadane z nagłówka; zwraca (metadane, przesunięcie pierwszego bloku)."""
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError('To nie jest plik zapisu KORAD PS')
+    (length,) = struct.unpack_from('<I', buffer, len(MAGIC))
+    start = len(MAGIC) + 4
+    return json.loads(bytes(buffer[start:start + length])), start + length
+
+
+def scan_chunks(buffer, verify=True):
+    """Znajdź bloki danych w buforze pliku.
+
+    Najpierw próbuje stopki na końcu pliku; gdy jej brak (np. po awarii), przegląda
+    plik sekwencyjnie i kończy na pierwszym niekompletnym lub uszkodzonym bloku.
+    """
+    _, offset = read_metadata(buffer)
+    size = len(buffer)
+
+    if size >= TRAILER.size:
+        footer_offset, magic = TRAILER.unpack_from(buffer, size - TRAILER.size)
+        if magic == TRAILER_MAGIC and footer_offset + FOOTER_HEADER.size <= size:
+            tag, count = FOOTER_HEADER.unpack_from(buffer, footer_offset)
+            if tag == FOOTER_TAG and footer_offset + FOOTER_HEADER.size + 8 * count + TRAILER.size == size:
+                offsets = np.frombuffer(buffer, dtype=np.uint64, count=count,
+                                        offset=footer_offset + FOOTER_HEADER.size)
+                return [Chunk(int(chunk_offset), *CHUNK_HEADER.unpack_from(buffer, int(chunk_offset))[1:])
+                        for chunk_offset in offsets]
+
+    chunks = []
+    while offset + FOOTER_HEADER.size <= size:
+        tag = bytes(buffer[offset:offset + 4])
+        if tag == FOOTER_TAG:
+            (count,) = struct.unpack_from('<I', buffer, offset + 4)
+            offset += FOOTER_HEADER.size + 8 * count + TRAILER.size
+            continue
+        if tag != CHUNK_TAG or offset + CHUNK_HEADER.size > size:
+            break
+        chunk = Chunk(offset, *CHUNK_HEADER.unpack_from(buffer, offset)[1:])
+        end = chunk.data_offset + chunk.data_size
+        if end > size:
+            break
+        if verify and zlib.crc32(buffer[chunk.data_offset:end]) != chunk.crc:
+            break
+        chunks.append(chunk)
+        offset = end
+    return chunks
+
+
+def read_log(path):
+    """Wczytaj cały zapis do pamięci; zwraca (metadane, czas_ns, napięcie, prąd)."""
+    with open(path, 'rb') as f:
+        buffer = f.read()
+    metadata, _ = read_metadata(buffer)
+    columns = [[], [], []]
+    for chunk in scan_chunks(buffer):
+        data = buffer[chunk.data_offset:chunk.data_offset + chunk.data_size]
+        for column, values in zip(columns, decode_columns(data, chunk.count)):
+            column.append(values)
+    times, voltages, currents = (np.concatenate(column) if column else np.empty(0, dtype=dtype)
+                                 for column, dtype in zip(columns, SAMPLE_DTYPES))
+    return metadata, times, voltages, currents
+
+
+def export_csv(log_path, csv_path):
+    """Zapisz zapis .kps jako CSV (czas w sekundach od początku zapisu)."""
+    metadata, times, voltages, currents = read_log(log_path)
+    start = metadata.get('start_perf_ns', int(times[0]) if len(times) else 0)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time_s', 'voltage_V', 'current_A'])
+        for t, voltage, current in zip((times - start) / 1e9, voltages, currents):
+            writer.writerow([f'{t:.6f}', f'{voltage:.3f}', f'{current:.4f}'])
+    return len(times)
+
+
+class MappedLog:
+    """Zapis .kps otwarty przez mmap - dane nie są wczytywane do pamięci.
+
+    Obok pliku tworzony jest indeks min/max (``<plik>.idx.npz``): poziom 0 to bloki
+    po ``base_block`` próbek, każdy kolejny scala ``factor`` bloków poprzedniego.
+    Kanały indeksu: napięcie, prąd, moc. Czas jest podawany w sekundach od
+    początku zapisu.
+    """
+
+    CHANNELS = 3  # Napięcie, prąd, moc
+
+    def __init__(self, path, base_block=512, factor=8):
+        self.path = path
+        self.base_block = base_block
+        self.factor = factor
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.metadata, _ = read_metadata(self._map)
+        self.chunks = scan_chunks(self._map, verify=False)
+        self.start_ns = self.metadata.get('start_perf_ns', self.chunks[0].t_first if self.chunks else 0)
+
+        # Tablica bloków do wyszukiwania po czasie
+        self._t_first = np.array([chunk.t_first for chunk in self.chunks], dtype=np.int64)
+        self._t_last = np.array([chunk.t_last for chunk in self.chunks], dtype=np.int64)
+        self._counts = np.array([chunk.count for chunk in self.chunks], dtype=np.int64)
+        self.sample_count = int(self._counts.sum())
+        self.levels = self._load_or_build_index()
+
+    def close(self):
+        self.levels = []
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # Widoki na dane wciąż istnieją - mapowanie zwolni garbage collector
+        self._file.close()
+
+    @property
+    def duration(self):
+        """Zakres czasu zapisu (początek, koniec) w sekundach."""
+        if not self.chunks:
+            return 0.0, 0.0
+        return self._seconds(self._t_first[0]), self._seconds(self._t_last[-1])
+
+    def _seconds(self, t_ns):
+        return (np.asarray(t_ns, dtype=np.int64) - self.start_ns) / 1e9
+
+    def chunk_columns(self, index):
+        """Widoki (czas_ns, napięcie, prąd) bloku prosto z mmap."""
+        chunk = self.chunks[index]
+        return decode_columns(memoryview(self._map)[chunk.data_offset:chunk.data_offset + chunk.data_size],
+                              chunk.count)
+
+    def _chunk_range(self, t0, t1):
+        """Indeksy [lo, hi) bloków zachodzących na zakres czasu w sekundach."""
+        t0_ns = self.start_ns + int(t0 * 1e9)
+        t1_ns = self.start_ns + int(t1 * 1e9)
+        lo = int(np.searchsorted(self._t_last, t0_ns, side='left'))
+        hi = int(np.searchsorted(self._t_first, t1_ns, side='right'))
+        return lo, hi
+
+    def raw(self, t0, t1):
+        """Surowe próbki z zakresu czasu: (czas [s], napięcie, prąd) - kopiowane są tylko wybrane bloki."""
+        lo, hi = self._chunk_range(t0, t1)
+        if hi <= lo:
+            return np.empty(0), np.empty(0), np.empty(0)
+        columns = list(zip(*(self.chunk_columns(index) for index in range(lo, hi))))
+        times, voltages, currents = (np.concatenate(column) for column in columns)
+        times = self._seconds(times)
+        mask = (times >= t0) & (times <= t1)
+        return times[mask], voltages[mask].astype(np.float64), currents[mask].astype(np.float64)
+
+    def value_at(self, t):
+        """Próbka najbliższa chwili ``t`` [s]: (czas, napięcie, prąd, moc) albo None."""
+        if not self.chunks:
+            return None
+        t_ns = self.start_ns + int(t * 1e9)
+        index = int(np.clip(np.searchsorted(self._t_first, t_ns, side='right') - 1, 0, len(self.chunks) - 1))
+        times, voltages, currents = self.chunk_columns(index)
+        position = int(np.clip(np.searchsorted(times, t_ns), 0, len(times) - 1))
+        if position > 0 and abs(times[position - 1] - t_ns) < abs(times[position] - t_ns):
+            position -= 1
+        voltage, current = float(voltages[position]), float(currents[position])
+        return float(self._seconds(times[position])), voltage, current, voltage * current
+
+    def query(self, t0, t1, pixels, channel):
+        """Punkty (x, y) kanału (0 - napięcie, 1 - prąd, 2 - moc) do narysowania w zakresie [t0, t1]."""
+        pixels = max(int(pixels), 1)
+        lo, hi = self._chunk_range(t0, t1)
+        if int(self._counts[lo:hi].sum()) <= 4 * pixels or not self.levels:
+            times, voltages, currents = self.raw(t0, t1)
+            return times, (voltages, currents, voltages * currents)[channel]
+
+        for level in self.levels:
+            first, last = np.searchsorted(level[:, 1], t0), np.searchsorted(level[:, 0], t1, side='right')
+            if last - first <= pixels:
+                break
+        blocks = level[max(first - 1, 0):last + 1].T
+        return minmax_pairs(blocks, channel, self.CHANNELS)
+
+    def _index_path(self):
+        return self.path + '.idx.npz'
+
+    def _load_or_build_index(self):
+        """Wczytaj indeks min/max z pliku obok zapisu albo zbuduj go (jednym przebiegiem po blokach)."""
+        stat = os.stat(self.path)
+        signature = np.array([stat.st_size, self.sample_count, self.base_block, self.factor], dtype=np.int64)
+        try:
+            with np.load(self._index_path()) as index:
+                if np.array_equal(index['signature'], signature):
+                    return [index[f'level{k}'] for k in range(int(index['levels']))]
+        except (OSError, KeyError, ValueError):
+            pass
+
+        levels = self.build_index()
+        try:
+            np.savez(self._index_path(), signature=signature, levels=len(levels),
+                     **{f'level{k}': level for k, level in enumerate(levels)})
+        except OSError as e:
+            logger.error('Błąd zapisu indeksu %s: %s', self._index_path(), e)
+        return levels
+
+    def build_index(self):
+        """Zbuduj poziomy min/max przechodząc po blokach pliku (pamięć: jeden blok naraz + indeks)."""
+        rows = []
+        carry = None
+        for index in range(len(self.chunks)):
+            times, voltages, currents = self.chunk_columns(index)
+            data = np.column_stack((self._seconds(times), voltages, currents, voltages.astype(np.float64) * currents))
+            if carry is not None:
+                data = np.concatenate((carry, data))
+            complete = len(data) - len(data) % self.base_block
+            carry = data[complete:]
+            if complete:
+                rows.append(_summarise(data[:complete].reshape(-1, self.base_block, 4)))
+        if carry is not None and len(carry):
+            rows.append(_summarise(carry.reshape(1, -1, 4)))
+        if not rows:
+            return []
+
+        levels = [np.concatenate(rows)]
+        while len(levels[-1]) >= 16 * self.factor:
+            level = levels[-1]
+            complete = len(level) - len(level) % self.factor
+            reduced = reduce_blocks(level[:complete], self.factor, self.CHANNELS)
+            if complete < len(level):
+                reduced = np.concatenate((reduced, reduce_blocks(level[complete:], len(level) - complete,
+                                                                 self.CHANNELS)))
+            levels.append(reduced)
+        return levels
+
+
+def _summarise(grouped):
+    """Zamień próbki pogrupowane w bloki (n, rozmiar, czas+3 kanały) na wiersze indeksu min/max."""
+    return np.column_stack((
+        grouped[:, 0, 0],
+        grouped[:, -1, 0],
+        np.fmin.reduce(grouped[:, :, 1:], axis=1),  # Z pominięciem znaczników przerwy (NaN)
+        np.fmax.reduce(grouped[:, :, 1:], axis=1),
+    ))
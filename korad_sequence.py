@@ -0,0 +1,337 @@
+"""Sekwencje ustawień zasilacza: profile z pliku (CSV/JSON) i generatory (rampa, sinus, schodki).
+
+Sekwencja to lista kroków (czas od startu [s], napięcie, prąd, wyjście); pola ``None``
+nie zmieniają ustawienia. ``SequenceRunner`` wykonuje ją we własnym wątku według
+zegara monotonicznego: termin każdego kroku liczony jest od chwili startu (nie od
+poprzedniego kroku), więc opóźnienia nie kumulują się. Dla każdego kroku zapisywany
+jest czas zadany, czas zlecenia i czas zapisu komendy do portu.
+
+Przykład pliku CSV (nagłówek wymagany, puste pole - bez zmiany):
+    t,voltage,current,output
+    0,5.00,0.500,on
+    1.5,6.00,,
+    3,0,,off
+"""
+import collections
+import csv
+import json
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+
+from korad_core import MAX_CURRENT, MAX_VOLTAGE
+from korad_metrics import Histogram
+from korad_protocol import PRIORITY_CONTROL
+
+# Ostatnie ``SPIN_NS`` przed terminem kroku wątek czeka aktywnie (sleep jest za mało dokładny)
+SPIN_NS = 2_000_000
+
+# Najwięcej ostatnich kroków z czasami trzymanych w pamięci (podsumowanie obejmuje wszystkie)
+MAX_TIMINGS = 10000
+
+# Przedziały histogramów opóźnień zlecenia i zapisu kroków [ms]
+LATENESS_BOUNDS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Nazwy kolumn profilu CSV/JSON i ich dopuszczalne skróty
+COLUMN_ALIASES = {
+    't': ('t', 'time', 'czas'),
+    'voltage': ('voltage', 'v', 'u', 'napiecie', 'napięcie'),
+    'current': ('current', 'i', 'prad', 'prąd'),
+    'output': ('output', 'out', 'wyjscie', 'wyjście'),
+}
+
+logger = logging.getLogger('korad.sequence')
+
+
+class Step:
+    """Krok sekwencji: czas od startu [s] i nowe ustawienia (None - bez zmiany)."""
+
+    def __init__(self, t, voltage=None, current=None, output=None):
+        self.t = float(t)
+        self.voltage = voltage
+        self.current = current
+        self.output = output
+
+    def commands(self):
+        """Komendy kroku jako (komenda, priorytet albo None).
+
+        Wyjście jest wyłączane przed zmianą nastaw (OUT0 wyprzedza kolejkę), a załączane
+        po nich - OUT1 ma priorytet nastaw, więc trafia do portu za nimi.
+        """
+        commands = []
+        if self.output is False:
+            commands.append(('OUT0', PRIORITY_CONTROL))
+        if self.current is not None:
+            commands.append((f'ISET1:{self.current:.3f}', None))
+        if self.voltage is not None:
+            commands.append((f'VSET1:{self.voltage:.2f}', None))
+        if self.output is True:
+            commands.append(('OUT1', None))
+        return commands
+
+    def validate(self):
+        if self.t < 0:
+            raise ValueError(f'Ujemny czas kroku: {self.t}')
+        if self.voltage is not None and not 0 <= self.voltage <= MAX_VOLTAGE:
+            raise ValueError(f'Napięcie {self.voltage} V poza zakresem 0-{MAX_VOLTAGE} V (t={self.t})')
+        if self.current is not None and not 0 <= self.current <= MAX_CURRENT:
+            raise ValueError(f'Prąd {self.current} A poza zakresem 0-{MAX_CURRENT} A (t={self.t})')
+
+    def __repr__(self):
+        return f'Step(t={self.t}, voltage={self.voltage}, current={self.current}, output={self.output})'
+
+
+def _number(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    return float(str(value).replace(',', '.'))
+
+
+def _output(value):
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    if text in ('on', '1', 'true', 'tak'):
+        return True
+    if text in ('off', '0', 'false', 'nie'):
+        return False
+    raise ValueError(f'Nieznana wartość wyjścia: {value!r}')
+
+
+def _normalise(record):
+    """Słownik kolumn profilu (dowolne aliasy, wielkość liter) -> Step."""
+    fields = {str(key).strip().lower(): value for key, value in record.items()}
+    values = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        values[name] = next((fields[alias] for alias in aliases if alias in fields), None)
+    if values['t'] is None:
+        raise ValueError(f'Krok bez czasu: {record}')
+    return Step(_number(values['t']), _number(values['voltage']), _number(values['current']),
+                _output(values['output']))
+
+
+def load_profile(path):
+    """Wczytaj profil z pliku CSV (z nagłówkiem) albo JSON (lista obiektów lub list [t, V, I, wyjście])."""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.json'):
+            records = json.load(f)
+            records = records.get('steps', records) if isinstance(records, dict) else records
+            steps = [_normalise(record if isinstance(record, dict)
+                                else dict(zip(('t', 'voltage', 'current', 'output'), record)))
+                     for record in records]
+        else:
+            steps = [_normalise(row) for row in csv.DictReader(f)]
+    return prepare(steps)
+
+
+def prepare(steps):
+    """Sprawdź kroki i uporządkuj je według czasu (kolejność kroków o równym czasie jest zachowana)."""
+    steps = sorted(steps, key=lambda step: step.t)
+    for step in steps:
+        step.validate()
+    return steps
+
+
+def ramp(start, stop, duration, step_time, current=None, output=None):
+    """Rampa napięcia od ``start`` do ``stop`` V w ``duration`` s, krok co ``step_time`` s."""
+    count = max(int(round(duration / step_time)), 1)
+    voltages = np.linspace(start, stop, count + 1)
+    steps = [Step(index * step_time, round(float(voltage), 2)) for index, voltage in enumerate(voltages)]
+    steps[0].current, steps[0].output = current, output
+    return prepare(steps)
+
+
+def sine(offset, amplitude, period, duration, step_time, current=None, output=None):
+    """Napięcie ``offset + amplitude * sin(2 pi t / period)`` próbkowane co ``step_time`` s."""
+    count = max(int(round(duration / step_time)), 1)
+    steps = [Step(t, round(offset + amplitude * math.sin(2 * math.pi * t / period), 2))
+             for t in (index * step_time for index in range(count + 1))]
+    steps[0].current, steps[0].output = current, output
+    return prepare(steps)
+
+
+def staircase(levels, dwell, current=None, output=None):
+    """Kolejne poziomy napięcia ``levels``, każdy przez ``dwell`` s."""
+    steps = [Step(index * dwell, float(level)) for index, level in enumerate(levels)]
+    if steps:
+        steps[0].current, steps[0].output = current, output
+    return prepare(steps)
+
+
+class StepTiming:
+    """Zadany i osiągnięty czas wykonania kroku (ns względem startu sekwencji)."""
+
+    def __init__(self, index, commanded_ns, issued_ns, requests):
+        self.index = index
+        self.commanded_ns = commanded_ns  # Termin z profilu
+        self.issued_ns = issued_ns  # Chwila zakolejkowania komend
+        self.requests = requests  # (komenda, Request) - do odczytu czasu zapisu do portu
+        self.written_ns = None  # Chwila zapisu ostatniej komendy kroku do portu
+        self.coalesced = False  # Ustawienie zastąpione nowszym, zanim trafiło do zasilacza
+
+    def resolve(self, start_ns):
+        """Uzupełnij czas zapisu z zakończonych żądań; zwraca False, jeśli któreś jeszcze czeka."""
+        if not all(request.done for _, request in self.requests):
+            return False
+        sent = [request.sent_ns for _, request in self.requests if request.sent_ns is not None]
+        self.written_ns = max(sent) - start_ns if sent else None
+        self.coalesced = any(request.command != command for command, request in self.requests)
+        return True
+
+    @property
+    def lateness_ns(self):
+        """Opóźnienie zapisu do portu względem terminu (None - nie zapisano)."""
+        return None if self.written_ns is None else self.written_ns - self.commanded_ns
+
+
+# Kolumny pliku z czasami kroków
+TIMING_COLUMNS = ('step', 'commanded_s', 'issued_s', 'written_s', 'coalesced', 'commands')
+
+
+def timing_row(timing):
+    """Wiersz CSV kroku: zadany, zlecenia i zapisu do portu [s], scalenie, komendy."""
+    return [timing.index, f'{timing.commanded_ns / 1e9:.6f}', f'{timing.issued_ns / 1e9:.6f}',
+            '' if timing.written_ns is None else f'{timing.written_ns / 1e9:.6f}',
+            int(timing.coalesced), ' '.join(command for command, _ in timing.requests)]
+
+
+class SequenceRunner(threading.Thread):
+    """Wątek wykonujący sekwencję kroków przez ``send(komenda, priorytet) -> Request``.
+
+    ``send`` to zwykle ``AcquisitionWorker.send`` - komendy idą przez kolejkę protokołu,
+    więc sekwencja może działać równolegle z odczytem. ``repeat`` powtarza sekwencję
+    (0 - bez końca); kolejne przebiegi zaczynają się co ``period`` sekund - domyślnie
+    ostatni krok trwa tyle, co odstęp między dwoma ostatnimi krokami.
+
+    Podsumowanie (``stats``) jest aktualizowane przyrostowo, w miarę jak kroki dostają
+    wynik zapisu (``resolve``), a w pamięci zostaje tylko ``MAX_TIMINGS`` ostatnich
+    kroków - koszt nie rośnie przy sekwencji bez końca. Czasy wszystkich kroków można
+    na bieżąco dopisywać do pliku CSV ``timing_path``.
+    """
+
+    def __init__(self, send, steps, repeat=1, period=None, timing_path=None):
+        super().__init__(daemon=True)
+        self.send = send
+        self.steps = prepare(steps)
+        self.repeat = repeat
+        if period is None:
+            times = [step.t for step in self.steps[-2:]]
+            period = times[-1] + (times[-1] - times[0]) if times else 0.0
+        if repeat != 1 and period <= 0:
+            raise ValueError('Powtarzana sekwencja musi mieć dodatni okres')
+        self.period = period
+        self.timings = collections.deque(maxlen=MAX_TIMINGS)  # Ostatnie kroki z wynikiem zapisu
+        self.last = None  # Ostatni zlecony krok (StepTiming)
+        self.position = 0  # Liczba wykonanych kroków (wszystkie przebiegi)
+        self.steps_resolved = 0
+        self.steps_coalesced = 0
+        self.issue_lateness = Histogram('korad_sequence_issue_milliseconds', 'Opóźnienie zlecenia kroku',
+                                        bounds=LATENESS_BOUNDS)
+        self.write_lateness = Histogram('korad_sequence_write_milliseconds', 'Opóźnienie zapisu kroku do portu',
+                                        bounds=LATENESS_BOUNDS)
+        self.issue_max_ms = None
+        self.write_max_ms = None
+        self._unresolved = collections.deque()  # Kroki czekające na wynik zapisu, w kolejności zlecenia
+        self._resolve_lock = threading.Lock()
+        self._timing_file = open(timing_path, 'w', newline='', encoding='utf-8') if timing_path else None
+        self._timing_writer = None
+        if self._timing_file:
+            self._timing_writer = csv.writer(self._timing_file)
+            self._timing_writer.writerow(TIMING_COLUMNS)
+        self.start_ns = None
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+
+    @property
+    def finished(self):
+        return not self.is_alive() and self.start_ns is not None
+
+    def run(self):
+        self.start_ns = time.perf_counter_ns()
+        cycle = 0
+        try:
+            while not self._stop_event.is_set() and (self.repeat == 0 or cycle < self.repeat):
+                offset_ns = int(cycle * self.period * 1e9)
+                for index, step in enumerate(self.steps):
+                    commanded_ns = offset_ns + int(step.t * 1e9)
+                    if not self._wait_until(self.start_ns + commanded_ns):
+                        return
+                    issued_ns = time.perf_counter_ns() - self.start_ns
+                    requests = [(command, self.send(command, priority)) for command, priority in step.commands()]
+                    self.last = StepTiming(index, commanded_ns, issued_ns, requests)
+                    self._unresolved.append(self.last)
+                    self.position += 1
+                cycle += 1
+        except Exception as e:
+            self.error = e
+            logger.error('Przerwano sekwencję: %s', e)
+
+    def _wait_until(self, deadline_ns):
+        """Czekaj do chwili ``deadline_ns`` (perf_counter_ns); False - sekwencja zatrzymana."""
+        while True:
+            remaining = deadline_ns - time.perf_counter_ns()
+            if remaining <= 0:
+                return not self._stop_event.is_set()
+            if remaining > SPIN_NS:
+                if self._stop_event.wait((remaining - SPIN_NS) / 1e9):
+                    return False
+            elif self._stop_event.is_set():
+                return False
+            else:
+                time.sleep(0)  # Oddaj GIL wątkowi akwizycji, który właśnie wysyła poprzedni krok
+
+    def resolve(self):
+        """Dolicz do podsumowania kroki, które mają już wynik zapisu do portu; zwraca ich liczbę."""
+        count = 0
+        with self._resolve_lock:
+            # Kroki kończą się w kolejności zlecenia - wystarczy sprawdzać początek kolejki
+            while self._unresolved and self._unresolved[0].resolve(self.start_ns):
+                self._account(self._unresolved.popleft())
+                count += 1
+        return count
+
+    def _account(self, timing):
+        self.timings.append(timing)
+        self.steps_resolved += 1
+        self.steps_coalesced += timing.coalesced
+        issue_ms = (timing.issued_ns - timing.commanded_ns) / 1e6
+        self.issue_lateness.observe(issue_ms)
+        self.issue_max_ms = issue_ms if self.issue_max_ms is None else max(self.issue_max_ms, issue_ms)
+        if timing.lateness_ns is not None and not timing.coalesced:
+            write_ms = timing.lateness_ns / 1e6
+            self.write_lateness.observe(write_ms)
+            self.write_max_ms = write_ms if self.write_max_ms is None else max(self.write_max_ms, write_ms)
+        if self._timing_writer is not None:
+            self._timing_writer.writerow(timing_row(timing))
+
+    def stats(self):
+        """Podsumowanie dokładności: liczba kroków, scalone ustawienia i opóźnienia zlecenia/zapisu [ms].
+
+        Percentyle to górne granice przedziałów histogramu (``LATENESS_BOUNDS``), maksimum jest dokładne.
+        """
+        self.resolve()
+        summary = {'steps': self.steps_resolved, 'coalesced': self.steps_coalesced}
+        for name, histogram, maximum in (('issue', self.issue_lateness, self.issue_max_ms),
+                                         ('write', self.write_lateness, self.write_max_ms)):
+            if maximum is not None:
+                summary.update({f'{name}_p50_ms': float(min(histogram.percentile(0.5), maximum)),
+                                f'{name}_p95_ms': float(min(histogram.percentile(0.95), maximum)),
+                                f'{name}_max_ms': maximum})
+        return summary
+
+    def close_timing(self):
+        """Dolicz ostatnie kroki i zamknij plik ``timing_path``."""
+        self.resolve()
+        if self._timing_file is not None:
+            self._timing_file.close()
+            self._timing_file = self._timing_writer = None
@@ -0,0 +1,414 @@
+"""Lokalne API sieciowe: REST do sterowania i WebSocket ze strumieniem próbek.
+
+Serwer działa we własnym wątku z pętlą asyncio i korzysta tylko z biblioteki
+standardowej (działa bez internetu). Wszyscy klienci WebSocket dostają próbki z
+jednego wątku akwizycji: serwer co ``batch_interval`` sekund pakuje nowe próbki w
+jedną ramkę binarną, którą wysyła każdemu subskrybentowi - liczba klientów nie
+zwiększa ruchu na porcie szeregowym. Wolny klient traci najstarsze ramki.
+
+Punkty końcowe (domyślnie http://127.0.0.1:8765):
+    GET  /api/state               ostatni odczyt, nastawy, wyjście, bajt STATUS?, próbki/s
+    GET  /api/stats               statystyki strumienia (energia, ładunek, min/max)
+    PUT  /api/voltage {"value": 5.0}
+    PUT  /api/current {"value": 0.5}
+    PUT  /api/output  {"value": true}
+    GET  /ws/samples              WebSocket: ramki binarne z rekordami ``SAMPLE_DTYPE``
+
+Ochrona przed stronami WWW otwartymi w przeglądarce na tym samym komputerze (żądania
+między witrynami, DNS rebinding): nagłówek Host musi wskazywać adres nasłuchu, localhost
+albo nazwę z ``allowed_hosts``; żądanie z nagłówkiem Origin innym niż adres samego
+serwera (także otwarcie WebSocket) dostaje 403; PUT/POST wymagają
+``Content-Type: application/json`` (przeglądarka nie wyśle go bez zgody serwera w CORS).
+
+Z bazą sesji (``store``, patrz ``korad_store``); czasy ``since``/``until`` jak w
+``korad_store.parse_time`` (np. ``30d``, ``2026-09-01``):
+    GET  /api/sessions?since=30d&channel=current&above=2    sesje (opcjonalnie z przekroczeniem progu)
+    GET  /api/aggregate?since=7d&device=COM3&by_session=1   statystyki zakresu
+    GET  /api/sessions/<id>/samples?since=...&until=...     próbki sesji (kolumny JSON)
+"""
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import logging
+import math
+import socket
+import sqlite3
+import struct
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+from korad_core import MAX_CURRENT, MAX_VOLTAGE
+from korad_metrics import REGISTRY, Counter, Gauge
+
+# Domyślny port serwera API
+API_PORT = 8765
+
+# Rekord próbki w ramce WebSocket: czas uniksowy [ns], napięcie [V], prąd [A] (little-endian)
+SAMPLE_DTYPE = np.dtype([('time_ns', '<i8'), ('voltage', '<f4'), ('current', '<f4')])
+
+# Najwięcej ramek oczekujących na wysłanie do jednego klienta
+CLIENT_QUEUE = 64
+
+# Najwięcej próbek w odpowiedzi /api/sessions/<id>/samples
+MAX_QUERY_SAMPLES = 1000000
+
+# Największa ramka przyjmowana od klienta WebSocket [B] - klient wysyła tylko ramki sterujące
+MAX_CLIENT_FRAME = 65536
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+               415: 'Unsupported Media Type', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+# Nazwy hosta zawsze dozwolone w nagłówkach Host i Origin
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# Adresy nasłuchu na wszystkich interfejsach
+WILDCARD_HOSTS = ('', '0.0.0.0', '::')
+
+logger = logging.getLogger('korad.server')
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_safe(value):
+    """NaN i nieskończoności nie istnieją w JSON - zamień je na null."""
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def encode_frame(payload, opcode=0x2):
+    """Ramka WebSocket od serwera (bez maskowania, jedna ramka - FIN)."""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_frame(reader):
+    """Odczytaj ramkę klienta; zwraca (opcode, dane). Ramka dłuższa niż MAX_CLIENT_FRAME - ValueError."""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+    if length > MAX_CLIENT_FRAME:
+        raise ValueError(f'Ramka WebSocket {length} B - najwięcej {MAX_CLIENT_FRAME} B')
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+    return first & 0x0F, payload
+
+
+class ApiServer(threading.Thread):
+    """Serwer REST/WebSocket dla wątku akwizycji ``worker`` (``AcquisitionWorker``).
+
+    ``worker`` można podmienić w trakcie działania (np. po ponownym połączeniu w GUI);
+    None - brak zasilacza, żądania sterujące dostają 503. ``store`` - baza sesji
+    (``korad_store.SessionStore``) dla zapytań o zapisane sesje. ``allowed_hosts`` -
+    dodatkowe nazwy hosta, pod którymi klienci łączą się z serwerem (np. przy nasłuchu
+    na 0.0.0.0).
+    """
+
+    def __init__(self, worker=None, host='127.0.0.1', port=API_PORT, batch_interval=0.1, store=None,
+                 allowed_hosts=()):
+        super().__init__(daemon=True)
+        self.worker = worker
+        self.store = store
+        self.allowed_hosts = {name.lower() for name in (host, *LOCAL_HOSTS, *allowed_hosts)}
+        if host in WILDCARD_HOSTS:
+            self.allowed_hosts.update((socket.gethostname().lower(), socket.getfqdn().lower()))
+        self.batch_interval = batch_interval
+        # Port zajęty -> OSError już tutaj, w wątku wywołującym
+        self.socket = socket.create_server((host, port))
+        self.port = self.socket.getsockname()[1]
+        self.loop = asyncio.new_event_loop()
+        self.clients = set()  # Kolejki ramek klientów WebSocket
+        self._buffer = collections.deque(maxlen=100000)  # Próbki od wątku akwizycji
+        self._subscribed = None
+        self._stopped = None
+        self._tasks = set()  # Obsługa połączeń klientów - anulowana przy zatrzymaniu
+        # Przesunięcie zegara perf_counter_ns -> czas uniksowy dla próbek w strumieniu
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+        labels = {'port': str(self.port)}
+        self.frames_sent = Counter('korad_api_frames_total', 'Ramki próbek wysłane do klientów WebSocket', labels)
+        self.frames_dropped = Counter('korad_api_frames_dropped_total',
+                                      'Ramki pominięte dla wolnych klientów WebSocket', labels)
+        self.requests = Counter('korad_api_requests_total', 'Żądania HTTP do API', labels)
+        self.metrics = [self.frames_sent, self.frames_dropped, self.requests,
+                        Gauge('korad_api_clients', 'Podłączeni klienci WebSocket', labels, lambda: len(self.clients))]
+        REGISTRY.register(*self.metrics)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            self._subscribe(None)
+            REGISTRY.unregister(*self.metrics)
+            self.loop.close()
+
+    def stop(self, timeout=3.0):
+        if self.is_alive():
+            self.loop.call_soon_threadsafe(lambda: self._stopped and self._stopped.set())
+            self.join(timeout)
+        else:
+            self.socket.close()
+            REGISTRY.unregister(*self.metrics)
+
+    async def _serve(self):
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self._handle, sock=self.socket)
+        broadcaster = asyncio.ensure_future(self._broadcast())
+        logger.info('API dostępne pod http://%s:%d', *self.socket.getsockname()[:2])
+        await self._stopped.wait()
+        broadcaster.cancel()
+        server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await server.wait_closed()
+
+    def _subscribe(self, worker):
+        """Przepnij bufor próbek do (nowego) wątku akwizycji."""
+        if self._subscribed is worker:
+            return
+        if self._subscribed is not None:
+            self._subscribed.unsubscribe(self._buffer)
+        self._buffer.clear()
+        if worker is not None:
+            worker.subscribe(self._buffer)
+        self._subscribed = worker
+
+    async def _broadcast(self):
+        """Co ``batch_interval`` spakuj nowe próbki w jedną ramkę i przekaż ją wszystkim klientom."""
+        while True:
+            await asyncio.sleep(self.batch_interval)
+            self._subscribe(self.worker)
+            samples = []
+            while True:
+                try:
+                    samples.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if not samples or not self.clients:
+                continue
+            records = np.empty(len(samples), dtype=SAMPLE_DTYPE)
+            rows = np.array(samples, dtype=np.float64)
+            records['time_ns'] = np.array([sample[0] for sample in samples], dtype=np.int64) + self._epoch_offset_ns
+            records['voltage'] = rows[:, 1]
+            records['current'] = rows[:, 2]
+            frame = encode_frame(records.tobytes())  # Jedna ramka współdzielona przez wszystkich klientów
+            for queue in self.clients:
+                if queue.full():
+                    queue.get_nowait()
+                    self.frames_dropped.inc()
+                queue.put_nowait(frame)
+
+    async def _handle(self, reader, writer):
+        self._tasks.add(asyncio.current_task())
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, path, _ = request_line.split(' ', 2)
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+            self.requests.inc()
+            path, _, query = path.partition('?')
+            body = b''
+            try:
+                self._check_origin(method, headers)
+                if path == '/ws/samples' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(reader, writer, headers)
+                    return
+                body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+                if path.startswith(('/api/sessions', '/api/aggregate')):
+                    # Zapytanie do bazy może rozpakowywać bloki danych - poza pętlą asyncio
+                    result = await self.loop.run_in_executor(None, self._query, method, path, query)
+                else:
+                    result = self._route(method, path, body)
+                status = 200
+            except HttpError as e:
+                status, result = e.status, {'error': str(e)}
+            payload = json.dumps(_json_safe(result)).encode()
+            writer.write(f'HTTP/1.1 {status} {HTTP_STATUS[status]}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode() + payload)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError) as e:
+            logger.debug('Przerwane połączenie API: %s', e)
+        except asyncio.CancelledError:  # Zatrzymanie serwera
+            pass
+        finally:
+            self._tasks.discard(asyncio.current_task())
+            writer.close()
+
+    def _check_origin(self, method, headers):
+        """Odrzuć żądania z obcym Host/Origin i zapisy bez JSON (ochrona przed stronami WWW)."""
+        host = headers.get('host')
+        if host is not None and not self._own_address(host):
+            raise HttpError(403, f'Niedozwolony nagłówek Host: {host}')
+        origin = headers.get('origin')
+        if origin is not None:
+            scheme, _, address = origin.partition('://')
+            if scheme.lower() != 'http' or not self._own_address(address, default_port=80):
+                raise HttpError(403, f'Niedozwolone źródło żądania: {origin}')
+        if method in ('PUT', 'POST'):
+            content_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+            if content_type != 'application/json':
+                raise HttpError(415, 'Wymagany Content-Type: application/json')
+
+    def _own_address(self, address, default_port=None):
+        """Czy ``host[:port]`` wskazuje ten serwer (dozwolona nazwa hosta i port nasłuchu)."""
+        try:
+            parts = urllib.parse.urlsplit('//' + address)
+            port = parts.port or default_port
+        except ValueError:
+            return False
+        if parts.path or parts.username is not None or parts.password is not None:
+            return False
+        return parts.hostname in self.allowed_hosts and port in (None, self.port)
+
+    def _route(self, method, path, body):
+        worker = self.worker
+        if path == '/api/state' and method == 'GET':
+            if worker is None:
+                return {'connected': False}
+            last = worker.stats.snapshot()
+            sample = worker.samples[-1] if worker.samples else None
+            return {'connected': True, 'name': worker.name, 'sample_rate': worker.sample_rate,
+                    'voltage': sample[1] if sample else None, 'current': sample[2] if sample else None,
+                    'power': last['power'], 'setpoints': dict(worker.setpoints), 'state': worker.state.snapshot()}
+        if path == '/api/stats' and method == 'GET':
+            if worker is None:
+                raise HttpError(503, 'Brak połączenia z zasilaczem')
+            return worker.stats.snapshot()
+        controls = {'/api/voltage': ('voltage', MAX_VOLTAGE), '/api/current': ('current', MAX_CURRENT),
+                    '/api/output': ('output', None)}
+        if path not in controls:
+            raise HttpError(404, f'Nieznany zasób: {path}')
+        if method not in ('PUT', 'POST'):
+            raise HttpError(405, 'Dozwolone: PUT')
+        if worker is None:
+            raise HttpError(503, 'Brak połączenia z zasilaczem')
+        try:
+            value = json.loads(body or b'{}')['value']
+        except (ValueError, KeyError, TypeError):
+            raise HttpError(400, 'Oczekiwano {"value": ...}')
+        name, maximum = controls[path]
+        if name == 'output':
+            if not isinstance(value, bool):
+                raise HttpError(400, 'Wyjście: true/false')
+            worker.send('OUT1' if value else 'OUT0')
+        else:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= maximum:
+                raise HttpError(400, f'Wartość poza zakresem 0-{maximum}')
+            worker.send(f'VSET1:{value:.2f}' if name == 'voltage' else f'ISET1:{value:.3f}')
+        return {name: value}
+
+    def _query(self, method, path, query):
+        """Zapytania do bazy sesji (wątek pomocniczy); błąd bazy - 500."""
+        try:
+            return self._query_store(method, path, query)
+        except sqlite3.Error as e:
+            logger.error('Błąd bazy sesji (%s): %s', path, e)
+            raise HttpError(500, f'Błąd bazy sesji: {e}')
+
+    def _query_store(self, method, path, query):
+        from korad_store import parse_time
+
+        store = self.store
+        if store is None:
+            raise HttpError(503, 'Serwer działa bez bazy sesji')
+        if method != 'GET':
+            raise HttpError(405, 'Dozwolone: GET')
+        params = dict(urllib.parse.parse_qsl(query))
+        try:
+            t0 = parse_time(params['since']) if params.get('since') else None
+            t1 = parse_time(params['until']) if params.get('until') else None
+            above = float(params['above']) if params.get('above') else None
+            below = float(params['below']) if params.get('below') else None
+            session = int(params['session']) if params.get('session') else None
+        except ValueError as e:
+            raise HttpError(400, str(e))
+        channel = params.get('channel', 'current')
+        if channel not in ('current', 'voltage'):
+            raise HttpError(400, 'channel: current albo voltage')
+        device = params.get('device')
+        if path == '/api/sessions':
+            return {'sessions': store.sessions(t0, t1, device, channel, above, below)}
+        if path == '/api/aggregate':
+            return store.aggregate(t0, t1, device, session, by_session=params.get('by_session') in ('1', 'true'))
+        parts = path.split('/')  # ['', 'api', 'sessions', '<id>', 'samples']
+        if len(parts) != 5 or parts[4] != 'samples' or not parts[3].isdigit():
+            raise HttpError(404, f'Nieznany zasób: {path}')
+        # Liczba próbek z indeksu (rozpakowywane są tylko czasy bloków na granicach) - przed odczytem danych
+        if store.count(int(parts[3]), t0, t1) > MAX_QUERY_SAMPLES:
+            raise HttpError(400, f'Ponad {MAX_QUERY_SAMPLES} próbek - zawęź zakres since/until')
+        columns = store.read(int(parts[3]), t0, t1)
+        return {name: values.tolist() for name, values in columns.items()}
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get('sec-websocket-key', '').encode()
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest()).decode()
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                      f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode())
+        await writer.drain()
+        queue = asyncio.Queue(CLIENT_QUEUE)
+        self.clients.add(queue)
+        receiver = asyncio.ensure_future(self._receive(reader, writer, queue))
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    writer.write(encode_frame(b'', 0x8))
+                    await writer.drain()
+                    return
+                writer.write(frame)
+                await writer.drain()
+                self.frames_sent.inc()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(queue)
+            receiver.cancel()
+
+    async def _receive(self, reader, writer, queue):
+        """Obsłuż ramki sterujące klienta (ping, zamknięcie); dane od klienta są ignorowane."""
+        try:
+            while True:
+                opcode, payload = await read_frame(reader)
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    writer.write(encode_frame(payload, 0xA))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning('Zamknięto połączenie WebSocket: %s', e)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(None)
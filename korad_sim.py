@@ -0,0 +1,291 @@
+"""Symulator zasilacza KORAD do pracy bez sprzętu (rozwój, testy, benchmarki).
+
+Symulator udaje obiekt ``serial.Serial`` (write/readline/read/reset_input_buffer/close),
+więc można go przekazać bezpośrednio do AcquisitionWorker, KoradProtocol lub
+DeviceManager.add. Adres ``sim://`` w ``open_port`` otwiera symulator zamiast portu,
+np. ``sim://?latency=0.02&load=10&drop=0.01``.
+"""
+import math
+import os
+import random
+import threading
+import time
+import urllib.parse
+
+import serial
+
+
+class SimulatedLoad:
+    """Obciążenie rezystancyjne; ``resistance=None`` oznacza rozwarte wyjście."""
+
+    def __init__(self, resistance=10.0):
+        self.resistance = resistance
+
+    def operating_point(self, vset, iset):
+        """Punkt pracy (napięcie, prąd, tryb CV/CC) dla zadanych ograniczeń."""
+        if self.resistance is None:
+            return vset, 0.0, 'CV'
+        if self.resistance <= 0:
+            return 0.0, iset, 'CC'  # Zwarcie
+        if vset / self.resistance <= iset:
+            return vset, vset / self.resistance, 'CV'
+        return iset * self.resistance, iset, 'CC'
+
+
+class SimulatedKorad:
+    """Zasilacz KORAD KA3005P w pamięci, z opóźnieniami, przepustowością łącza i wstrzykiwaniem błędów.
+
+    Czas jest modelowany jak na prawdziwym łączu: bajty zapytania potrzebują
+    10 bitów / ``baudrate`` na przesłanie, zasilacz odpowiada po ``latency`` sekundach,
+    a odpowiedź znów jest przesyłana z prędkością łącza. ``drop_rate`` i
+    ``garble_rate`` to prawdopodobieństwa zgubienia lub przekłamania odpowiedzi.
+    ``response_time`` to stała czasowa wyjścia [s] - po zmianie ustawień pomiar dochodzi
+    wykładniczo do nowego punktu pracy (0 - natychmiast).
+    """
+
+    IDN = 'KORAD KA3005P V5.8 SN:SIM00001'
+
+    def __init__(self, latency=0.005, baudrate=9600, load=None, timeout=2, drop_rate=0.0,
+                 garble_rate=0.0, noise=0.0, seed=None, idn=None, response_time=0.0):
+        self.latency = latency
+        self.baudrate = baudrate  # None - bez ograniczania przepustowości
+        self.load = load if load is not None else SimulatedLoad()
+        self.timeout = timeout
+        self.drop_rate = drop_rate
+        self.garble_rate = garble_rate
+        self.noise = noise  # Odchylenie standardowe szumu pomiaru (względne)
+        self.response_time = response_time
+        self.idn = idn or self.IDN
+        self.port = 'sim://'  # Jak serial.Serial.port - nazwa w logach i metrykach
+        self.is_open = True
+
+        self.vset = 0.0
+        self.iset = 0.0
+        self.output = False
+        self.commands_received = 0
+        self._transient = (0.0, 0.0, time.monotonic())  # Punkt pracy w chwili ostatniej zmiany
+
+        self._random = random.Random(seed)
+        self._cond = threading.Condition()
+        self._replies = []  # (czas gotowości wg time.monotonic, bajty)
+        self._input = b''
+        self._link_free = time.monotonic()  # Kiedy łącze skończy przesyłać poprzednie bajty
+
+    def _transfer_time(self, size):
+        return size * 10 / self.baudrate if self.baudrate else 0.0
+
+    # Interfejs zgodny z serial.Serial
+
+    def write(self, data):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        now = time.monotonic()
+        with self._cond:
+            self._link_free = max(self._link_free, now) + self._transfer_time(len(data))
+            self._input += bytes(data)
+            while b'\n' in self._input:
+                line, self._input = self._input.split(b'\n', 1)
+                reply = self._handle(line.decode(errors='replace').strip())
+                if reply is None:
+                    continue
+                # Odpowiedzi tekstowe kończą się znakiem nowej linii, bajt STATUS? - nie (jak w zasilaczu)
+                reply = self._inject_faults(reply if isinstance(reply, bytes) else reply.encode() + b'\n')
+                if reply is None:
+                    continue
+                self._link_free += self.latency + self._transfer_time(len(reply))
+                self._replies.append((self._link_free, reply))
+            self._cond.notify_all()
+        return len(data)
+
+    def readline(self):
+        return self._read(lambda buffer: buffer.find(b'\n') + 1 if b'\n' in buffer else 0)
+
+    def read(self, size=1):
+        return self._read(lambda buffer: size if len(buffer) >= size else 0)
+
+    def _read(self, complete):
+        if not self.is_open:
+            raise serial.PortNotOpenError()
+        deadline = time.monotonic() + (self.timeout if self.timeout is not None else 1e9)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = b''.join(data for ready_at, data in self._replies if ready_at <= now)
+                size = complete(ready)
+                if size:
+                    self._consume(size)
+                    return ready[:size]
+                if now >= deadline:
+                    # Przekroczony czas - zwróć to, co zdążyło dotrzeć (jak pyserial)
+                    self._consume(len(ready))
+                    return ready
+                pending = [ready_at for ready_at, _ in self._replies if ready_at > now]
+                wait = min([deadline] + pending) - now
+                self._cond.wait(max(wait, 0.0005))
+
+    def _consume(self, size):
+        while size and self._replies:
+            ready_at, data = self._replies[0]
+            if len(data) <= size:
+                self._replies.pop(0)
+                size -= len(data)
+            else:
+                self._replies[0] = (ready_at, data[size:])
+                size = 0
+
+    @property
+    def in_waiting(self):
+        now = time.monotonic()
+        with self._cond:
+            return sum(len(data) for ready_at, data in self._replies if ready_at <= now)
+
+    def reset_input_buffer(self):
+        with self._cond:
+            now = time.monotonic()
+            self._replies = [(ready_at, data) for ready_at, data in self._replies if ready_at > now]
+
+    def reset_output_buffer(self):
+        with self._cond:
+            self._input = b''
+
+    def close(self):
+        self.is_open = False
+        with self._cond:
+            self._cond.notify_all()
+
+    # Model zasilacza
+
+    def _target(self):
+        if not self.output:
+            return 0.0, 0.0, 'CV'
+        return self.load.operating_point(self.vset, self.iset)
+
+    def _settling(self):
+        """Punkt pracy bez szumu, z uwzględnieniem stałej czasowej wyjścia."""
+        voltage, current, mode = self._target()
+        if self.response_time:
+            start_voltage, start_current, changed_at = self._transient
+            weight = math.exp(-(time.monotonic() - changed_at) / self.response_time)
+            voltage += (start_voltage - voltage) * weight
+            current += (start_current - current) * weight
+        return voltage, current, mode
+
+    def _setpoint_changed(self):
+        voltage, current, _ = self._settling()
+        self._transient = (voltage, current, time.monotonic())
+
+    def measure(self):
+        """Aktualny punkt pracy (napięcie, prąd, tryb) z uwzględnieniem wyjścia i szumu."""
+        voltage, current, mode = self._settling()
+        if self.noise:
+            voltage *= 1 + self._random.gauss(0, self.noise)
+            current *= 1 + self._random.gauss(0, self.noise)
+        return max(voltage, 0.0), max(current, 0.0), mode
+
+    def status(self):
+        """Bajt STATUS?: bit 0 - tryb CV (1) / CC (0), bit 6 - wyjście załączone."""
+        _, _, mode = self.measure()
+        return (1 if mode == 'CV' else 0) | (0x40 if self.output else 0)
+
+    def _handle(self, command):
+        """Wykonaj komendę; zwraca tekst odpowiedzi albo None."""
+        self.commands_received += 1
+        if command == '*IDN?':
+            return self.idn
+        if command == 'VSET1?':
+            return f'{self.vset:05.2f}'
+        if command == 'ISET1?':
+            return f'{self.iset:.3f}'
+        if command == 'VOUT1?':
+            return f'{self.measure()[0]:05.2f}'
+        if command == 'IOUT1?':
+            return f'{self.measure()[1]:.3f}'
+        if command == 'STATUS?':
+            return bytes([self.status()])
+        if command.startswith(('VSET1:', 'ISET1:', 'OUT')):
+            self._setpoint_changed()
+        if command.startswith('VSET1:'):
+            self.vset = min(max(_parse(command[6:], self.vset), 0.0), 31.0)
+        elif command.startswith('ISET1:'):
+            self.iset = min(max(_parse(command[6:], self.iset), 0.0), 5.1)
+        elif command in ('OUT0', 'OUT1'):
+            self.output = command == 'OUT1'
+        return None
+
+    def _inject_faults(self, reply):
+        if self.drop_rate and self._random.random() < self.drop_rate:
+            return None
+        if self.garble_rate and self._random.random() < self.garble_rate:
+            data = bytearray(reply)
+            data[self._random.randrange(max(len(data) - 1, 1))] = self._random.choice(b'#?x\xff')
+            return bytes(data)
+        return reply
+
+
+def _parse(text, default):
+    try:
+        return float(text)
+    except ValueError:
+        return default
+
+
+def simulator_from_url(url, timeout=2):
+    """Utwórz symulator z adresu ``sim://?latency=..&baud=..&load=..&drop=..&garble=..&noise=..&seed=..&tau=..``."""
+    options = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(url).query))
+    load = options.get('load', '10')
+    baudrate = options.get('baud', '9600')
+    return SimulatedKorad(
+        latency=float(options.get('latency', 0.005)),
+        baudrate=None if baudrate in ('0', 'none') else int(baudrate),
+        load=SimulatedLoad(None if load in ('open', 'none') else float(load)),
+        timeout=timeout,
+        drop_rate=float(options.get('drop', 0)),
+        garble_rate=float(options.get('garble', 0)),
+        noise=float(options.get('noise', 0)),
+        seed=int(options['seed']) if 'seed' in options else None,
+        idn=options.get('idn'),
+        response_time=float(options.get('tau', 0)),
+    )
+
+
+def open_port(port, baudrate=9600, timeout=2):
+    """Otwórz port szeregowy albo - dla adresów ``sim://`` - symulator zasilacza."""
+    if port.startswith('sim://'):
+        simulator = simulator_from_url(port, timeout)
+        simulator.port = port
+        return simulator
+    return serial.Serial(port, baudrate=baudrate, timeout=timeout, exclusive=True)
+
+
+class PtySimulator(threading.Thread):
+    """Symulator udostępniony jako wirtualny port (pseudoterminal, tylko POSIX).
+
+    Ścieżkę ``port`` można podać dowolnemu programowi obsługującemu port szeregowy.
+    """
+
+    def __init__(self, simulator=None):
+        super().__init__(daemon=True)
+        import tty
+        self.simulator = simulator or SimulatedKorad()
+        self.simulator.timeout = 0.05
+        self._master, slave = os.openpty()
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        import select
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([self._master], [], [], 0.01)
+                if readable:
+                    self.simulator.write(os.read(self._master, 1024))
+                while self.simulator.in_waiting:
+                    os.write(self._master, self.simulator.read(self.simulator.in_waiting))
+        finally:
+            os.close(self._master)
+            os.close(self._slave)
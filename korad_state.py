@@ -0,0 +1,171 @@
+"""Model stanu zasilacza: nastawy, wyjście i bajt STATUS? z pamięcią podręczną.
+
+Odczyt stanu (GUI, API, most SCPI) nie wysyła zapytań - zwraca ostatnią znaną
+wartość. Własny zapis (VSET1:, ISET1:, OUT0/OUT1) od razu ustawia wartość
+oczekiwaną i unieważnia potwierdzenie; po ``settle`` sekundach od ostatniego zapisu,
+a poza tym co ``interval`` sekund, stan jest ponownie odczytywany w tle z niskim
+priorytetem. Odczyt różny od wartości oczekiwanej (np. zmiana pokrętłem na panelu
+zasilacza albo zgubiona komenda) jest zgłaszany przez ``on_divergence``.
+"""
+import logging
+import threading
+import time
+
+from korad_metrics import Counter
+from korad_protocol import PRIORITY_POLL
+
+# Bity bajtu STATUS? (KA3005P): tryb CV (1) / CC (0), sygnał dźwiękowy, blokada panelu, wyjście
+STATUS_CV = 0x01
+STATUS_BEEP = 0x10
+STATUS_LOCK = 0x20
+STATUS_OUTPUT = 0x40
+
+# Różnica, od której odczyt uznaje się za rozbieżny z nastawą (rozdzielczość zasilacza)
+TOLERANCES = {'voltage': 0.005, 'current': 0.0005, 'output': 0}
+
+logger = logging.getLogger('korad.state')
+
+
+def parse_status(reply):
+    """Bajt STATUS? -> słownik: 'mode' ('CV'/'CC'), 'output', 'beep', 'lock', 'raw'."""
+    if len(reply) != 1:
+        raise ValueError(f'Nieprawidłowa odpowiedź STATUS?: {reply!r}')
+    raw = ord(reply)
+    return {'mode': 'CV' if raw & STATUS_CV else 'CC', 'output': bool(raw & STATUS_OUTPUT),
+            'beep': bool(raw & STATUS_BEEP), 'lock': bool(raw & STATUS_LOCK), 'raw': raw}
+
+
+class StateEntry:
+    """Wartość odczytana z zasilacza i wartość oczekiwana po własnym zapisie."""
+
+    def __init__(self):
+        self.value = None  # Ostatni odczyt z zasilacza
+        self.read_ns = None
+        self.expected = None  # Zapisana wartość jeszcze niepotwierdzona odczytem
+        self.writes = 0  # Licznik zapisów - odczyt zlecony przed zapisem go nie potwierdza
+
+    @property
+    def current(self):
+        return self.expected if self.expected is not None else self.value
+
+    @property
+    def confirmed(self):
+        return self.expected is None and self.value is not None
+
+
+class DeviceState:
+    """Stan zasilacza za protokołem ``protocol`` (``KoradProtocol``).
+
+    ``written`` woła właściciel protokołu przy każdej wysyłanej komendzie, ``poll`` -
+    regularnie w wątku akwizycji. ``setpoints`` to słownik bieżących nastaw
+    (oczekiwanych lub odczytanych) - ten sam obiekt przez cały czas życia modelu.
+    """
+
+    def __init__(self, protocol, interval=5.0, settle=0.5, on_divergence=None, labels=None):
+        self.protocol = protocol
+        self.interval = interval  # Okres odczytu stanu w tle [s] (None - tylko po zapisach i na żądanie)
+        self.settle = settle  # Opóźnienie odczytu po ostatnim zapisie [s]
+        self.on_divergence = on_divergence  # (nazwa, oczekiwana, odczytana) - w wątku protokołu
+        self.entries = {name: StateEntry() for name in ('voltage', 'current', 'output')}
+        self.status = None  # Ostatni zdekodowany STATUS?
+        self.setpoints = {name: None for name in self.entries}
+        self.divergences = Counter('korad_state_divergence_total',
+                                   'Odczyty stanu niezgodne z nastawą zapisaną przez aplikację', labels)
+        self._lock = threading.Lock()
+        self._next_ns = time.perf_counter_ns()  # Termin kolejnego odczytu w tle
+        self._pending = 0  # Zapytania bieżącego odczytu bez odpowiedzi
+
+    def written(self, command):
+        """Uwzględnij własny zapis: wartość oczekiwana i odczyt kontrolny po ``settle``."""
+        if command.startswith(('VSET1:', 'ISET1:')):
+            name = 'voltage' if command.startswith('VSET1:') else 'current'
+            try:
+                value = float(command[len('VSET1:'):])
+            except ValueError:
+                return
+        elif command in ('OUT0', 'OUT1'):
+            name, value = 'output', command == 'OUT1'
+        else:
+            return
+        with self._lock:
+            entry = self.entries[name]
+            entry.expected = value
+            entry.writes += 1
+            self.setpoints[name] = value
+            self._next_ns = time.perf_counter_ns() + int(self.settle * 1e9)
+
+    def get(self, name):
+        """Bieżąca wartość (oczekiwana albo odczytana; None - nieznana) - bez komunikacji z zasilaczem."""
+        return self.entries[name].current
+
+    def snapshot(self):
+        """Słownik: dla każdej nastawy 'value', 'device', 'confirmed', 'age_s'; do tego 'status'."""
+        now = time.perf_counter_ns()
+        with self._lock:
+            result = {name: {'value': entry.current, 'device': entry.value, 'confirmed': entry.confirmed,
+                             'age_s': None if entry.read_ns is None else (now - entry.read_ns) / 1e9}
+                      for name, entry in self.entries.items()}
+            result['status'] = dict(self.status) if self.status else None
+        return result
+
+    def poll(self):
+        """Zleć odczyt stanu, jeśli minął termin (wołane w pętli wątku akwizycji)."""
+        if self._pending or time.perf_counter_ns() < self._next_ns:
+            return
+        self.revalidate()
+
+    def revalidate(self, callback=None, priority=PRIORITY_POLL):
+        """Zleć odczyt VSET1?, ISET1? i STATUS?; ``callback(błąd albo None)`` po ostatniej odpowiedzi."""
+        queries = (('VSET1?', 'voltage'), ('ISET1?', 'current'), ('STATUS?', 'output'))
+        with self._lock:
+            self._pending += len(queries)
+            interval_ns = int(self.interval * 1e9) if self.interval else 1 << 62
+            self._next_ns = time.perf_counter_ns() + interval_ns
+            writes = {name: self.entries[name].writes for _, name in queries}
+        errors = []
+        remaining = [len(queries)]
+
+        def on_reply(request, name):
+            if request.error:
+                errors.append(request.error)
+            else:
+                try:
+                    self._update(name, request.reply, writes[name])
+                except ValueError as e:
+                    errors.append(e)
+            with self._lock:
+                self._pending -= 1
+                remaining[0] -= 1
+                last = not remaining[0]
+            if last and callback:
+                callback(errors[0] if errors else None)
+
+        for command, name in queries:
+            self.protocol.submit(command, priority, lambda request, name=name: on_reply(request, name))
+
+    def _update(self, name, reply, writes):
+        """Zapisz odczyt i porównaj z wartością oczekiwaną (o ile od zlecenia odczytu nic nie zapisano)."""
+        if name == 'output':
+            status = parse_status(reply)
+            value = status['output']
+        else:
+            value = float(reply)
+        divergence = None
+        with self._lock:
+            if name == 'output':
+                self.status = status
+            entry = self.entries[name]
+            previous = entry.current
+            entry.value = value
+            entry.read_ns = time.perf_counter_ns()
+            if entry.writes != writes:
+                return  # Zapis w trakcie odczytu - potwierdzi go kolejny odczyt
+            if previous is not None and abs(value - previous) > TOLERANCES[name]:
+                divergence = (name, previous, value)
+            entry.expected = None
+            self.setpoints[name] = value
+        if divergence:
+            self.divergences.inc()
+            logger.warning('Stan zasilacza różni się od nastawy: %s oczekiwano %s, odczytano %s', *divergence)
+            if self.on_divergence:
+                self.on_divergence(*divergence)
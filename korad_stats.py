@@ -0,0 +1,221 @@
+"""Statystyki strumieniowe odczytów: moc, energia (Wh) i ładunek (Ah), min/max/średnia/RMS, okno przesuwne.
+
+Każda próbka aktualizuje statystyki w czasie O(1) - nic nie jest przeliczane z
+historii, więc sumy są dokładne także po wielu dniach pracy (do całkowania użyto
+sumowania z kompensacją Kahana). Próbka z NaN przerywa całkowanie (przerwa w
+danych nie jest interpolowana), podobnie jak odstęp dłuższy niż ``max_gap``.
+"""
+import collections
+import math
+import threading
+
+# Kanały statystyk: napięcie [V], prąd [A], moc [W]
+CHANNELS = ('voltage', 'current', 'power')
+
+
+class RunningStats:
+    """Liczba, min, max, średnia, odchylenie standardowe (Welford) i RMS jednej wielkości."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # Suma kwadratów odchyleń od średniej
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count else math.nan
+
+    @property
+    def rms(self):
+        # Średnia kwadratów = wariancja + kwadrat średniej
+        return math.sqrt(self.variance + self.mean * self.mean) if self.count else math.nan
+
+    def snapshot(self):
+        if not self.count:
+            return {'count': 0, 'min': math.nan, 'max': math.nan, 'mean': math.nan, 'std': math.nan,
+                    'rms': math.nan}
+        return {'count': self.count, 'min': self.minimum, 'max': self.maximum, 'mean': self.mean,
+                'std': self.std, 'rms': self.rms}
+
+
+class KahanSum:
+    """Suma z kompensacją błędu zaokrągleń (Kahan-Babuška) - dokładna przy miliardach składników."""
+
+    def __init__(self):
+        self.total = 0.0
+        self._compensation = 0.0
+
+    def add(self, value):
+        total = self.total + value
+        if abs(self.total) >= abs(value):
+            self._compensation += (self.total - total) + value
+        else:
+            self._compensation += (value - total) + self.total
+        self.total = total
+
+    @property
+    def value(self):
+        return self.total + self._compensation
+
+
+class EnergyCounter:
+    """Energia [Wh] i ładunek [Ah] z całkowania metodą trapezów po kolejnych próbkach."""
+
+    def __init__(self, max_gap=10.0):
+        self.max_gap = max_gap  # Dłuższy odstęp między próbkami nie jest całkowany [s]
+        self.reset()
+
+    def reset(self):
+        self._energy = KahanSum()  # [J]
+        self._charge = KahanSum()  # [C]
+        self.integrated_time = 0.0  # Czas objęty całkowaniem [s]
+        self.gaps = 0  # Liczba przerw pominiętych w całkowaniu
+        self._previous = None  # (czas_ns, napięcie, prąd) poprzedniej próbki
+
+    def update(self, timestamp_ns, voltage, current):
+        if math.isnan(voltage) or math.isnan(current):
+            if self._previous is not None:
+                self.gaps += 1
+            self._previous = None
+            return
+        previous = self._previous
+        self._previous = (timestamp_ns, voltage, current)
+        if previous is None:
+            return
+        dt = (timestamp_ns - previous[0]) / 1e9
+        if dt <= 0:
+            return
+        if dt > self.max_gap:
+            self.gaps += 1
+            return
+        self._energy.add((previous[1] * previous[2] + voltage * current) / 2 * dt)
+        self._charge.add((previous[2] + current) / 2 * dt)
+        self.integrated_time += dt
+
+    @property
+    def energy_wh(self):
+        return self._energy.value / 3600
+
+    @property
+    def charge_ah(self):
+        return self._charge.value / 3600
+
+
+class SlidingWindow:
+    """Średnia, min i max z ostatnich ``duration`` sekund - zamortyzowane O(1) na próbkę.
+
+    Min i max są utrzymywane w kolejkach monotonicznych, średnia jako suma bieżąca.
+    """
+
+    def __init__(self, duration=60.0):
+        self.duration_ns = int(duration * 1e9)
+        self.reset()
+
+    def reset(self):
+        self._samples = collections.deque()  # (czas_ns, wartość)
+        self._minima = collections.deque()  # Rosnące wartości - kandydaci na minimum
+        self._maxima = collections.deque()  # Malejące wartości - kandydaci na maksimum
+        self._sum = KahanSum()
+
+    def update(self, timestamp_ns, value):
+        self._samples.append((timestamp_ns, value))
+        self._sum.add(value)
+        while self._minima and self._minima[-1][1] >= value:
+            self._minima.pop()
+        self._minima.append((timestamp_ns, value))
+        while self._maxima and self._maxima[-1][1] <= value:
+            self._maxima.pop()
+        self._maxima.append((timestamp_ns, value))
+        self._expire(timestamp_ns)
+
+    def _expire(self, now_ns):
+        cutoff = now_ns - self.duration_ns
+        while self._samples and self._samples[0][0] < cutoff:
+            _, value = self._samples.popleft()
+            self._sum.add(-value)
+        while self._minima and self._minima[0][0] < cutoff:
+            self._minima.popleft()
+        while self._maxima and self._maxima[0][0] < cutoff:
+            self._maxima.popleft()
+
+    def snapshot(self):
+        count = len(self._samples)
+        if not count:
+            return {'count': 0, 'mean': math.nan, 'min': math.nan, 'max': math.nan}
+        return {'count': count, 'mean': self._sum.value / count, 'min': self._minima[0][1],
+                'max': self._maxima[0][1]}
+
+
+class StreamStats:
+    """Komplet statystyk strumienia próbek (czas_ns, napięcie, prąd) - bezpieczny dla wielu wątków.
+
+    ``update`` woła wątek akwizycji przy każdej próbce, ``snapshot`` może być wołane z GUI.
+    """
+
+    def __init__(self, window=60.0, max_gap=10.0):
+        self._lock = threading.Lock()
+        self.totals = {channel: RunningStats() for channel in CHANNELS}
+        self.windows = {channel: SlidingWindow(window) for channel in CHANNELS}
+        self.energy = EnergyCounter(max_gap)
+        self.first_ns = None
+        self.last = None  # Ostatnia próbka (czas_ns, napięcie, prąd, moc)
+
+    def reset(self):
+        with self._lock:
+            for stats in self.totals.values():
+                stats.reset()
+            for window in self.windows.values():
+                window.reset()
+            self.energy.reset()
+            self.first_ns = None
+            self.last = None
+
+    def update(self, timestamp_ns, voltage, current):
+        with self._lock:
+            self.energy.update(timestamp_ns, voltage, current)
+            if math.isnan(voltage) or math.isnan(current):
+                return  # Znacznik przerwy - tylko przerywa całkowanie
+            power = voltage * current
+            if self.first_ns is None:
+                self.first_ns = timestamp_ns
+            self.last = (timestamp_ns, voltage, current, power)
+            for channel, value in zip(CHANNELS, (voltage, current, power)):
+                self.totals[channel].update(value)
+                self.windows[channel].update(timestamp_ns, value)
+
+    def extend(self, samples):
+        for timestamp_ns, voltage, current in samples:
+            self.update(timestamp_ns, voltage, current)
+
+    def snapshot(self):
+        """Słownik: 'energy_wh', 'charge_ah', 'power', 'duration_s', 'gaps', 'total' i 'window' (na kanał)."""
+        with self._lock:
+            return {
+                'power': self.last[3] if self.last else math.nan,
+                'energy_wh': self.energy.energy_wh,
+                'charge_ah': self.energy.charge_ah,
+                'integrated_s': self.energy.integrated_time,
+                'duration_s': (self.last[0] - self.first_ns) / 1e9 if self.last else 0.0,
+                'gaps': self.energy.gaps,
+                'total': {channel: stats.snapshot() for channel, stats in self.totals.items()},
+                'window': {channel: window.snapshot() for channel, window in self.windows.items()},
+            }
@@ -0,0 +1,515 @@
+"""Baza sesji: kolumnowy zapis odczytów wielu sesji z indeksem czasu i zakresów wartości.
+
+Próbki sesji (jeden przebieg rejestracji jednego zasilacza) są dzielone na bloki.
+Kolumny bloku - czas (przyrosty int64), napięcie i prąd (float32) - są kompresowane
+osobno zlib i trzymane w jednym pliku SQLite razem z indeksem: dla każdego bloku i
+każdej sesji czas pierwszej i ostatniej próbki, min/max napięcia i prądu oraz sumy
+potrzebne do średnich, energii i ładunku. Zapytanie zawęża sesje i bloki samym
+indeksem, a rozpakowuje tylko bloki leżące na krawędzi zakresu czasu albo takie,
+w których szukana wartość może wystąpić - "sesje z prądem powyżej 2 A w ostatnim
+miesiącu" przy tysiącach sesji czyta wiersze indeksu, nie surowe dane.
+
+Czas w bazie to czas uniksowy [ns] (``StoreWriter`` przelicza perf_counter_ns próbek
+z wątku akwizycji). Próbki NaN (znacznik przerwy w danych) są zapisywane, ale
+pomijane w podsumowaniach.
+"""
+import collections
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+STORE_PATH = os.path.join(os.path.expanduser('~'), '.korad_ps', 'sessions.sqlite')
+
+# Największa liczba próbek w bloku
+CHUNK_SIZE = 4096
+
+# Kolumny min/max kanałów w tabelach sesji i bloków
+LIMIT_COLUMNS = {'voltage': ('v_min', 'v_max'), 'current': ('i_min', 'i_max')}
+
+# Podsumowanie zakresu danych - wspólne dla sesji i bloków
+_SUMMARY_COLUMNS = """
+    t_min INTEGER, t_max INTEGER, count INTEGER NOT NULL DEFAULT 0, valid INTEGER NOT NULL DEFAULT 0,
+    v_min REAL, v_max REAL, i_min REAL, i_max REAL,
+    v_sum REAL NOT NULL DEFAULT 0, i_sum REAL NOT NULL DEFAULT 0, p_sum REAL NOT NULL DEFAULT 0,
+    energy_j REAL NOT NULL DEFAULT 0, charge_c REAL NOT NULL DEFAULT 0"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY, device TEXT NOT NULL, created_ns INTEGER NOT NULL, metadata TEXT,
+    {_SUMMARY_COLUMNS});
+CREATE INDEX IF NOT EXISTS sessions_time ON sessions (t_min);
+CREATE INDEX IF NOT EXISTS sessions_device ON sessions (device, t_min);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY, session INTEGER NOT NULL REFERENCES sessions (id),
+    {_SUMMARY_COLUMNS});
+CREATE INDEX IF NOT EXISTS chunks_session ON chunks (session, t_min);
+CREATE TABLE IF NOT EXISTS chunk_data (
+    chunk INTEGER PRIMARY KEY REFERENCES chunks (id), time_ns BLOB NOT NULL, voltage BLOB NOT NULL,
+    current BLOB NOT NULL);
+"""
+
+_SUMS = ('count', 'valid', 'v_sum', 'i_sum', 'p_sum', 'energy_j', 'charge_c')
+
+logger = logging.getLogger('korad.store')
+
+
+def encode_columns(times, voltages, currents):
+    """Skompresuj kolumny bloku; czas jako przyrosty (dobrze się kompresują przy stałym okresie)."""
+    deltas = np.diff(np.asarray(times, dtype=np.int64), prepend=np.int64(0))
+    return (zlib.compress(deltas.astype('<i8').tobytes()),
+            zlib.compress(np.asarray(voltages, dtype='<f4').tobytes()),
+            zlib.compress(np.asarray(currents, dtype='<f4').tobytes()))
+
+
+def decode_column(name, blob):
+    data = zlib.decompress(blob)
+    if name == 'time_ns':
+        return np.cumsum(np.frombuffer(data, dtype='<i8'))
+    return np.frombuffer(data, dtype='<f4')
+
+
+def summarise(times, voltages, currents, previous=None):
+    """Podsumowanie próbek do indeksu (słownik kolumn ``_SUMMARY_COLUMNS``).
+
+    ``previous`` - ostatnia próbka (czas_ns, napięcie, prąd) poprzedniego bloku; odcinek od
+    niej do pierwszej próbki wlicza się do energii i ładunku tego bloku.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    voltages = np.asarray(voltages, dtype=np.float64)
+    currents = np.asarray(currents, dtype=np.float64)
+    valid = np.isfinite(voltages) & np.isfinite(currents)
+    summary = dict.fromkeys(_SUMS, 0)
+    summary.update(t_min=int(times[0]), t_max=int(times[-1]), count=len(times), valid=int(valid.sum()),
+                   v_min=None, v_max=None, i_min=None, i_max=None)
+    if summary['valid']:
+        v, i = voltages[valid], currents[valid]
+        summary.update(v_min=float(v.min()), v_max=float(v.max()), i_min=float(i.min()), i_max=float(i.max()),
+                       v_sum=float(v.sum()), i_sum=float(i.sum()), p_sum=float((v * i).sum()))
+
+    if previous is not None:
+        times = np.concatenate(([previous[0]], times))
+        voltages = np.concatenate(([previous[1]], voltages))
+        currents = np.concatenate(([previous[2]], currents))
+        valid = np.concatenate(([np.isfinite(previous[1]) and np.isfinite(previous[2])], valid))
+    if len(times) > 1:
+        # Całkowanie trapezami; odcinki z próbką NaN na którymkolwiek końcu są pomijane
+        segments = valid[:-1] & valid[1:]
+        dt = np.diff(times)[segments] / 1e9
+        power = voltages * currents
+        summary['energy_j'] = float(((power[:-1] + power[1:])[segments] * dt).sum() / 2)
+        summary['charge_c'] = float(((currents[:-1] + currents[1:])[segments] * dt).sum() / 2)
+    return summary
+
+
+class Totals:
+    """Sumowanie podsumowań bloków (i fragmentów bloków) w wynik zapytania agregującego."""
+
+    def __init__(self):
+        self.sums = dict.fromkeys(_SUMS, 0)
+        self.limits = {}  # kolumna min/max -> wartość
+        self.t_min = self.t_max = None
+
+    def add(self, summary):
+        for key in _SUMS:
+            self.sums[key] += summary[key]
+        for low, high in LIMIT_COLUMNS.values():
+            if summary[low] is not None:
+                self.limits[low] = min(self.limits.get(low, summary[low]), summary[low])
+                self.limits[high] = max(self.limits.get(high, summary[high]), summary[high])
+        if summary['t_min'] is not None:
+            self.t_min = summary['t_min'] if self.t_min is None else min(self.t_min, summary['t_min'])
+            self.t_max = summary['t_max'] if self.t_max is None else max(self.t_max, summary['t_max'])
+
+    def result(self):
+        valid = self.sums['valid']
+        result = {'start_ns': self.t_min, 'end_ns': self.t_max, 'samples': valid,
+                  'energy_wh': self.sums['energy_j'] / 3600, 'charge_ah': self.sums['charge_c'] / 3600,
+                  'power': {'mean': self.sums['p_sum'] / valid if valid else None}}
+        for channel, (low, high) in LIMIT_COLUMNS.items():
+            total = self.sums['v_sum' if channel == 'voltage' else 'i_sum']
+            result[channel] = {'min': self.limits.get(low), 'max': self.limits.get(high),
+                               'mean': total / valid if valid else None}
+        return result
+
+
+def parse_time(text, now=None):
+    """Czas z wiersza poleceń/zapytania API -> czas uniksowy [ns].
+
+    Przyjmuje czas względny wstecz (``30d``, ``12h``, ``15m``, ``90s``), datę i godzinę
+    w formacie ISO (czas lokalny) albo liczbę - czas uniksowy w sekundach.
+    """
+    now = time.time() if now is None else now
+    text = text.strip()
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([smhdw])', text)
+    if match:
+        seconds = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}[match.group(2)]
+        return int((now - float(match.group(1)) * seconds) * 1e9)
+    try:
+        return int(float(text) * 1e9)
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(text).timestamp() * 1e9)
+    except ValueError:
+        raise ValueError(f'Nieprawidłowy czas: {text!r} (np. 30d, 12h, 2026-09-01, 2026-09-01T08:00)') from None
+
+
+def _conditions(t0=None, t1=None, channel=None, above=None, below=None):
+    """Warunki WHERE na kolumnach podsumowania (wspólne dla sesji i bloków)."""
+    clauses, params = [], []
+    if t0 is not None:
+        clauses.append('t_max >= ?')
+        params.append(int(t0))
+    if t1 is not None:
+        clauses.append('t_min <= ?')
+        params.append(int(t1))
+    if above is not None or below is not None:
+        low, high = LIMIT_COLUMNS[channel]
+        if above is not None:
+            clauses.append(f'{high} > ?')
+            params.append(float(above))
+        if below is not None:
+            clauses.append(f'{low} < ?')
+            params.append(float(below))
+    return clauses, params
+
+
+class SessionStore:
+    """Baza sesji w pliku SQLite ``path``.
+
+    Połączenie jest współdzielone przez wątki (zapis w tle, zapytania API) i chronione
+    blokadą; tryb WAL pozwala czytać bazę z innych procesów w trakcie zapisu.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.chunks_decoded = 0  # Rozpakowane bloki - miara skuteczności indeksu
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=10.0, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_session(self, device, metadata=None, created_ns=None):
+        """Nowa (pusta) sesja; zwraca jej numer."""
+        created_ns = time.time_ns() if created_ns is None else created_ns
+        with self._lock, self._db:
+            cursor = self._db.execute('INSERT INTO sessions (device, created_ns, metadata) VALUES (?, ?, ?)',
+                                      (device, created_ns, json.dumps(metadata or {})))
+        return cursor.lastrowid
+
+    def append(self, session, times, voltages, currents, previous=None):
+        """Dopisz blok próbek do sesji (jedna transakcja: dane, indeks bloku i podsumowanie sesji)."""
+        summary = summarise(times, voltages, currents, previous)
+        columns = ', '.join(summary)
+        placeholders = ', '.join('?' * len(summary))
+        blobs = encode_columns(times, voltages, currents)
+        updates = ', '.join([f'{key} = {key} + :{key}' for key in _SUMS]
+                            + [f'{key} = coalesce({function}({key}, :{key}), :{key}, {key})'
+                               for key, function in (('t_min', 'min'), ('t_max', 'max'), ('v_min', 'min'),
+                                                     ('v_max', 'max'), ('i_min', 'min'), ('i_max', 'max'))])
+        with self._lock, self._db:
+            cursor = self._db.execute(f'INSERT INTO chunks (session, {columns}) VALUES (?, {placeholders})',
+                                      (session, *summary.values()))
+            self._db.execute('INSERT INTO chunk_data (chunk, time_ns, voltage, current) VALUES (?, ?, ?, ?)',
+                             (cursor.lastrowid, *blobs))
+            self._db.execute(f'UPDATE sessions SET {updates} WHERE id = :session', dict(summary, session=session))
+
+    def sessions(self, t0=None, t1=None, device=None, channel='current', above=None, below=None):
+        """Sesje z danymi w zakresie czasu [t0, t1] (ns, None - bez ograniczenia).
+
+        Z ``above``/``below`` - tylko sesje, w których ``channel`` przekroczył próg w tym
+        zakresie; wynik zawiera wtedy 'first_ns' - czas pierwszego przekroczenia.
+        """
+        clauses, params = _conditions(t0, t1, channel, above, below)
+        if device is not None:
+            clauses.append('device = ?')
+            params.append(device)
+        where = ' AND '.join(clauses) or '1'
+        with self._lock:
+            rows = self._db.execute(f'SELECT * FROM sessions WHERE {where} ORDER BY t_min', params).fetchall()
+        result = [_session_dict(row) for row in rows]
+        if above is None and below is None:
+            return result
+
+        # Podsumowanie sesji obejmuje całą sesję - dokładną odpowiedź dla zakresu dają bloki
+        chunk_clauses, chunk_params = _conditions(t0, t1, channel, above, below)
+        matches = []
+        for session in result:
+            with self._lock:
+                chunks = self._db.execute(
+                    f'SELECT id, t_min, t_max FROM chunks WHERE session = ? AND {" AND ".join(chunk_clauses)} '
+                    'ORDER BY t_min', [session['id'], *chunk_params]).fetchall()
+            for chunk in chunks:
+                first = self._first_crossing(chunk['id'], t0, t1, channel, above, below)
+                if first is not None:
+                    session['first_ns'] = first
+                    matches.append(session)
+                    break
+        return matches
+
+    def session(self, session):
+        """Podsumowanie jednej sesji (jak w ``sessions``); None - brak takiej sesji."""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM sessions WHERE id = ?', (session,)).fetchone()
+        return _session_dict(row) if row else None
+
+    def read(self, session, t0=None, t1=None, channels=('voltage', 'current')):
+        """Próbki sesji z zakresu [t0, t1]; słownik kolumn: 'time_ns' i wybrane ``channels``."""
+        clauses, params = _conditions(t0, t1)
+        clauses.insert(0, 'session = ?')
+        with self._lock:
+            chunks = [row['id'] for row in self._db.execute(
+                f'SELECT id FROM chunks WHERE {" AND ".join(clauses)} ORDER BY t_min', [session, *params])]
+        parts = [self._decode(chunk, channels) for chunk in chunks]
+        names = ('time_ns', *channels)
+        if not parts:
+            return {name: np.empty(0, dtype=np.int64 if name == 'time_ns' else np.float32) for name in names}
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in names}
+        mask = _window(columns['time_ns'], t0, t1)
+        return {name: values[mask] for name, values in columns.items()}
+
+    def count(self, session, t0=None, t1=None):
+        """Liczba próbek sesji w zakresie [t0, t1] - bez odczytu danych.
+
+        Bloki w całości w zakresie są liczone z indeksu; z bloków przeciętych granicą
+        rozpakowywany jest tylko czas.
+        """
+        clauses, params = _conditions(t0, t1)
+        clauses.insert(0, 'session = ?')
+        with self._lock:
+            chunks = self._db.execute(f'SELECT id, t_min, t_max, count FROM chunks WHERE {" AND ".join(clauses)}',
+                                      [session, *params]).fetchall()
+        total = 0
+        for chunk in chunks:
+            if (t0 is None or chunk['t_min'] >= t0) and (t1 is None or chunk['t_max'] <= t1):
+                total += chunk['count']
+            else:
+                total += int(_window(self._decode(chunk['id'], ())['time_ns'], t0, t1).sum())
+        return total
+
+    def aggregate(self, t0=None, t1=None, device=None, session=None, by_session=False):
+        """Statystyki (min/max/średnie, energia, ładunek) z zakresu [t0, t1].
+
+        Bloki w całości w zakresie są sumowane z indeksu; rozpakowywane są tylko bloki
+        przecięte granicą zakresu. Energia i ładunek obejmują - jak w indeksie - odcinek od
+        próbki poprzedzającej pierwszą próbkę w zakresie. ``by_session`` - dodatkowo wyniki
+        każdej sesji.
+        """
+        clauses, params = _conditions(t0, t1)
+        session_clauses = list(clauses)
+        session_params = list(params)
+        if device is not None:
+            session_clauses.append('device = ?')
+            session_params.append(device)
+        if session is not None:
+            session_clauses.append('id = ?')
+            session_params.append(session)
+        where = ' AND '.join(session_clauses) or '1'
+        chunk_where = ' AND '.join(['session IN (SELECT id FROM sessions WHERE ' + where + ')', *clauses])
+        with self._lock:
+            chunks = self._db.execute(f'SELECT * FROM chunks WHERE {chunk_where} ORDER BY session, t_min',
+                                      [*session_params, *params]).fetchall()
+            sessions = {row['id']: row for row in self._db.execute(f'SELECT * FROM sessions WHERE {where}',
+                                                                   session_params)}
+        total = Totals()
+        per_session = {}
+        for chunk in chunks:
+            if (t0 is None or chunk['t_min'] >= t0) and (t1 is None or chunk['t_max'] <= t1):
+                summary = chunk
+            else:
+                columns = self._decode(chunk['id'])
+                mask = _window(columns['time_ns'], t0, t1)
+                if not mask.any():
+                    continue
+                first = int(np.argmax(mask))
+                names = ('time_ns', 'voltage', 'current')
+                previous = tuple(columns[name][first - 1] for name in names) if first else None
+                summary = summarise(*(columns[name][mask] for name in names), previous)
+                if not first:
+                    # Odcinek od ostatniej próbki poprzedniego bloku: indeks bloku go obejmuje,
+                    # podsumowanie samych próbek bloku - nie; różnica to jego energia i ładunek
+                    own = summarise(*(columns[name] for name in names))
+                    for key in ('energy_j', 'charge_c'):
+                        summary[key] += chunk[key] - own[key]
+            total.add(summary)
+            if by_session:
+                per_session.setdefault(chunk['session'], Totals()).add(summary)
+        result = total.result()
+        result['sessions_count'] = len({chunk['session'] for chunk in chunks})
+        if by_session:
+            result['sessions'] = [dict(_session_dict(sessions[number], summary=False), **totals.result())
+                                  for number, totals in per_session.items()]
+        return result
+
+    def _decode(self, chunk, channels=('voltage', 'current')):
+        names = ('time_ns', *channels)
+        with self._lock:
+            row = self._db.execute(f'SELECT {", ".join(names)} FROM chunk_data WHERE chunk = ?', (chunk,)).fetchone()
+        self.chunks_decoded += 1
+        return {name: decode_column(name, row[name]) for name in names}
+
+    def _first_crossing(self, chunk, t0, t1, channel, above, below):
+        """Czas pierwszej próbki bloku w zakresie, w której kanał przekracza próg (None - brak)."""
+        columns = self._decode(chunk, (channel,))
+        values = columns[channel]
+        hits = _window(columns['time_ns'], t0, t1)
+        if above is not None:
+            hits &= values > above
+        if below is not None:
+            hits &= values < below
+        index = np.flatnonzero(hits)
+        return int(columns['time_ns'][index[0]]) if len(index) else None
+
+
+def _window(times, t0, t1):
+    mask = np.ones(len(times), dtype=bool)
+    if t0 is not None:
+        mask &= times >= t0
+    if t1 is not None:
+        mask &= times <= t1
+    return mask
+
+
+def _session_dict(row, summary=True):
+    """Wiersz tabeli sesji -> słownik wyniku zapytania."""
+    result = {'id': row['id'], 'device': row['device'], 'created_ns': row['created_ns'],
+              'metadata': json.loads(row['metadata'] or '{}')}
+    if summary:
+        valid = row['valid']
+        result.update(start_ns=row['t_min'], end_ns=row['t_max'], samples=valid,
+                      voltage={'min': row['v_min'], 'max': row['v_max']},
+                      current={'min': row['i_min'], 'max': row['i_max']},
+                      energy_wh=row['energy_j'] / 3600, charge_ah=row['charge_c'] / 3600)
+    return result
+
+
+class StoreWriter:
+    """Zapis próbek z wątku akwizycji do nowej sesji w bazie, w wątku w tle.
+
+    Interfejs jak ``korad_recorder.Recorder`` (``append``/``extend``/``close``) - można go
+    podpiąć jako subskrybenta wątku akwizycji (``worker.subscribe``). Blok trafia do bazy
+    po zebraniu ``chunk_size`` próbek albo najpóźniej po ``flush_interval`` sekundach.
+    Po błędzie bazy - jak w ``Recorder`` - próbki są odrzucane (``samples_dropped``),
+    a ``on_error`` jest wołane raz z argumentami (writer, błąd).
+    """
+
+    def __init__(self, store, device, metadata=None, chunk_size=CHUNK_SIZE, flush_interval=60.0):
+        self.store = store
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.samples_written = 0
+        self.samples_dropped = 0
+        self.error = None  # Błąd, który przerwał zapis
+        self.on_error = None
+        self.session = store.create_session(device, metadata)
+        # Przesunięcie zegara perf_counter_ns próbek -> czas uniksowy
+        self._epoch_offset_ns = time.time_ns() - time.perf_counter_ns()
+        self._pending = collections.deque()
+        self._last = None  # Ostatnia zapisana próbka - do całkowania na granicy bloków
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def append(self, sample):
+        """Dodaj próbkę (czas perf_counter_ns, napięcie, prąd) do zapisu."""
+        if self.error is not None:
+            self.samples_dropped += 1
+            return
+        self._pending.append(sample)
+
+    def extend(self, samples):
+        if self.error is not None:
+            self.samples_dropped += len(samples)
+            return
+        self._pending.extend(samples)
+
+    def close(self):
+        """Zapisz zaległe próbki i zakończ wątek zapisu (baza pozostaje otwarta)."""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._thread.join()
+
+    def _run(self):
+        buffered = []
+        first_buffered = None
+        try:
+            while True:
+                stopping = self._stop_event.wait(min(self.flush_interval, 0.5))
+                while self._pending:
+                    buffered.append(self._pending.popleft())
+                now = time.monotonic()
+                if buffered and first_buffered is None:
+                    first_buffered = now
+                while len(buffered) >= self.chunk_size:
+                    self._write_chunk(buffered[:self.chunk_size])
+                    buffered = buffered[self.chunk_size:]
+                if buffered and (stopping or now - first_buffered >= self.flush_interval):
+                    self._write_chunk(buffered)
+                    buffered = []
+                if not buffered:
+                    first_buffered = None
+                if stopping:
+                    break
+        except sqlite3.Error as e:
+            logger.error('Błąd zapisu sesji %d do %s: %s', self.session, self.store.path, e)
+            self._fail(e, len(buffered))
+
+    def _fail(self, error, unwritten):
+        """Przerwij zapis: odrzucaj kolejne próbki i zgłoś błąd."""
+        self.error = error
+        self.samples_dropped += unwritten + len(self._pending)
+        self._pending.clear()
+        if self.on_error is not None:
+            self.on_error(self, error)
+
+    def _write_chunk(self, samples):
+        times = np.array([sample[0] for sample in samples], dtype=np.int64) + self._epoch_offset_ns
+        columns = np.array(samples, dtype=np.float64).T
+        self.store.append(self.session, times, columns[1], columns[2], self._last)
+        self._last = (int(times[-1]), columns[1][-1], columns[2][-1])
+        self.samples_written += len(samples)
+
+
+def import_log(store, path, device=None, chunk_size=CHUNK_SIZE):
+    """Zaimportuj zapis .kps (``korad_recorder``) jako nową sesję; zwraca numer sesji."""
+    from korad_recorder import read_log
+
+    metadata, times, voltages, currents = read_log(path)
+    start_perf_ns = metadata.get('start_perf_ns', int(times[0]) if len(times) else 0)
+    offset = int(metadata.get('start_wall_time', os.path.getmtime(path)) * 1e9) - start_perf_ns
+    metadata = dict(metadata, source=os.path.abspath(path))
+    session = store.create_session(device or metadata.get('port') or os.path.basename(path), metadata)
+    times = times + offset
+    previous = None
+    for start in range(0, len(times), chunk_size):
+        end = start + chunk_size
+        store.append(session, times[start:end], voltages[start:end], currents[start:end], previous)
+        last = min(end, len(times)) - 1
+        previous = (int(times[last]), voltages[last], currents[last])
+    logger.info('Zaimportowano %s jako sesję %d (%d próbek)', path, session, len(times))
+    return session
@@ -0,0 +1,197 @@
+"""Nadzór łącza szeregowego: wykrywanie utraty połączenia i ponowne łączenie.
+
+Łącze uznawane jest za utracone po błędzie portu (np. odłączony adapter USB) albo
+po ``failures`` kolejnych nieudanych odczytach. Wtedy port jest zamykany, a kolejne
+próby połączenia następują w wykładnie rosnących odstępach (z losowym rozrzutem, do
+``max_backoff``). Zasilacz jest szukany najpierw na dotychczasowym porcie, potem -
+gdy system nada adapterowi inną nazwę - na portach z tym samym identyfikatorem sprzętu
+USB (VID:PID:numer seryjny). Identyczne zasilacze często mają ten sam numer seryjny
+adaptera i tę samą odpowiedź *IDN?, dlatego inny port jest przyjmowany tylko przy
+jednoznacznym dopasowaniu (niepusty numer seryjny, dokładnie jeden kandydat), a porty
+używane przez inne wątki akwizycji (``ports_in_use``) nie są w ogóle sprawdzane.
+"""
+import collections
+import logging
+import random
+import threading
+import time
+
+import serial
+import serial.tools.list_ports
+
+from korad_discovery import DiscoveryCache, discover, hardware_key
+from korad_sim import open_port
+
+logger = logging.getLogger('korad.supervisor')
+
+# Porty nadzorowanych połączeń w tym procesie (nazwa -> liczba nadzorców)
+_ports_lock = threading.Lock()
+_ports = collections.Counter()
+
+
+def ports_in_use():
+    """Porty zajęte przez nadzorowane połączenia tego procesu."""
+    with _ports_lock:
+        return frozenset(_ports)
+
+
+def _claim(port):
+    with _ports_lock:
+        _ports[port] += 1
+
+
+def _release(port):
+    with _ports_lock:
+        _ports[port] -= 1
+        if _ports[port] <= 0:
+            del _ports[port]
+
+
+def unique_key(key):
+    """Czy identyfikator sprzętu zawiera numer seryjny (VID:PID:numer, numer niepusty)."""
+    parts = (key or '').split(':')
+    return len(parts) == 3 and bool(parts[2])
+
+
+def identify(connection):
+    """Odpowiedź na *IDN? odczytana bezpośrednio z otwartego portu (None - brak odpowiedzi)."""
+    try:
+        connection.reset_input_buffer()
+        connection.write(b'*IDN?\n')
+        reply = connection.readline().decode(errors='replace').strip()
+    except (serial.SerialException, OSError):
+        return None
+    return reply or None
+
+
+class LinkSupervisor:
+    """Stan łącza jednego zasilacza i procedura ponownego połączenia.
+
+    ``port`` - nazwa portu albo adres ``sim://``; ``open`` otwiera port o podanej nazwie;
+    ``in_use`` zwraca porty, których nie wolno sprawdzać (zajęte przez inne połączenia).
+    Nadzorca rezerwuje swój port do wywołania ``close``.
+    """
+
+    def __init__(self, port, failures=3, backoff=0.5, max_backoff=30.0, open=open_port, in_use=ports_in_use):
+        self.port = port
+        _claim(port)
+        self.failures = failures
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.open = open
+        self.in_use = in_use
+        self.verified = False  # Ostatnie połączenie potwierdziło tożsamość zasilacza (patrz ``reconnect``)
+        self.idn = None  # Odpowiedź *IDN? zasilacza - do rozpoznania go po ponownym podłączeniu
+        self.key = None  # Identyfikator adaptera USB (patrz ``korad_discovery.hardware_key``)
+        self.consecutive_failures = 0
+        self.attempt = 0  # Numer próby bieżącego ponownego łączenia
+
+    def close(self):
+        """Zwolnij rezerwację portu (koniec nadzoru)."""
+        if self.port is not None:
+            _release(self.port)
+            self.port = None
+
+    def remember(self, idn):
+        """Zapamiętaj tożsamość zasilacza na obecnym porcie (wołane po udanym połączeniu)."""
+        self.idn = idn or self.idn
+        if self.port.startswith('sim://'):
+            return
+        try:
+            for port in serial.tools.list_ports.comports():
+                if port.device == self.port:
+                    self.key = hardware_key(port)
+        except OSError as e:
+            logger.debug('Błąd odczytu listy portów: %s', e)
+
+    def success(self):
+        self.consecutive_failures = 0
+
+    def failure(self):
+        """Odnotuj nieudany odczyt; zwraca True, gdy łącze należy uznać za utracone."""
+        self.consecutive_failures += 1
+        return self.consecutive_failures >= self.failures
+
+    def next_delay(self):
+        """Odstęp przed kolejną próbą połączenia [s]: wykładniczy, z rozrzutem +-20%."""
+        delay = min(self.backoff * 2 ** self.attempt, self.max_backoff)
+        self.attempt += 1
+        return delay * random.uniform(0.8, 1.2)
+
+    def reconnect(self):
+        """Jedna próba połączenia; zwraca otwarte połączenie albo None.
+
+        ``verified`` mówi, czy po połączeniu wiadomo, że to ten sam zasilacz: na tym samym
+        porcie - zgodna, wcześniej zapamiętana odpowiedź *IDN?; na innym porcie - jedyny
+        port z identyfikatorem USB zawierającym numer seryjny.
+        """
+        self.verified = False
+        connection = self._reopen_same_port()
+        if connection is None and not self.port.startswith('sim://'):
+            connection = self._find_elsewhere()
+        if connection is not None:
+            self.attempt = 0
+            self.consecutive_failures = 0
+        return connection
+
+    def _reopen_same_port(self):
+        try:
+            connection = self.open(self.port)
+        except (serial.SerialException, OSError, ValueError) as e:
+            logger.debug('%s: nie można otworzyć portu: %s', self.port, e)
+            return None
+        idn = identify(connection)
+        if idn and (self.idn is None or idn == self.idn):
+            self.verified = self.idn is not None
+            return connection
+        logger.info('%s: port odpowiada inaczej niż zasilacz (%r)', self.port, idn)
+        connection.close()
+        return None
+
+    def _find_elsewhere(self):
+        """Szukaj zasilacza na innym porcie - tylko po jednoznacznym identyfikatorze USB."""
+        if not unique_key(self.key):
+            logger.debug('%s: adapter bez numeru seryjnego - szukanie na innych portach wyłączone', self.port)
+            return None
+        try:
+            ports = list(serial.tools.list_ports.comports())
+        except OSError as e:
+            logger.debug('Błąd odczytu listy portów: %s', e)
+            return None
+        busy = self.in_use()
+        candidates = [port for port in ports if hardware_key(port) == self.key and port.device not in busy]
+        if len(candidates) != 1:
+            if len(candidates) > 1:
+                logger.warning('%s: %d porty z identyfikatorem %s - nie wiadomo, który to ten zasilacz',
+                               self.port, len(candidates), self.key)
+            return None
+        found = discover(DiscoveryCache(), candidates)
+        match = found[0] if len(found) == 1 and (self.idn is None or found[0].idn == self.idn) else None
+        for device in found:
+            if device is not match:
+                device.connection.close()
+        if match is None:
+            return None
+        logger.warning('Zasilacz %s jest teraz na porcie %s', self.port, match.port)
+        _release(self.port)
+        _claim(match.port)
+        self.port = match.port
+        self.verified = True
+        return match.connection
+
+    def wait(self, stop_event):
+        """Czekaj przed kolejną próbą; False - zatrzymano w trakcie oczekiwania."""
+        delay = self.next_delay()
+        logger.info('%s: ponowna próba połączenia za %.1f s', self.port, delay)
+        return not stop_event.wait(delay)
+
+
+def reconnect_loop(supervisor, stop_event):
+    """Próbuj się połączyć aż do skutku albo zatrzymania; zwraca połączenie albo None."""
+    start = time.monotonic()
+    while supervisor.wait(stop_event):
+        connection = supervisor.reconnect()
+        if connection is not None:
+            logger.warning('%s: połączono ponownie po %.1f s', supervisor.port, time.monotonic() - start)
+            return connection
+    return None
@@ -0,0 +1,235 @@
+"""Charakterystyka I-U: przestrajanie nastawy z wykrywaniem ustalenia i adaptacyjnym zagęszczaniem kroku.
+
+Zamiast stałego czasu oczekiwania po każdej zmianie nastawy odczyty są powtarzane,
+aż przez ``span`` sekund odczyt przestanie się zmieniać (nachylenie w tolerancji;
+rozdzielczość zasilacza to 10 mV / 1 mA). Tryb CV/CC punktu to ograniczenie, które
+faktycznie działa - z bajtu STATUS? zasilacza. Po przejściu zgrubnej siatki
+przedziały, w których krzywa się załamuje (np. przejście CV -> CC) albo zmienia się
+tryb pracy, są dzielone na pół - aż do ``min_step`` lub wyczerpania limitu punktów.
+"""
+import csv
+import logging
+import time
+
+import numpy as np
+
+from korad_core import MAX_CURRENT, MAX_VOLTAGE
+from korad_protocol import ProtocolError
+
+# Najkrótszy czas obserwacji odczytu przy ocenie ustalenia [s]. Wyjście o stałej czasowej
+# do około ``SETTLE_SPAN`` ustala się w tolerancji; wolniejsze wymaga dłuższego ``span``.
+SETTLE_SPAN = 0.3
+
+logger = logging.getLogger('korad.sweep')
+
+
+class SweepPoint:
+    """Zmierzony punkt pracy dla jednej nastawy."""
+
+    def __init__(self, setpoint, voltage, current, settle_time, settled, mode):
+        self.setpoint = setpoint
+        self.voltage = voltage
+        self.current = current
+        self.settle_time = settle_time  # Czas od zmiany nastawy do ustalenia odczytu [s]
+        self.settled = settled  # False - przekroczono limit czasu ustalania
+        self.mode = mode  # 'CV' lub 'CC' - wywnioskowane z odczytu
+
+    @property
+    def power(self):
+        return self.voltage * self.current
+
+    def __repr__(self):
+        return (f'SweepPoint(setpoint={self.setpoint}, voltage={self.voltage}, current={self.current}, '
+                f'mode={self.mode!r})')
+
+
+def wait_settled(read, voltage_tolerance=0.02, current_tolerance=0.002, window=3, timeout=5.0, min_wait=0.0,
+                 span=SETTLE_SPAN):
+    """Odczytuj ``read() -> (napięcie, prąd)``, aż odczyt przestanie się zmieniać.
+
+    O ustaleniu decydują odczyty z ostatnich ``span`` sekund (co najmniej ``window``): zmiana
+    wynikająca z nachylenia prostej dopasowanej do nich musi na całym ``span`` mieścić się
+    w tolerancji obu kanałów. Sam rozrzut kilku kolejnych odczytów nie wystarcza - przy
+    wolnym dochodzeniu wykładniczym jest mały, choć odczyt jest daleko od wartości końcowej.
+
+    Zwraca (napięcie, prąd, czas ustalania [s], czy ustalono). Wynik to wartość prostej
+    dopasowanej do okna w chwili ostatniego odczytu - uśredniony szum, bez opóźnienia średniej.
+    """
+    start = time.monotonic()
+    if min_wait:
+        time.sleep(min_wait)
+    readings = []  # (czas, napięcie, prąd)
+    while True:
+        voltage, current = read()
+        now = time.monotonic()
+        readings.append((now, voltage, current))
+        # Okno zaczyna się od ostatniego odczytu sprzed co najmniej ``span`` sekund
+        first = next((index for index in range(len(readings) - 1, -1, -1) if now - readings[index][0] >= span), None)
+        if first is not None:
+            del readings[:first]
+        elapsed = now - start
+        if first is not None and len(readings) >= window:
+            columns = np.array(readings).T
+            times = columns[0] - columns[0, -1]  # Względem ostatniego odczytu - wyraz wolny to wartość teraz
+            (v_slope, v_now), (i_slope, i_now) = np.polyfit(times, columns[1:].T, 1).T
+            settled = abs(v_slope) * span <= voltage_tolerance and abs(i_slope) * span <= current_tolerance
+            if settled or elapsed >= timeout:
+                return float(v_now), float(i_now), elapsed, settled
+        elif elapsed >= timeout:
+            recent = readings[-window:]
+            return (sum(reading[1] for reading in recent) / len(recent),
+                    sum(reading[2] for reading in recent) / len(recent), elapsed, False)
+
+
+class Sweep:
+    """Przestrajanie napięcia (``quantity='voltage'``) lub prądu (``'current'``) zasilacza ``device``.
+
+    ``device`` to KoradDevice (lub obiekt z ``set_voltage``, ``set_current``, ``read``).
+    Druga wielkość pozostaje na wartości ``limit`` (None - bez zmiany).
+    """
+
+    def __init__(self, device, start, stop, step, quantity='voltage', limit=None, min_step=None,
+                 refine=True, max_points=500, voltage_tolerance=0.02, current_tolerance=0.002,
+                 window=3, settle_timeout=5.0, min_wait=0.0, bend_factor=5.0, span=SETTLE_SPAN):
+        if step <= 0:
+            raise ValueError('Krok musi być dodatni')
+        if quantity not in ('voltage', 'current'):
+            raise ValueError(f'Nieznana wielkość: {quantity}')
+        maximum = MAX_VOLTAGE if quantity == 'voltage' else MAX_CURRENT
+        if not (0 <= start <= maximum and 0 <= stop <= maximum):
+            raise ValueError(f'Zakres poza 0-{maximum}')
+        self.device = device
+        self.start = start
+        self.stop = stop
+        self.step = step
+        self.quantity = quantity
+        self.limit = limit
+        self.min_step = min_step if min_step is not None else step / 8
+        self.refine = refine
+        self.max_points = max_points
+        self.voltage_tolerance = voltage_tolerance
+        self.current_tolerance = current_tolerance
+        self.window = window
+        self.settle_timeout = settle_timeout
+        self.min_wait = min_wait
+        self.span = span
+        # Przedział jest dzielony, gdy odczyt odbiega od prostej przez sąsiednie punkty
+        # o więcej niż ``bend_factor`` tolerancji ustalania
+        self.bend_factor = bend_factor
+        self.points = []
+
+    def grid(self):
+        """Zgrubna siatka nastaw od ``start`` do ``stop`` (włącznie)."""
+        direction = 1 if self.stop >= self.start else -1
+        count = int(abs(self.stop - self.start) / self.step + 1e-9)
+        setpoints = [self.start + direction * index * self.step for index in range(count + 1)]
+        if abs(setpoints[-1] - self.stop) > 1e-9:
+            setpoints.append(self.stop)
+        return setpoints
+
+    def measure(self, setpoint):
+        """Ustaw nastawę, poczekaj na ustalenie i zapisz punkt pracy."""
+        if self.quantity == 'voltage':
+            self.device.set_voltage(round(setpoint, 2))
+        else:
+            self.device.set_current(round(setpoint, 3))
+        voltage, current, settle_time, settled = wait_settled(
+            self.device.read, self.voltage_tolerance, self.current_tolerance, self.window,
+            self.settle_timeout, self.min_wait, self.span)
+        if not settled:
+            logger.warning('Odczyt nie ustalił się w %.1f s dla nastawy %g', self.settle_timeout, setpoint)
+        point = SweepPoint(setpoint, voltage, current, settle_time, settled, self._mode(setpoint, voltage, current))
+        self.points.append(point)
+        return point
+
+    def _mode(self, setpoint, voltage, current):
+        """Tryb pracy 'CV'/'CC': bit trybu z STATUS? (``device.status``), a bez niego - z odczytu.
+
+        Z odczytu: działa ograniczenie prądu, gdy prąd doszedł do swojej nastawy, a napięcie
+        jest poniżej swojej (i odwrotnie przy przestrajaniu prądu); bez ``limit`` - porównanie
+        z przestrajaną nastawą.
+        """
+        status = getattr(self.device, 'status', None)
+        if status is not None:
+            try:
+                return status()['mode']
+            except (ProtocolError, ValueError) as e:
+                logger.warning('Nie odczytano trybu pracy (%s) - tryb wyznaczony z odczytu', e)
+        if self.quantity == 'voltage':
+            vset, iset = setpoint, self.limit
+        else:
+            vset, iset = self.limit, setpoint
+        voltage_limited = vset is not None and voltage >= vset - 2 * self.voltage_tolerance
+        current_limited = iset is not None and current >= iset - 2 * self.current_tolerance
+        if self.quantity == 'voltage':
+            return 'CC' if not voltage_limited and (iset is None or current_limited) else 'CV'
+        return 'CV' if not current_limited and (vset is None or voltage_limited) else 'CC'
+
+    def _bends(self, before, a, b, after):
+        """Czy przedział (a, b) wymaga zagęszczenia: zmiana trybu albo załamanie krzywej na jego końcach."""
+        if a.mode != b.mode:
+            return True
+        for outer, inner, far in ((before, a, b), (after, b, a)):
+            if outer is None:
+                continue
+            # Ekstrapolacja z (outer, inner) do far - duży błąd oznacza załamanie
+            span = inner.setpoint - outer.setpoint
+            if not span:
+                continue
+            fraction = (far.setpoint - inner.setpoint) / span
+            for attribute, tolerance in (('voltage', self.voltage_tolerance), ('current', self.current_tolerance)):
+                value = getattr(inner, attribute)
+                expected = value + fraction * (value - getattr(outer, attribute))
+                if abs(getattr(far, attribute) - expected) > self.bend_factor * tolerance:
+                    return True
+        return False
+
+    def run(self, on_point=None):
+        """Wykonaj przestrajanie; zwraca punkty posortowane według nastawy.
+
+        ``on_point(punkt)`` jest wywoływane po każdym pomiarze (np. do wypisywania postępu).
+        """
+        if self.limit is not None:
+            if self.quantity == 'voltage':
+                self.device.set_current(self.limit)
+            else:
+                self.device.set_voltage(self.limit)
+
+        self.points = []
+        for setpoint in self.grid():
+            point = self.measure(setpoint)
+            if on_point:
+                on_point(point)
+
+        while self.refine and len(self.points) < self.max_points:
+            ordered = sorted(self.points, key=lambda point: point.setpoint)
+            candidates = []
+            for index in range(len(ordered) - 1):
+                a, b = ordered[index], ordered[index + 1]
+                if b.setpoint - a.setpoint < 2 * self.min_step - 1e-12:
+                    continue
+                before = ordered[index - 1] if index > 0 else None
+                after = ordered[index + 2] if index + 2 < len(ordered) else None
+                if self._bends(before, a, b, after):
+                    candidates.append((a.setpoint + b.setpoint) / 2)
+            if not candidates:
+                break
+            # Zachowaj kierunek przestrajania z siatki zgrubnej
+            candidates.sort(reverse=self.stop < self.start)
+            for setpoint in candidates[:self.max_points - len(self.points)]:
+                point = self.measure(setpoint)
+                if on_point:
+                    on_point(point)
+        return sorted(self.points, key=lambda point: point.setpoint)
+
+
+def write_csv(points, path_or_file):
+    """Zapisz punkty do CSV (ścieżka albo otwarty plik tekstowy)."""
+    rows = [('setpoint', 'voltage_V', 'current_A', 'power_W', 'mode', 'settle_s', 'settled')]
+    rows += [(f'{point.setpoint:.3f}', f'{point.voltage:.3f}', f'{point.current:.4f}', f'{point.power:.4f}',
+              point.mode, f'{point.settle_time:.3f}', int(point.settled)) for point in points]
+    if hasattr(path_or_file, 'write'):
+        csv.writer(path_or_file).writerows(rows)
+        return
+    with open(path_or_file, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
@@ -0,0 +1,283 @@
+"""Wyzwalacze na strumieniu próbek (jak w oscyloskopie): progi, szybkie zmiany i zmiany trybu CV/CC.
+
+Reguły są sprawdzane wektorowo (NumPy) dla każdej porcji nowych próbek; stan
+potrzebny na granicy porcji (poprzedni stan warunku, próbki z okna czasowego) jest
+przenoszony między wywołaniami. Zadziałanie wyzwalacza zapisuje przebieg z bufora
+przed zdarzeniem (pre-trigger) i zadaną liczbę próbek po nim, a akcja (np. ``OUT0``
+z priorytetem PRIORITY_CONTROL) jest zlecana od razu w wątku akwizycji.
+"""
+import collections
+import csv
+import logging
+import time
+
+import numpy as np
+
+from korad_buffer import RingBuffer
+from korad_protocol import PRIORITY_CONTROL
+
+# Kanały reguł - indeksy kolumn porcji (czas_ns, napięcie, prąd)
+CHANNELS = {'voltage': 1, 'current': 2}
+
+logger = logging.getLogger('korad.triggers')
+
+
+def _rising_edges(condition, previous):
+    """Indeksy, w których warunek zmienia się z fałszu na prawdę (``previous`` - stan przed porcją)."""
+    before = np.concatenate(([previous], condition[:-1]))
+    return np.flatnonzero(condition & ~before)
+
+
+class Threshold:
+    """Wartość kanału powyżej ``above`` lub poniżej ``below`` (zbocze - moment przekroczenia)."""
+
+    def __init__(self, channel, above=None, below=None):
+        if channel not in CHANNELS or (above is None) == (below is None):
+            raise ValueError('Podaj kanał voltage/current i dokładnie jeden z progów above/below')
+        self.channel = channel
+        self.above = above
+        self.below = below
+        self._previous = False
+
+    def describe(self):
+        if self.above is not None:
+            return f'{self.channel} > {self.above}'
+        return f'{self.channel} < {self.below}'
+
+    def evaluate(self, batch, context):
+        values = batch[CHANNELS[self.channel]]
+        condition = values > self.above if self.above is not None else values < self.below
+        fired = _rising_edges(condition, self._previous)
+        self._previous = bool(condition[-1])
+        return fired
+
+
+class Change:
+    """Zmiana kanału o więcej niż ``amount`` w ciągu ``window`` sekund (ujemne ``amount`` - spadek).
+
+    Dla każdej próbki porównywana jest z maksimum (dla spadku) lub minimum (dla wzrostu)
+    z poprzedzającego okna; próbki z końca poprzedniej porcji są przenoszone.
+    """
+
+    def __init__(self, channel, amount, window):
+        if channel not in CHANNELS or not amount or window <= 0:
+            raise ValueError('Podaj kanał voltage/current, niezerową zmianę i dodatnie okno')
+        self.channel = channel
+        self.amount = amount
+        self.window_ns = int(window * 1e9)
+        self._carry_t = np.empty(0, dtype=np.int64)
+        self._carry_v = np.empty(0)
+        self._previous = False
+
+    def describe(self):
+        kind = 'spadek' if self.amount < 0 else 'wzrost'
+        return f'{kind} {self.channel} o {abs(self.amount)} w {self.window_ns / 1e6:g} ms'
+
+    def evaluate(self, batch, context):
+        times = np.concatenate((self._carry_t, batch[0]))
+        values = np.concatenate((self._carry_v, batch[CHANNELS[self.channel]]))
+        carried = len(self._carry_t)
+        # Skrajna wartość w oknie [początek, próbka] dla każdej próbki - jednym reduceat
+        # na przeplecionych granicach (początek, koniec); ostatni koniec poza tablicą liczony osobno
+        starts = np.searchsorted(times, times - self.window_ns, side='left')
+        ends = np.minimum(np.arange(1, len(times) + 1), len(times) - 1)
+        reduce = np.maximum if self.amount < 0 else np.minimum
+        extreme = reduce.reduceat(values, np.column_stack((starts, ends)).ravel())[::2]
+        extreme[-1] = reduce.reduce(values[starts[-1]:])
+        change = values - extreme
+        condition = (change < self.amount if self.amount < 0 else change > self.amount)[carried:]
+        fired = _rising_edges(condition, self._previous)
+        self._previous = bool(condition[-1])
+        keep = times >= times[-1] - self.window_ns
+        self._carry_t, self._carry_v = times[keep], values[keep]
+        return fired
+
+
+class ModeChange:
+    """Zmiana trybu pracy CV <-> CC wywnioskowana z odczytu i nastaw (``context['setpoints']``).
+
+    Tryb CC: prąd osiągnął nastawę (z tolerancją ``current_tolerance``), a napięcie jest
+    poniżej nastawy. ``to_mode`` ogranicza reakcję do przejścia w jeden tryb.
+    """
+
+    def __init__(self, to_mode=None, voltage_tolerance=0.02, current_tolerance=0.003):
+        if to_mode not in (None, 'CV', 'CC'):
+            raise ValueError('to_mode: None, CV lub CC')
+        self.to_mode = to_mode
+        self.voltage_tolerance = voltage_tolerance
+        self.current_tolerance = current_tolerance
+        self._previous = None  # Ostatni tryb (True - CC)
+
+    def describe(self):
+        return f'zmiana trybu na {self.to_mode}' if self.to_mode else 'zmiana trybu CV/CC'
+
+    def evaluate(self, batch, context):
+        setpoints = context.get('setpoints') or {}
+        vset, iset = setpoints.get('voltage'), setpoints.get('current')
+        if vset is None or iset is None:
+            return np.empty(0, dtype=np.intp)
+        cc = (batch[2] >= iset - self.current_tolerance) & (batch[1] < vset - self.voltage_tolerance)
+        previous = cc[0] if self._previous is None else self._previous
+        before = np.concatenate(([previous], cc[:-1]))
+        changed = cc != before
+        if self.to_mode:
+            changed &= cc if self.to_mode == 'CC' else ~cc
+        self._previous = bool(cc[-1])
+        return np.flatnonzero(changed)
+
+
+class Trigger:
+    """Reguła z akcją i parametrami zapisu przebiegu.
+
+    ``action`` to 'OUT0' (wyłączenie wyjścia), dowolna komenda tekstowa, funkcja
+    ``action(event)`` albo None. ``holdoff`` - czas [s], przez który po zadziałaniu
+    wyzwalacz jest nieaktywny; ``pre``/``post`` - liczba próbek przed i po zdarzeniu.
+    """
+
+    def __init__(self, rule, action=None, name=None, pre=1000, post=1000, holdoff=1.0):
+        self.rule = rule
+        self.action = action
+        self.name = name or rule.describe()
+        self.pre = pre
+        self.post = post
+        self.holdoff_ns = int(holdoff * 1e9)
+        self.armed_at_ns = 0  # Wyzwalacz nie działa dla próbek starszych niż ta chwila
+        self.enabled = True
+
+
+class TriggerEvent:
+    """Zadziałanie wyzwalacza: próbka, chwila wykrycia, żądanie akcji i zapisany przebieg."""
+
+    def __init__(self, trigger, sample, detected_ns):
+        self.trigger = trigger
+        self.name = trigger.name
+        self.timestamp_ns, self.voltage, self.current = sample
+        self.detected_ns = detected_ns
+        self.request = None  # Request akcji wysłanej do zasilacza
+        self.capture = None  # Tablica (3, n): czas_ns, napięcie, prąd - po zebraniu próbek ``post``
+        self._rows = []
+        self._remaining = trigger.post
+
+    @property
+    def reaction_ns(self):
+        """Czas od próbki do zapisu akcji do portu (None - brak akcji lub jeszcze niewysłana)."""
+        if self.request is None or self.request.sent_ns is None:
+            return None
+        return self.request.sent_ns - self.timestamp_ns
+
+    def __repr__(self):
+        return f'TriggerEvent({self.name!r}, U={self.voltage}, I={self.current})'
+
+
+class TriggerEngine:
+    """Zestaw wyzwalaczy sprawdzanych na porcjach próbek.
+
+    ``send(komenda, priorytet)`` służy do akcji tekstowych (zwykle ``AcquisitionWorker.send``).
+    Zdarzenia trafiają do ``events``, a po zebraniu przebiegu - do ``captures``.
+    """
+
+    def __init__(self, triggers=(), send=None, pre_capacity=None):
+        self.triggers = list(triggers)
+        self.send = send
+        capacity = pre_capacity or max([trigger.pre for trigger in self.triggers] + [1000])
+        self.history = RingBuffer(capacity, columns=3)  # Próbki sprzed porcji - do zapisu pre-trigger
+        self.events = collections.deque(maxlen=1000)
+        self.captures = collections.deque(maxlen=100)
+        self._collecting = []  # Zdarzenia zbierające jeszcze próbki po wyzwoleniu
+        self._pending = []  # Próbki odłożone przez ``add`` do najbliższego ``process_pending``
+
+    def add_trigger(self, trigger):
+        self.set_triggers(self.triggers + [trigger])
+        return trigger
+
+    def set_triggers(self, triggers):
+        """Zastąp zestaw wyzwalaczy (podmiana listy jest atomowa - można wołać z innego wątku)."""
+        triggers = list(triggers)
+        for trigger in triggers:
+            if trigger.pre > self.history.capacity:
+                raise ValueError(f'Najwyżej {self.history.capacity} próbek przed zdarzeniem')
+        self.triggers = triggers
+
+    def add(self, timestamp_ns, voltage, current):
+        """Odłóż próbkę do sprawdzenia w najbliższym ``process_pending`` (wątek akwizycji)."""
+        self._pending.append((timestamp_ns, voltage, current))
+
+    def process_pending(self, context=None):
+        if self._pending:
+            samples, self._pending = self._pending, []
+            return self.process(np.array(samples, dtype=np.float64).T, context)
+        return []
+
+    def process(self, batch, context=None):
+        """Sprawdź wyzwalacze na porcji ``batch`` (3, n): czas_ns, napięcie, prąd. Zwraca nowe zdarzenia."""
+        batch = np.asarray(batch, dtype=np.float64)
+        if batch.shape[1] == 0:
+            return []
+        context = context or {}
+        fired = []
+        for trigger in self.triggers:
+            if not trigger.enabled:
+                continue
+            for index in trigger.rule.evaluate(batch, context):
+                timestamp_ns = int(batch[0, index])
+                if timestamp_ns < trigger.armed_at_ns:
+                    continue
+                trigger.armed_at_ns = timestamp_ns + trigger.holdoff_ns
+                fired.append((index, trigger))
+
+        events = []
+        for index, trigger in sorted(fired, key=lambda item: item[0]):
+            event = TriggerEvent(trigger, (int(batch[0, index]), batch[1, index], batch[2, index]),
+                                 time.perf_counter_ns())
+            self._act(event)
+            # Przebieg przed zdarzeniem: bufor historii + początek bieżącej porcji
+            before = np.concatenate((self.history.view(), batch[:, :index]), axis=1)[:, -trigger.pre:]
+            event._rows.append(before)
+            event._remaining += 1  # Próbka wyzwalająca należy do części "po"
+            events.append((index, event))
+
+        # Próbki po zdarzeniach - także dla zdarzeń z poprzednich porcji
+        for event in self._collecting:
+            self._collect(event, batch)
+        for index, event in events:
+            self._collect(event, batch[:, index:])
+            if event.capture is None:
+                self._collecting.append(event)
+            self.events.append(event)
+        self._collecting = [event for event in self._collecting if event.capture is None]
+        self.history.extend(batch.T)
+        return [event for _, event in events]
+
+    def _collect(self, event, rows):
+        taken = rows[:, :event._remaining]
+        event._rows.append(taken)
+        event._remaining -= taken.shape[1]
+        if event._remaining <= 0:
+            event.capture = np.concatenate(event._rows, axis=1)
+            event._rows = []
+            self.captures.append(event)
+
+    def _act(self, event):
+        action = event.trigger.action
+        try:
+            if callable(action):
+                action(event)
+            elif action:
+                if self.send is None:
+                    raise RuntimeError('Brak funkcji wysyłania komend')
+                priority = PRIORITY_CONTROL if action == 'OUT0' else None
+                event.request = self.send(action, priority)
+        except Exception as e:
+            logger.error('Błąd akcji wyzwalacza %s: %s', event.name, e)
+        logger.warning('Wyzwalacz %s: U=%.3f V, I=%.4f A', event.name, event.voltage, event.current)
+
+
+def write_capture(event, path):
+    """Zapisz przebieg zdarzenia do CSV: czas względem zdarzenia [s], napięcie, prąd."""
+    if event.capture is None:
+        raise ValueError('Przebieg nie jest jeszcze kompletny')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['t_s', 'voltage_V', 'current_A'])
+        for timestamp_ns, voltage, current in event.capture.T:
+            writer.writerow([f'{(timestamp_ns - event.timestamp_ns) / 1e9:.6f}', f'{voltage:.3f}', f'{current:.4f}'])
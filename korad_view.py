@@ -0,0 +1,94 @@
+"""Model widoku: zbiorcze, różnicowe odświeżanie wyświetlaczy i pokręteł GUI.
+
+Kod GUI nie ustawia widżetów bezpośrednio, tylko zgłasza wartości do modelu
+(``set``). Model pamięta, co jest już wyświetlone, pomija wartości niezmienione
+(porównywane po sformatowaniu, więc zmiana poniżej rozdzielczości wyświetlacza nie
+odświeża widżetu), a zmiany zebrane w trakcie jednej klatki stosuje naraz w ``flush``
+- przy odczytach kilkadziesiąt razy na sekundę koszt interfejsu nie rośnie z
+częstotliwością próbek. Widżety ustawiane programowo mają na ten czas zablokowane
+sygnały, więc np. ustawienie pokrętła nastawą odczytaną z zasilacza nie wywołuje
+obsługi ruchu pokrętła (i nie odsyła nastawy do zasilacza).
+
+Moduł nie zależy od Qt: ``schedule`` to funkcja planująca wywołanie ``flush``
+(w GUI - jednorazowy QTimer o okresie klatki).
+"""
+# Okres klatki [ms] - najwyżej jedno zbiorcze odświeżenie widżetów na klatkę
+FRAME_MS = 16
+
+_MISSING = object()
+
+
+class ViewModel:
+    """Wartości wyświetlane przez widżety, zmiany oczekujące na zastosowanie i ich wiązania."""
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule
+        self._bindings = {}  # Klucz -> (funkcja ustawiająca, widżety z blokowanymi sygnałami)
+        self._shown = {}  # Klucz -> wartość obecnie wyświetlana
+        self._pending = {}  # Klucz -> wartość do zastosowania przy najbliższym flush
+        self._scheduled = False
+        self.applied = 0  # Zastosowane zmiany
+        self.skipped = 0  # Zmiany pominięte (wartość już wyświetlana)
+        self.flushes = 0
+
+    def bind(self, key, setter, *widgets):
+        """Powiąż klucz z funkcją ustawiającą; sygnały ``widgets`` są blokowane na czas jej wywołania."""
+        self._bindings[key] = (setter, widgets)
+
+    def unbind(self, *keys):
+        """Usuń wiązania (np. przed usunięciem widżetów)."""
+        for key in keys:
+            self._bindings.pop(key, None)
+            self._shown.pop(key, None)
+            self._pending.pop(key, None)
+
+    def set(self, key, value):
+        """Zgłoś wartość do wyświetlenia przy najbliższym ``flush`` (ostatnia zgłoszona wygrywa)."""
+        if self._pending.get(key, self._shown.get(key, _MISSING)) == value:
+            self.skipped += 1
+            return
+        self._pending[key] = value
+        if not self._scheduled and self.schedule is not None:
+            self._scheduled = True
+            self.schedule()
+
+    def apply(self, key, value):
+        """Wyświetl wartość od razu (z pominięciem niezmienionej) - gdy kod zaraz z niej korzysta."""
+        self._pending.pop(key, None)
+        self._show(key, value)
+
+    def note(self, key, value):
+        """Odnotuj wartość ustawioną w widżecie przez użytkownika (bez ponownego ustawiania)."""
+        self._pending.pop(key, None)
+        self._shown[key] = value
+
+    def value(self, key, default=None):
+        """Wartość zgłoszona ostatnio (oczekująca albo wyświetlana)."""
+        return self._pending.get(key, self._shown.get(key, default))
+
+    def flush(self):
+        """Zastosuj wszystkie oczekujące zmiany."""
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        self.flushes += 1
+        for key, value in pending.items():
+            self._show(key, value)
+
+    def _show(self, key, value):
+        if self._shown.get(key, _MISSING) == value:
+            self.skipped += 1
+            return
+        binding = self._bindings.get(key)
+        if binding is None:
+            return
+        setter, widgets = binding
+        blocked = [widget.blockSignals(True) for widget in widgets]
+        try:
+            setter(value)
+        finally:
+            for widget, was_blocked in zip(widgets, blocked):
+                widget.blockSignals(was_blocked)
+        self._shown[key] = value
+        self.applied += 1
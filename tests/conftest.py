@@ -0,0 +1,9 @@
+import pytest
+
+from korad_sim import SimulatedKorad
+
+
+@pytest.fixture
+def simulator():
+    """Symulator bez ograniczenia przepustowości, z krótkim limitem czasu odczytu."""
+    return SimulatedKorad(latency=0.001, baudrate=None, timeout=0.05, seed=1)
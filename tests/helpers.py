@@ -0,0 +1,37 @@
+"""Narzędzia testów: oczekiwanie na warunek z pompowaniem protokołu albo bez."""
+import time
+
+from korad_recorder import Recorder
+
+
+def pump_until(protocol, condition, timeout=5.0):
+    """Pompuj protokół, aż ``condition()`` będzie prawdziwe; False - upłynął czas."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        protocol.pump(timeout=0.01)
+    return True
+
+
+def wait_until(condition, timeout=5.0):
+    """Czekaj (port pompuje wątek akwizycji), aż ``condition()`` będzie prawdziwe; False - upłynął czas."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def ramp_samples(count, start_ns=10 ** 12):
+    """Próbki (czas_ns, napięcie, prąd) co 1 ms z narastającym napięciem i prądem."""
+    return [(start_ns + index * 1000000, 1.0 + index / 100, 0.001 * index) for index in range(count)]
+
+
+def record(path, samples, chunk_size=100):
+    """Zapisz próbki do pliku .kps i zamknij zapis; zwraca Recorder."""
+    recorder = Recorder(str(path), {'device': 'sim'}, chunk_size=chunk_size)
+    recorder.extend(samples)
+    recorder.close()
+    return recorder
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from korad_analysis import analyse, segment_starts
+
+
+def _steps():
+    """Przebieg 1 kHz: wyjście wyłączone, skok do 5 V (ustalenie w 10 ms), potem ograniczenie prądu."""
+    times = np.arange(3000) / 1000
+    voltages = np.zeros(3000)
+    currents = np.zeros(3000)
+    voltages[1000:] = 5.0
+    voltages[1000:1010] = np.linspace(0.5, 4.9, 10)
+    currents[1000:2000] = 0.5
+    voltages[2000:] = 3.0
+    currents[2000:] = 1.0
+    return times, voltages, currents
+
+
+def test_segments_modes_and_settling():
+    result = analyse(*_steps(), limits=(5.0, 1.0))
+    assert [segment['mode'] for segment in result['segments']] == ['OFF', 'CV', 'CC']
+    assert result['steps'] == 2
+    # Od ostatniej próbki przed skokiem (0,999 s) do pierwszej ustalonej (1,010 s)
+    assert result['segments'][1]['settle_s'] == pytest.approx(0.011)
+    assert result['energy_wh'] == pytest.approx((2.5 + 3.0) / 3600, rel=0.01)
+    assert result['modes']['CC'] == pytest.approx(1 / 3, rel=0.01)
+
+
+def test_gap_is_not_integrated():
+    times, voltages, currents = _steps()
+    voltages[1500], currents[1500] = np.nan, np.nan
+    result = analyse(times, voltages, currents)
+    assert result['samples'] == 2999
+    assert result['energy_wh'] == pytest.approx((2.5 - 2 * 0.0025 + 3.0) / 3600, rel=0.01)
+
+
+def test_bands():
+    result = analyse(*_steps(), voltage_band=(2.9, 5.1))
+    assert result['bands']['voltage']['pass']
+    assert result['pass'] is True
+    assert analyse(*_steps(), voltage_band=(4.0, 5.1))['pass'] is False
+
+
+def test_segment_starts_without_steps():
+    assert segment_starts(np.full(100, 5.0), np.full(100, 0.1), 0.1, 0.01).tolist() == [0]
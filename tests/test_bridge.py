@@ -0,0 +1,106 @@
+import socket
+
+import pytest
+
+from korad_acquisition import AcquisitionWorker
+from korad_bridge import MAX_LINE, ScpiBridge
+
+from tests.helpers import wait_until
+
+
+@pytest.fixture
+def worker(simulator):
+    worker = AcquisitionWorker(simulator, interval=0.02, reconnect=False)
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def _bridge(worker, **kwargs):
+    bridge = ScpiBridge(worker, port=0, **kwargs)
+    bridge.start()
+    return bridge
+
+
+@pytest.fixture
+def bridge(worker):
+    bridge = _bridge(worker)
+    yield bridge
+    bridge.stop()
+
+
+def _connect(bridge):
+    client = socket.create_connection(('127.0.0.1', bridge.port), timeout=5)
+    return client, client.makefile('rb')
+
+
+def _query(client, lines, command):
+    client.sendall(command.encode() + b'\n')
+    return lines.readline().decode('latin-1').rstrip('\n')
+
+
+def test_queries_writes_and_identity_cache(bridge, simulator):
+    client, lines = _connect(bridge)
+    with client, lines:
+        assert _query(client, lines, '*IDN?') == simulator.idn
+        commands = bridge.commands.value
+        # Drugie *IDN? - z pamięci, bez komunikacji z zasilaczem
+        assert _query(client, lines, '*IDN?') == simulator.idn
+        assert bridge.commands.value == commands and bridge.cache_hits.value == 1
+        # Zapis nie ma odpowiedzi - trafia do zasilacza przez kolejkę protokołu
+        client.sendall(b'VSET1:07.50\n')
+        assert wait_until(lambda: simulator.vset == 7.5)
+        assert wait_until(lambda: _query(client, lines, 'VSET1?') == '07.50')
+
+
+def test_readings_served_from_last_poll(worker, bridge):
+    assert wait_until(lambda: worker.stats.last is not None)
+    client, lines = _connect(bridge)
+    with client, lines:
+        commands = bridge.commands.value
+        for _ in range(10):
+            assert _query(client, lines, 'VOUT1?') != ''
+        assert bridge.commands.value == commands and bridge.cache_hits.value == 10
+
+
+def test_stale_reading_goes_to_device(worker):
+    bridge = _bridge(worker, cache_ttl=0)
+    try:
+        client, lines = _connect(bridge)
+        with client, lines:
+            assert _query(client, lines, 'IOUT1?') != ''
+            assert bridge.commands.value == 1 and bridge.cache_hits.value == 0
+    finally:
+        bridge.stop()
+
+
+def test_busy_client_does_not_starve_others(bridge):
+    busy, busy_lines = _connect(bridge)
+    other, other_lines = _connect(bridge)
+    with busy, busy_lines, other, other_lines:
+        # Najpierw jedno zapytanie - klient jest już zarejestrowany w moście
+        assert _query(busy, busy_lines, 'STATUS?') != ''
+        busy.sendall(b'STATUS?\n' * 50)
+        assert wait_until(lambda: bridge.commands.value > 2)
+        assert _query(other, other_lines, 'STATUS?') != ''
+        # Round-robin: drugi klient czekał najwyżej na kilka zapytań pierwszego, nie na wszystkie 50
+        assert bridge.commands.value < 20
+        for _ in range(50):
+            assert busy_lines.readline()
+
+
+def test_overlong_command_disconnects(bridge):
+    client, lines = _connect(bridge)
+    with client, lines:
+        client.sendall(b'V' * (MAX_LINE + 1) + b'\n')
+        assert lines.readline() == b''
+
+
+def test_query_without_device_gets_empty_line():
+    bridge = _bridge(None)
+    try:
+        client, lines = _connect(bridge)
+        with client, lines:
+            assert _query(client, lines, 'VOUT1?') == ''
+    finally:
+        bridge.stop()
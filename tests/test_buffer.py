@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from korad_buffer import RingBuffer
+
+
+def _rows(start, stop):
+    return np.column_stack((np.arange(start, stop), np.arange(start, stop) * 10.0))
+
+
+def test_append_wraps_around():
+    buffer = RingBuffer(4, columns=2)
+    for index in range(7):
+        buffer.append(index, index * 10.0)
+    assert len(buffer) == 4
+    assert buffer.total == 7
+    assert buffer.column(0).tolist() == [3, 4, 5, 6]
+    assert buffer.last().tolist() == [6, 60]
+
+
+def test_extend_across_end_of_array():
+    buffer = RingBuffer(5, columns=2)
+    buffer.extend(_rows(0, 3))
+    buffer.extend(_rows(3, 7))  # Zapis przechodzi przez koniec tablicy
+    assert buffer.view().tolist() == _rows(2, 7).T.tolist()
+    assert buffer.view().base is not None  # Widok, nie kopia
+
+
+def test_extend_larger_than_capacity_keeps_tail():
+    buffer = RingBuffer(5, columns=2)
+    buffer.extend(_rows(0, 2))
+    buffer.extend(_rows(2, 15))
+    assert buffer.total == 15
+    assert buffer.column(0).tolist() == list(range(10, 15))
+    buffer.append(15, 150.0)
+    assert buffer.column(0).tolist() == list(range(11, 16))
+
+
+def test_clear_and_capacity():
+    buffer = RingBuffer(3, columns=2)
+    buffer.extend(_rows(0, 5))
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.last() is None
+    with pytest.raises(ValueError):
+        RingBuffer(0)
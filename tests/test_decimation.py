@@ -0,0 +1,35 @@
+import numpy as np
+
+from korad_buffer import RingBuffer
+from korad_decimation import MinMaxPyramid
+
+
+def test_pyramid_keeps_spikes_after_wrap_around():
+    history = RingBuffer(4096, columns=2)
+    pyramid = MinMaxPyramid(history)
+    rows = np.column_stack((np.arange(10000.0), np.zeros(10000)))
+    rows[9000, 1] = 5.0  # Pojedyncza szpilka w najnowszej części historii
+    for start in range(0, len(rows), 300):  # Porcje niewyrównane do bloków poziomów
+        history.extend(rows[start:start + 300])
+        pyramid.extend(rows[start:start + 300])
+
+    x, y = pyramid.query(history.column(0)[0], history.column(0)[-1], 100, 0)
+    assert len(x) <= 2 * 100 + 2 * pyramid.factor
+    assert y.max() == 5.0
+    assert x.min() >= 10000 - 4096 - 1
+
+
+def test_gap_marker_does_not_hide_spike():
+    history = RingBuffer(4096, columns=3)
+    pyramid = MinMaxPyramid(history)
+    rows = np.column_stack((np.arange(4096.0), np.ones(4096), np.full(4096, 0.1)))
+    rows[2000, 1:] = np.nan  # Znacznik przerwy po ponownym połączeniu
+    rows[2001, 1] = 30.0
+    history.extend(rows)
+    pyramid.extend(rows)
+
+    for level in pyramid.levels:
+        assert np.nanmax(level.view()[2 + 2]) == 30.0  # Kolumna max napięcia
+        assert np.nanmin(level.view()[2]) == 1.0
+    _, y = pyramid.query(0, 4095, 20, 0)
+    assert np.nanmax(y) == 30.0
@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+
+from korad_recorder import MappedLog
+
+from tests.helpers import ramp_samples, record
+
+
+def test_query_and_value_at(tmp_path):
+    path = tmp_path / 'zapis.kps'
+    samples = ramp_samples(1000)
+    record(path, samples, chunk_size=256)
+
+    log = MappedLog(str(path), base_block=64)
+    try:
+        start, end = log.duration
+        assert math.isclose(end - start, 0.999)
+        x, y = log.query(start, end, 20, 0)
+        assert len(x) <= 80
+        assert math.isclose(y.max(), samples[-1][1], rel_tol=1e-6)
+        t, voltage, current, _ = log.value_at(start + 0.5)
+        assert math.isclose(t - start, 0.5) and math.isclose(voltage, samples[500][1], rel_tol=1e-6)
+    finally:
+        log.close()
+
+
+def test_gap_marker_keeps_chunk_and_index_extremes(tmp_path):
+    path = tmp_path / 'zapis.kps'
+    samples = ramp_samples(2048)
+    samples[1000] = (samples[1000][0], math.nan, math.nan)  # Znacznik przerwy
+    samples[1001] = (samples[1001][0], 30.0, 2.5)
+    record(path, samples, chunk_size=1024)
+
+    log = MappedLog(str(path), base_block=64)
+    try:
+        assert log.chunks[0].v_max == 30.0 and log.chunks[0].i_max == 2.5
+        assert math.isclose(log.chunks[0].v_min, 1.0)
+        for level in log.levels:
+            assert level[:, 2 + 3].max() == 30.0  # Kolumna max napięcia, bez NaN
+        start, end = log.duration
+        _, y = log.query(start, end, 8, 0)
+        assert np.nanmax(y) == 30.0
+    finally:
+        log.close()
@@ -0,0 +1,65 @@
+import math
+import time
+import types
+
+import pytest
+
+import korad_acquisition
+from korad_acquisition import AcquisitionWorker, AdaptivePolling
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Zegar monotoniczny modułu akwizycji przesuwany ręcznie (``clock.now``)."""
+    clock = types.SimpleNamespace(now=100.0)
+    patched = types.SimpleNamespace(**vars(time))
+    patched.monotonic = lambda: clock.now
+    monkeypatch.setattr(korad_acquisition, 'time', patched)
+    return clock
+
+
+def test_slow_only_when_idle_and_off(clock):
+    polling = AdaptivePolling(slow=2.0, hold_off=1.0)
+    polling.update(5.0, 0.5)
+    # Tuż po zmianie odczytu - pełna częstotliwość
+    assert polling.interval(0.1, False) == 0.1
+    clock.now += 1.5
+    assert polling.interval(0.1, False) == 2.0
+    # Załączone albo nieznane wyjście, uzbrojone wyzwalacze - zawsze pełna częstotliwość
+    assert polling.interval(0.1, True) == 0.1
+    assert polling.interval(0.1, None) == 0.1
+    assert polling.interval(0.1, False, armed=True) == 0.1
+    # Okres nigdy nie jest krótszy niż podstawowy
+    assert polling.interval(5.0, False) == 5.0
+
+
+def test_reading_change_restarts_hold_off(clock):
+    polling = AdaptivePolling(slow=2.0, hold_off=1.0, voltage_delta=0.02, current_delta=0.002)
+    polling.update(5.0, 0.5)
+    clock.now += 1.5
+    # Zmiana w granicach szumu nie przyspiesza odczytu
+    polling.update(5.01, 0.501)
+    assert polling.interval(0.1, False) == 2.0
+    polling.update(5.1, 0.501)
+    assert polling.interval(0.1, False) == 0.1
+    clock.now += 1.5
+    # Znacznik przerwy (NaN) liczy się jako zmiana
+    polling.update(math.nan, math.nan)
+    assert polling.interval(0.1, False) == 0.1
+
+
+def test_worker_write_restores_fast_polling(clock, simulator):
+    worker = AcquisitionWorker(simulator, interval=0.05, reconnect=False)
+    worker.set_adaptive(True, slow=1.0)
+    # Stan wyjścia nieznany - pełna częstotliwość
+    clock.now += 10
+    assert worker.poll_interval() == 0.05
+    worker.send('OUT0')
+    assert worker.poll_interval() == 0.05
+    clock.now += 10
+    assert worker.poll_interval() == 1.0
+    worker.send('VSET1:5.00')
+    assert worker.poll_interval() == 0.05
+    worker.set_adaptive(False)
+    clock.now += 10
+    assert worker.poll_interval() == 0.05
@@ -0,0 +1,99 @@
+from korad_protocol import PRIORITY_CONTROL, PRIORITY_SETPOINT, KoradProtocol
+from korad_sim import simulator_from_url
+
+from tests.helpers import pump_until
+
+# Nastawy rozróżnialne po odpowiedzi - odpowiedź przypisana złemu zapytaniu nie przejdzie niezauważona
+EXPECTED = {'VSET1?': '12.34', 'ISET1?': '1.234'}
+
+
+def test_setpoints_coalesce_to_last_value(simulator):
+    protocol = KoradProtocol(simulator)
+    first = protocol.submit('VSET1:1.00')
+    for value in ('2.00', '3.00', '4.50'):
+        assert protocol.submit(f'VSET1:{value}') is first
+    current = protocol.submit('ISET1:0.500')
+
+    assert protocol.coalesced_count == 3
+    assert protocol.queue_depth == 2
+    assert pump_until(protocol, lambda: first.done and current.done)
+    assert simulator.vset == 4.5
+    assert simulator.iset == 0.5
+    assert simulator.commands_received == 2
+
+
+def test_output_off_is_sent_first(simulator):
+    protocol = KoradProtocol(simulator)
+    query = protocol.submit('VSET1?')
+    setpoint = protocol.submit('VSET1:5.00')
+    control = protocol.submit('OUT0', PRIORITY_CONTROL)
+    assert pump_until(protocol, lambda: query.done)
+    assert control.sent_ns <= setpoint.sent_ns <= query.sent_ns
+    assert query.reply == '05.00'
+
+
+def test_output_on_keeps_order_with_setpoints(simulator):
+    protocol = KoradProtocol(simulator)
+    written = []
+    write = simulator.write
+    simulator.write = lambda data: written.append(data) or write(data)
+    protocol.submit('VSET1:5.00')
+    protocol.submit('ISET1:0.500')
+    # Także zlecone z priorytetem sterowania - OUT1 nie może wyprzedzić zapisanych wcześniej nastaw
+    output = protocol.submit('OUT1', PRIORITY_CONTROL)
+    assert output.priority == PRIORITY_SETPOINT
+    assert pump_until(protocol, lambda: output.done)
+    assert b''.join(written) == b'VSET1:5.00\nISET1:0.500\nOUT1\n'
+
+
+def test_coalesced_submit_keeps_every_callback(simulator):
+    protocol = KoradProtocol(simulator)
+    completed = []
+    first = protocol.submit('ISET1:0.100', callback=lambda request: completed.append(('first', request.command)))
+    second = protocol.submit('ISET1:0.200', callback=lambda request: completed.append(('second', request.command)))
+    assert second is first
+    assert pump_until(protocol, lambda: first.done)
+    assert completed == [('first', 'ISET1:0.200'), ('second', 'ISET1:0.200')]
+
+
+def _exchange(url, rounds=100):
+    """Zapytania VSET1?/ISET1? potokowo (po dwa w locie) przez symulator z błędami łącza."""
+    connection = simulator_from_url(url, timeout=0.05)
+    connection.vset, connection.iset = 12.34, 1.234
+    protocol = KoradProtocol(connection, max_in_flight=2)
+    requests = []
+    for _ in range(rounds):
+        requests += [protocol.submit('VSET1?'), protocol.submit('ISET1?')]
+    assert pump_until(protocol, lambda: all(request.done for request in requests), timeout=30)
+    return protocol, connection, requests
+
+
+def _check_replies(requests):
+    answered = [request for request in requests if request.error is None]
+    assert all(request.reply == EXPECTED[request.command] for request in answered)
+    return len(answered)
+
+
+def test_dropped_replies_resync():
+    protocol, connection, requests = _exchange('sim://?baud=0&latency=0.001&drop=0.1&seed=1')
+    answered = _check_replies(requests)
+    assert protocol.timeouts.value > 0
+    assert 0 < answered < len(requests)
+
+    # Po wyłączeniu błędów łącze działa dalej bez resztek poprzednich odpowiedzi
+    connection.drop_rate = 0.0
+    request = protocol.submit('VSET1?')
+    assert pump_until(protocol, lambda: request.done)
+    assert request.error is None and request.reply == '12.34'
+
+
+def test_garbled_replies_resync():
+    protocol, connection, requests = _exchange('sim://?baud=0&latency=0.001&garble=0.1&seed=2')
+    answered = _check_replies(requests)
+    assert protocol.reply_errors.value > 0
+    assert 0 < answered < len(requests)
+
+    connection.garble_rate = 0.0
+    request = protocol.submit('ISET1?')
+    assert pump_until(protocol, lambda: request.done)
+    assert request.error is None and request.reply == '1.234'
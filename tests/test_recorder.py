@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+
+from korad_recorder import read_log, read_metadata, scan_chunks
+
+from tests.helpers import ramp_samples, record
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'zapis.kps'
+    samples = ramp_samples(250)
+    samples[120] = (samples[120][0], math.nan, math.nan)  # Znacznik przerwy
+    recorder = record(path, samples)
+    assert recorder.samples_written == 250 and recorder.error is None
+
+    metadata, times, voltages, currents = read_log(str(path))
+    assert metadata['device'] == 'sim'
+    assert metadata['columns'] == ['time_ns', 'voltage', 'current']
+    assert read_metadata(path.read_bytes())[0] == metadata
+    assert times.dtype == np.int64
+    assert times.tolist() == [sample[0] for sample in samples]
+    # Napięcie i prąd są zapisywane jako float32
+    np.testing.assert_allclose(voltages, [sample[1] for sample in samples], rtol=1e-6)
+    np.testing.assert_allclose(currents, [sample[2] for sample in samples], rtol=1e-6)
+
+
+def test_truncated_file_keeps_complete_chunks(tmp_path):
+    path = tmp_path / 'zapis.kps'
+    samples = ramp_samples(250)
+    record(path, samples)
+    buffer = path.read_bytes()
+    chunks = scan_chunks(buffer)
+    assert [chunk.count for chunk in chunks] == [100, 100, 50]
+
+    # Awaria w trakcie zapisu ostatniego bloku: brak stopki i niepełne dane
+    path.write_bytes(buffer[:chunks[-1].data_offset + chunks[-1].data_size // 2])
+    _, times, voltages, _ = read_log(str(path))
+    assert times.tolist() == [sample[0] for sample in samples[:200]]
+    assert len(voltages) == 200
+
+
+def test_corrupted_chunk_stops_scan(tmp_path):
+    path = tmp_path / 'zapis.kps'
+    record(path, ramp_samples(300))
+    buffer = bytearray(path.read_bytes())
+    chunks = scan_chunks(bytes(buffer))
+    buffer[chunks[1].data_offset] ^= 0xff
+    del buffer[-8:]  # Uszkodzona stopka - wymusza przegląd sekwencyjny z kontrolą CRC
+    assert [chunk.count for chunk in scan_chunks(bytes(buffer))] == [100]
@@ -0,0 +1,81 @@
+import csv
+
+import pytest
+
+from korad_acquisition import AcquisitionWorker
+from korad_sequence import SequenceRunner, Step, load_profile, ramp, staircase
+
+from tests.helpers import wait_until
+
+
+@pytest.fixture
+def wire(simulator):
+    """Symulator z zapisem komend w kolejności, w jakiej trafiły do portu."""
+    commands = []
+    write = simulator.write
+
+    def recording_write(data):
+        commands.extend(bytes(data).decode().split())
+        return write(data)
+
+    simulator.write = recording_write
+    return simulator, commands
+
+
+def _run(simulator, steps, **options):
+    worker = AcquisitionWorker(simulator, interval=None, reconnect=False)
+    worker.start()
+    runner = SequenceRunner(worker.send, steps, **options)
+    runner.start()
+    try:
+        runner.join(5)
+        assert runner.finished and runner.error is None
+        assert wait_until(lambda: all(request.done for _, request in runner.last.requests))
+    finally:
+        worker.stop()
+    return runner
+
+
+def test_output_is_enabled_after_the_step_setpoints(wire):
+    simulator, commands = wire
+    _run(simulator, [Step(0, 12.0, 1.0), Step(0.05, 5.0, 0.5, output=True), Step(0.1, output=False)])
+    assert commands == ['ISET1:1.000', 'VSET1:12.00', 'ISET1:0.500', 'VSET1:5.00', 'OUT1', 'OUT0']
+
+
+def test_output_is_disabled_before_the_step_setpoints():
+    (off, *setpoints) = Step(0, 30.0, 2.0, output=False).commands()
+    assert off[0] == 'OUT0'
+    assert [command for command, _ in setpoints] == ['ISET1:2.000', 'VSET1:30.00']
+
+
+def test_runner_stats_and_timing_file(simulator, tmp_path):
+    path = tmp_path / 'kroki.csv'
+    runner = _run(simulator, staircase([1, 2, 3], 0.02, current=0.5), repeat=2, timing_path=str(path))
+    runner.close_timing()
+    stats = runner.stats()
+    assert stats['steps'] == 6
+    assert 0 <= stats['issue_p50_ms'] <= stats['issue_max_ms']
+    assert stats['write_p95_ms'] <= stats['write_max_ms']
+    assert simulator.vset == 3.0
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['step'] for row in rows] == ['0', '1', '2'] * 2
+    assert rows[3]['commanded_s'] == '0.060000'
+    assert rows[0]['commands'] == 'ISET1:0.500 VSET1:1.00'
+
+
+def test_profile_and_generators(tmp_path):
+    path = tmp_path / 'profil.csv'
+    path.write_text('t,U,prąd,wyjście\n1.5,6,,\n0,5.00,"0,5",on\n3,0,,off\n', encoding='utf-8')
+    steps = load_profile(str(path))
+    assert [(step.t, step.voltage, step.current, step.output) for step in steps] == [
+        (0.0, 5.0, 0.5, True), (1.5, 6.0, None, None), (3.0, 0.0, None, False)]
+
+    steps = ramp(0, 10, 1.0, 0.25, current=1.0, output=True)
+    assert [step.voltage for step in steps] == [0.0, 2.5, 5.0, 7.5, 10.0]
+    assert steps[0].output is True and steps[1].output is None
+
+    path.write_text('t,voltage\n0,99\n', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_profile(str(path))
@@ -0,0 +1,166 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+import korad_server
+from korad_acquisition import AcquisitionWorker
+from korad_server import SAMPLE_DTYPE, ApiServer
+from korad_store import SessionStore
+
+from tests.helpers import wait_until
+
+
+@pytest.fixture
+def worker(simulator):
+    worker = AcquisitionWorker(simulator, interval=0.02, reconnect=False)
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SessionStore(str(tmp_path / 'sesje.sqlite')) as store:
+        session = store.create_session('sim')
+        times = 10 ** 15 + np.arange(1000, dtype=np.int64) * 1000000
+        for start in range(0, 1000, 100):
+            store.append(session, times[start:start + 100], np.full(100, 5.0), np.full(100, 0.5))
+        yield store
+
+
+@pytest.fixture
+def server(worker, store):
+    server = ApiServer(worker, port=0, batch_interval=0.02, store=store)
+    server.start()
+    yield server
+    server.stop()
+
+
+def _request(server, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+    try:
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers.setdefault('Content-Type', 'application/json')
+        connection.request(method, path, body, headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_state_and_control(server, simulator):
+    assert _request(server, 'PUT', '/api/voltage', {'value': 5.0}) == (200, {'voltage': 5.0})
+    assert _request(server, 'PUT', '/api/output', {'value': True}) == (200, {'output': True})
+    assert wait_until(lambda: simulator.vset == 5.0 and simulator.output)
+    status, state = _request(server, 'GET', '/api/state')
+    assert status == 200 and state['connected'] and state['setpoints']['voltage'] == 5.0
+
+    assert _request(server, 'PUT', '/api/voltage', {'value': 99})[0] == 400
+    assert _request(server, 'GET', '/api/voltage')[0] == 405
+    assert _request(server, 'GET', '/api/nic')[0] == 404
+
+
+@pytest.mark.parametrize('headers', [
+    {'Host': 'evil.example:8765'},
+    {'Origin': 'http://evil.example'},
+    {'Origin': 'null'},
+])
+def test_foreign_host_or_origin_is_rejected(server, headers):
+    assert _request(server, 'GET', '/api/state', headers=headers)[0] == 403
+
+
+def test_own_origin_is_accepted(server):
+    assert _request(server, 'GET', '/api/state', headers={'Origin': f'http://localhost:{server.port}'})[0] == 200
+
+
+def test_write_requires_json_content_type(server, simulator):
+    status, _ = _request(server, 'PUT', '/api/voltage', {'value': 7.0}, {'Content-Type': 'text/plain'})
+    assert status == 415
+    assert simulator.vset != 7.0
+
+
+def test_session_queries(server, store):
+    status, result = _request(server, 'GET', '/api/sessions?channel=current&above=0.4')
+    assert status == 200 and [session['device'] for session in result['sessions']] == ['sim']
+    status, result = _request(server, 'GET', '/api/aggregate')
+    assert status == 200 and result['samples'] == 1000
+    status, result = _request(server, 'GET', f'/api/sessions/1/samples?until={(10 ** 15 + 249 * 1000000) / 1e9}')
+    assert status == 200 and len(result['time_ns']) == 250
+    assert _request(server, 'GET', '/api/sessions?since=wczoraj')[0] == 400
+
+
+def test_sample_limit_is_checked_before_reading(server, store, monkeypatch):
+    monkeypatch.setattr(korad_server, 'MAX_QUERY_SAMPLES', 500)
+    store.chunks_decoded = 0
+    assert _request(server, 'GET', '/api/sessions/1/samples')[0] == 400
+    assert store.chunks_decoded == 0  # Liczba próbek z indeksu, bez rozpakowywania bloków
+
+
+def test_database_error_is_reported(server, store):
+    store.close()
+    status, result = _request(server, 'GET', '/api/aggregate')
+    assert status == 500 and 'error' in result
+
+
+def _open_websocket(server):
+    client = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    key = base64.b64encode(os.urandom(16)).decode()
+    client.sendall((f'GET /ws/samples HTTP/1.1\r\nHost: 127.0.0.1:{server.port}\r\nUpgrade: websocket\r\n'
+                    f'Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n').encode())
+    reader = client.makefile('rb')
+    assert reader.readline().startswith(b'HTTP/1.1 101')
+    while reader.readline() not in (b'\r\n', b''):
+        pass
+    return client, reader
+
+
+def _read_frame(reader):
+    first, second = reader.read(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', reader.read(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', reader.read(8))
+    return first & 0x0F, reader.read(length)
+
+
+def test_websocket_streams_samples(server):
+    client, reader = _open_websocket(server)
+    try:
+        opcode, payload = _read_frame(reader)
+        assert opcode == 0x2
+        records = np.frombuffer(payload, dtype=SAMPLE_DTYPE)
+        assert len(records) and records['time_ns'][0] > 10 ** 18  # Czas uniksowy [ns]
+    finally:
+        client.close()
+
+
+def test_websocket_rejects_oversized_frame(server):
+    client, reader = _open_websocket(server)
+    try:
+        # Nagłówek ramki z deklarowaną długością 1 GiB - serwer nie może na nią alokować bufora
+        client.sendall(struct.pack('!BBQ', 0x82, 0x80 | 127, 1 << 30) + b'\0' * 4)
+        opcode = None
+        while opcode != 0x8:
+            opcode, _ = _read_frame(reader)
+        assert wait_until(lambda: not server.clients)
+    finally:
+        client.close()
+
+
+def test_websocket_origin_is_checked(server):
+    client = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    try:
+        client.sendall((f'GET /ws/samples HTTP/1.1\r\nHost: 127.0.0.1:{server.port}\r\nOrigin: http://evil.example\r\n'
+                        'Upgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: eA==\r\n\r\n').encode())
+        assert client.makefile('rb').readline().startswith(b'HTTP/1.1 403')
+    finally:
+        client.close()
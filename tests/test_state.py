@@ -0,0 +1,65 @@
+from korad_protocol import KoradProtocol
+from korad_state import DeviceState, parse_status
+
+from tests.helpers import pump_until
+
+
+def _state(simulator, **options):
+    protocol = KoradProtocol(simulator)
+    divergences = []
+    state = DeviceState(protocol, settle=0, on_divergence=lambda *args: divergences.append(args), **options)
+    return protocol, state, divergences
+
+
+def _send(protocol, state, command):
+    state.written(command)
+    return protocol.submit(command)
+
+
+def test_write_is_visible_before_confirmation(simulator):
+    protocol, state, divergences = _state(simulator)
+    _send(protocol, state, 'VSET1:5.00')
+    _send(protocol, state, 'ISET1:1.000')
+    _send(protocol, state, 'OUT1')
+    assert state.get('voltage') == 5.0 and state.get('output') is True
+    assert not state.snapshot()['voltage']['confirmed']
+
+    done = []
+    state.revalidate(done.append)
+    assert pump_until(protocol, lambda: done)
+    assert done == [None]
+    snapshot = state.snapshot()
+    assert snapshot['voltage']['confirmed'] and snapshot['output']['confirmed']
+    assert snapshot['status']['output'] and snapshot['status']['mode'] == 'CV'
+    assert divergences == []
+
+
+def test_change_on_front_panel_is_reported(simulator):
+    protocol, state, divergences = _state(simulator)
+    _send(protocol, state, 'ISET1:0.500')
+    done = []
+    state.revalidate(done.append)
+    assert pump_until(protocol, lambda: done)
+
+    simulator.iset = 0.25  # Zmiana pokrętłem na panelu zasilacza
+    done.clear()
+    state.revalidate(done.append)
+    assert pump_until(protocol, lambda: done)
+    assert divergences == [('current', 0.5, 0.25)]
+    assert state.get('current') == 0.25
+    assert state.divergences.value == 1
+
+
+def test_read_ordered_before_write_does_not_confirm(simulator):
+    protocol, state, _ = _state(simulator, interval=None)
+    done = []
+    state.revalidate(done.append)  # Odczyt zlecony przed zapisem - zwróci starą nastawę
+    _send(protocol, state, 'VSET1:7.00')
+    assert pump_until(protocol, lambda: done)
+    assert state.get('voltage') == 7.0
+    assert not state.snapshot()['voltage']['confirmed']
+
+
+def test_parse_status():
+    assert parse_status('\x41') == {'mode': 'CV', 'output': True, 'beep': False, 'lock': False, 'raw': 0x41}
+    assert parse_status('\x00')['mode'] == 'CC'
@@ -0,0 +1,76 @@
+import math
+
+import pytest
+
+from korad_stats import KahanSum, RunningStats, SlidingWindow, StreamStats
+
+MS = 1000000
+
+
+def test_running_stats_match_closed_form():
+    stats = RunningStats()
+    for value in (1.0, 2.0, 3.0, 4.0):
+        stats.update(value)
+    snapshot = stats.snapshot()
+    assert (snapshot['count'], snapshot['min'], snapshot['max']) == (4, 1.0, 4.0)
+    assert snapshot['mean'] == pytest.approx(2.5)
+    assert snapshot['std'] == pytest.approx(math.sqrt(1.25))
+    assert snapshot['rms'] == pytest.approx(math.sqrt(7.5))
+    assert math.isnan(RunningStats().snapshot()['mean'])
+
+
+def test_kahan_sum_keeps_small_terms():
+    total = KahanSum()
+    total.add(1e16)
+    for _ in range(1000):
+        total.add(1.0)
+    total.add(-1e16)
+    assert total.value == 1000.0
+
+
+def test_energy_and_charge_by_trapezoids():
+    stats = StreamStats()
+    # 5 V, prąd narasta liniowo 0 -> 1 A w ciągu 1 s
+    stats.extend((index * 10 * MS, 5.0, index / 100) for index in range(101))
+    snapshot = stats.snapshot()
+    assert snapshot['energy_wh'] == pytest.approx(2.5 / 3600)
+    assert snapshot['charge_ah'] == pytest.approx(0.5 / 3600)
+    assert snapshot['duration_s'] == pytest.approx(1.0)
+    assert snapshot['power'] == pytest.approx(5.0)
+    assert snapshot['total']['current']['max'] == pytest.approx(1.0)
+
+
+def test_gap_marker_and_long_gap_break_integration():
+    stats = StreamStats(max_gap=1.0)
+    stats.update(0, 5.0, 1.0)
+    stats.update(1000 * MS, 5.0, 1.0)
+    # Znacznik przerwy - odstęp za nim nie jest całkowany, statystyki go pomijają
+    stats.update(1500 * MS, math.nan, math.nan)
+    stats.update(2000 * MS, 5.0, 1.0)
+    # Odstęp dłuższy niż max_gap
+    stats.update(5000 * MS, 5.0, 1.0)
+    snapshot = stats.snapshot()
+    assert snapshot['energy_wh'] == pytest.approx(5.0 / 3600)
+    assert snapshot['integrated_s'] == pytest.approx(1.0)
+    assert snapshot['gaps'] == 2
+    assert snapshot['total']['voltage']['count'] == 4
+
+
+def test_sliding_window_expires_old_samples():
+    window = SlidingWindow(duration=1.0)
+    for index, value in enumerate((9.0, 1.0, 5.0, 3.0)):
+        window.update(index * 500 * MS, value)
+    # Okno [0,5 s, 1,5 s] - wartość 9 z chwili 0 wypadła
+    assert window.snapshot() == {'count': 3, 'mean': pytest.approx(3.0), 'min': 1.0, 'max': 5.0}
+    window.update(2500 * MS, 4.0)
+    assert window.snapshot() == {'count': 2, 'mean': pytest.approx(3.5), 'min': 3.0, 'max': 4.0}
+
+
+def test_reset_clears_everything():
+    stats = StreamStats()
+    stats.extend([(0, 5.0, 1.0), (MS, 5.0, 1.0)])
+    stats.reset()
+    snapshot = stats.snapshot()
+    assert snapshot['energy_wh'] == 0.0 and snapshot['duration_s'] == 0.0
+    assert math.isnan(snapshot['power'])
+    assert snapshot['window']['voltage']['count'] == 0
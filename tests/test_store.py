@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from korad_store import SessionStore, StoreWriter
+
+MS = 1000000
+CHUNK = 100
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SessionStore(str(tmp_path / 'sesje.sqlite')) as store:
+        yield store
+
+
+def _fill(store, device='sim', start_ns=10 ** 15, chunks=10, spike=None):
+    """Sesja z ``chunks`` blokami po CHUNK próbek co 1 ms; ``spike`` - indeks próbki z prądem 3 A."""
+    session = store.create_session(device)
+    times = start_ns + np.arange(chunks * CHUNK, dtype=np.int64) * MS
+    voltages = np.full(len(times), 5.0)
+    currents = np.full(len(times), 0.5)
+    if spike is not None:
+        currents[spike] = 3.0
+    previous = None
+    for start in range(0, len(times), CHUNK):
+        part = slice(start, start + CHUNK)
+        store.append(session, times[part], voltages[part], currents[part], previous)
+        previous = (times[start + CHUNK - 1], voltages[start + CHUNK - 1], currents[start + CHUNK - 1])
+    return session, times
+
+
+def test_threshold_query_decodes_only_matching_chunks(store):
+    _fill(store, start_ns=10 ** 15)
+    session, times = _fill(store, start_ns=2 * 10 ** 15, spike=745)
+    store.chunks_decoded = 0
+
+    (found,) = store.sessions(channel='current', above=2.0)
+    assert found['id'] == session
+    assert found['first_ns'] == int(times[745])
+    assert store.chunks_decoded == 1
+
+    # Zakres kończy się przed blokiem ze szpilką - odpada na indeksie bloków, bez rozpakowywania
+    store.chunks_decoded = 0
+    assert store.sessions(t1=int(times[699]), channel='current', above=2.0) == []
+    assert store.chunks_decoded == 0
+
+    # Zakres kończy się w bloku ze szpilką, przed nią - rozpakowany jest tylko ten blok
+    assert store.sessions(t1=int(times[744]), channel='current', above=2.0) == []
+    assert store.chunks_decoded == 1
+
+
+def test_aggregate_decodes_only_boundary_chunks(store):
+    session, times = _fill(store)
+    store.chunks_decoded = 0
+    total = store.aggregate()
+    assert store.chunks_decoded == 0
+    assert total['samples'] == len(times)
+    assert total['voltage']['mean'] == pytest.approx(5.0)
+    assert total['energy_wh'] == pytest.approx(2.5 * (len(times) - 1) * 1e-3 / 3600)
+
+    # Granice zakresu w środku bloków 2 i 6 - rozpakowane są tylko te dwa
+    part = store.aggregate(t0=int(times[250]), t1=int(times[649]), session=session)
+    assert store.chunks_decoded == 2
+    assert part['samples'] == 400
+    assert part['start_ns'] == int(times[250]) and part['end_ns'] == int(times[649])
+    # Energia od próbki poprzedzającej zakres, jak dla bloków liczonych z indeksu: 400 odcinków po 1 ms
+    assert part['energy_wh'] == pytest.approx(2.5 * 400e-3 / 3600)
+    assert part['charge_ah'] == pytest.approx(0.5 * 400e-3 / 3600)
+
+    # Granica na początku bloku - ten sam wynik co z indeksu
+    store.chunks_decoded = 0
+    aligned = store.aggregate(t0=int(times[300]), t1=int(times[649]), session=session)
+    assert store.chunks_decoded == 1
+    assert aligned['energy_wh'] == pytest.approx(2.5 * 350e-3 / 3600)
+
+
+def test_read_range(store):
+    session, times = _fill(store, spike=10)
+    store.chunks_decoded = 0
+    columns = store.read(session, int(times[120]), int(times[329]), channels=('current',))
+    assert store.chunks_decoded == 3
+    assert columns['time_ns'].tolist() == times[120:330].tolist()
+    assert set(columns) == {'time_ns', 'current'}
+    assert store.session(session)['device'] == 'sim'
+
+
+def test_writer_splits_samples_into_chunks(store):
+    writer = StoreWriter(store, 'sim', chunk_size=CHUNK, flush_interval=0.1)
+    writer.extend([(index * MS, 5.0, 0.5) for index in range(250)])
+    writer.close()
+    assert writer.error is None
+    (session,) = store.sessions(device='sim')
+    assert session['samples'] == 250
+    assert len(store.read(session['id'])['time_ns']) == 250
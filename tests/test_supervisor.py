@@ -0,0 +1,101 @@
+import serial
+
+from korad_acquisition import AcquisitionWorker
+from korad_sim import open_port
+from korad_supervisor import LinkSupervisor, ports_in_use
+
+from tests.helpers import wait_until
+
+PORT = 'sim://?baud=0&latency=0.001'
+
+
+def _break_link(connection):
+    def write(data):
+        raise serial.SerialException('Urządzenie odłączone')
+
+    connection.write = write
+
+
+def _recording_open(written):
+    """``open`` nadzorcy zapisujący komendy zmieniające nastawy, w kolejności zapisu do portu."""
+    def open(port):
+        connection = open_port(port, timeout=0.05)
+        write = connection.write
+
+        def recording_write(data):
+            written.extend(command for command in bytes(data).decode().split() if not command.endswith('?'))
+            return write(data)
+
+        connection.write = recording_write
+        return connection
+
+    return open
+
+
+def test_reconnect_restores_setpoints_and_output():
+    worker = AcquisitionWorker(open_port(PORT, timeout=0.05), interval=0.05)
+    worker.supervisor.backoff = 0.01
+    written = []
+    worker.supervisor.open = _recording_open(written)
+    worker.start()
+    try:
+        worker.send('VSET1:5.00')
+        worker.send('ISET1:0.200')
+        worker.send('OUT1')
+        lost = worker.connection
+        assert wait_until(lambda: lost.output and worker.supervisor.idn is not None)
+        assert PORT in ports_in_use()
+
+        _break_link(lost)
+        assert wait_until(lambda: ('link', 'restored') in worker.events)
+        assert ('link', 'lost') in worker.events
+        restored = worker.connection
+        assert restored is not lost
+        assert worker.supervisor.verified
+        # Nowy symulator startuje z zerowymi nastawami - wszystko pochodzi z przywrócenia
+        assert wait_until(lambda: restored.output and restored.vset == 5.0 and restored.iset == 0.2)
+        # Wyjście wraca dopiero po zapisie nastaw - nie przy nastawach z uruchomienia zasilacza
+        assert written == ['ISET1:0.200', 'VSET1:5.00', 'OUT1']
+        assert worker.reconnects.value == 1
+        assert wait_until(lambda: any(sample[1] != sample[1] for sample in worker.samples))  # Znacznik NaN
+    finally:
+        worker.stop()
+    assert PORT not in ports_in_use()
+
+
+def test_reconnect_refuses_other_device():
+    supervisor = LinkSupervisor(PORT + '&idn=INNY')
+    try:
+        supervisor.remember('KORAD KA3005P V5.8 SN:00000001')
+        assert supervisor.reconnect() is None
+        assert not supervisor.verified
+
+        # Bez zapamiętanej tożsamości port jest przyjmowany, ale niepotwierdzony
+        supervisor.idn = None
+        connection = supervisor.reconnect()
+        assert connection is not None and connection.idn == 'INNY'
+        assert not supervisor.verified
+    finally:
+        supervisor.close()
+
+
+def test_output_stays_off_without_verified_identity(monkeypatch):
+    worker = AcquisitionWorker(open_port(PORT, timeout=0.05), interval=0.05)
+    worker.supervisor.backoff = 0.01
+    # Tożsamość zasilacza nieznana (np. *IDN? nie odpowiedział przed utratą łącza)
+    monkeypatch.setattr(worker.supervisor, 'remember', lambda idn: None)
+    worker.start()
+    try:
+        worker.send('VSET1:3.00')
+        worker.send('OUT1')
+        lost = worker.connection
+        assert wait_until(lambda: lost.output)
+
+        _break_link(lost)
+        assert wait_until(lambda: ('link', 'restored') in worker.events)
+        restored = worker.connection
+        assert not worker.supervisor.verified
+        assert wait_until(lambda: restored.vset == 3.0)
+        assert not restored.output
+    finally:
+        worker.stop()
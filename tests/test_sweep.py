@@ -0,0 +1,74 @@
+import math
+import time
+
+import pytest
+
+from korad_core import KoradDevice
+from korad_sweep import Sweep, wait_settled
+
+TAU = 0.05  # Stała czasowa wyjścia symulatora [s]
+SPAN = 0.1
+
+
+@pytest.fixture
+def device():
+    device = KoradDevice.open(f'sim://?load=10&tau={TAU}&baud=0&latency=0.001')
+    device.set_output(True)
+    yield device
+    device.close()
+
+
+def test_wait_settled_waits_out_slow_exponential():
+    start = time.monotonic()
+
+    def read():
+        # Dochodzenie do 10 V ze stałą czasową 0,1 s - kilka kolejnych odczytów różni się o mniej niż tolerancja
+        time.sleep(0.002)
+        return 10 * (1 - math.exp(-(time.monotonic() - start) / 0.1)), 0.0
+
+    voltage, _, elapsed, settled = wait_settled(read, voltage_tolerance=0.02, span=0.1, timeout=5)
+    assert settled
+    assert voltage == pytest.approx(10, abs=0.02)
+    assert elapsed >= 0.1 * math.log(10 / 0.02) - 0.1
+
+
+def test_wait_settled_times_out():
+    voltage, current, elapsed, settled = wait_settled(lambda: (10 * time.monotonic(), 0.0), span=0.02, timeout=0.1)
+    assert not settled and elapsed >= 0.1
+
+
+def test_voltage_sweep_with_output_time_constant(device):
+    points = Sweep(device, 0, 12, 2, limit=1.0, span=SPAN).run()
+    for point in points:
+        expected = min(point.setpoint, 10.0)  # 10 ohm, ograniczenie 1 A
+        assert point.settled
+        assert point.voltage == pytest.approx(expected, abs=0.02), point
+        assert point.current == pytest.approx(expected / 10, abs=0.002), point
+        if point.setpoint != 10.0:
+            assert point.mode == ('CV' if point.setpoint < 10.0 else 'CC'), point
+    # Zagęszczanie tylko przy przejściu CV -> CC, nie na prostym odcinku
+    refined = {point.setpoint for point in points} - {0, 2, 4, 6, 8, 10, 12}
+    assert refined and all(8 < setpoint < 12 for setpoint in refined)
+
+
+class _Readout:
+    """Urządzenie bez STATUS? - tryb wyznaczany z odczytu i nastaw."""
+
+    def __init__(self, voltage, current):
+        self.reading = (voltage, current)
+
+    def read(self):
+        return self.reading
+
+
+@pytest.mark.parametrize('quantity, limit, reading, mode', [
+    ('voltage', 1.0, (4.0, 1.0), 'CC'),
+    ('voltage', 1.0, (5.0, 0.5), 'CV'),
+    ('voltage', None, (4.0, 0.4), 'CC'),
+    ('current', 5.0, (5.0, 0.5), 'CV'),
+    ('current', 5.0, (3.0, 1.0), 'CC'),
+])
+def test_mode_from_active_limit(quantity, limit, reading, mode):
+    sweep = Sweep(_Readout(*reading), 0, 2, 1, quantity=quantity, limit=limit)
+    setpoint = 5.0 if quantity == 'voltage' else 1.0
+    assert sweep._mode(setpoint, *reading) == mode
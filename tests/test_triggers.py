@@ -0,0 +1,66 @@
+import numpy as np
+
+from korad_protocol import PRIORITY_CONTROL
+from korad_triggers import Change, ModeChange, Threshold, Trigger, TriggerEngine
+
+MS = 1000000
+
+
+def _batch(start, currents, voltage=5.0, step_ns=10 * MS):
+    """Porcja (3, n): czas_ns, napięcie, prąd - próbki co ``step_ns`` od indeksu ``start``."""
+    times = (np.arange(len(currents)) + start) * step_ns
+    return np.vstack((times, np.full(len(currents), voltage), currents))
+
+
+def test_threshold_fires_on_edges_across_batches():
+    engine = TriggerEngine([Trigger(Threshold('current', above=1.0), holdoff=0)])
+    assert [event.current for event in engine.process(_batch(0, [0.5, 0.8, 1.2, 1.5]))] == [1.2]
+    # Wartość wciąż powyżej progu na początku kolejnej porcji - to nie jest nowe zbocze
+    assert engine.process(_batch(4, [1.4, 1.3])) == []
+    events = engine.process(_batch(6, [0.9, 1.1, 0.2, 1.3]))
+    assert [event.timestamp_ns for event in events] == [70 * MS, 90 * MS]
+
+
+def test_holdoff_suppresses_repeated_edges():
+    engine = TriggerEngine([Trigger(Threshold('voltage', below=4.0), holdoff=0.05)])
+    voltages = [5.0, 3.0, 5.0, 3.0, 5.0, 5.0, 5.0, 3.0]
+    batch = _batch(0, np.zeros(len(voltages)))
+    batch[1] = voltages
+    assert [event.timestamp_ns for event in engine.process(batch)] == [10 * MS, 70 * MS]
+
+
+def test_change_carries_window_between_batches():
+    engine = TriggerEngine([Trigger(Change('current', -0.5, window=0.05), holdoff=0)])
+    assert engine.process(_batch(0, [1.0, 1.0, 1.0])) == []
+    # Spadek liczony względem próbek z poprzedniej porcji (w oknie 50 ms)
+    events = engine.process(_batch(3, [0.8, 0.4]))
+    assert [event.timestamp_ns for event in events] == [40 * MS]
+    # Powolny spadek - w żadnym oknie nie przekracza progu
+    assert engine.process(_batch(5, [0.4 - 0.05 * index for index in range(8)])) == []
+
+
+def test_capture_collects_pre_and_post_samples_across_batches():
+    sent = []
+    trigger = Trigger(Threshold('current', above=1.0), action='OUT0', pre=3, post=4, holdoff=0)
+    engine = TriggerEngine([trigger], send=lambda command, priority: sent.append((command, priority)))
+    engine.process(_batch(0, [0.1, 0.2, 0.3, 0.4, 0.5]))
+    (event,) = engine.process(_batch(5, [0.6, 2.0]))
+    assert sent == [('OUT0', PRIORITY_CONTROL)]
+    assert event.capture is None
+
+    engine.process(_batch(7, [2.0, 2.0]))
+    assert event.capture is None
+    engine.process(_batch(9, [0.0, 0.0, 0.0]))
+    # 3 próbki przed zdarzeniem, próbka wyzwalająca i 4 po niej
+    assert event.capture[2].tolist() == [0.4, 0.5, 0.6, 2.0, 2.0, 2.0, 0.0, 0.0]
+    assert list(engine.captures) == [event]
+
+
+def test_pending_samples_and_mode_change():
+    engine = TriggerEngine([Trigger(ModeChange('CC'), holdoff=0)])
+    context = {'setpoints': {'voltage': 5.0, 'current': 0.5}}
+    for index, (voltage, current) in enumerate([(5.0, 0.2), (5.0, 0.3), (3.0, 0.5), (2.0, 0.5)]):
+        engine.add(index * 10 * MS, voltage, current)
+    (event,) = engine.process_pending(context)
+    assert event.timestamp_ns == 20 * MS
+    assert engine.process_pending(context) == []
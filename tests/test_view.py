@@ -0,0 +1,87 @@
+from korad_view import ViewModel
+
+
+class Widget:
+    """Widżet zapisujący ustawione wartości i stan blokady sygnałów w chwili ustawienia."""
+
+    def __init__(self):
+        self.values = []
+        self.blocked = False
+        self.blocked_when_set = []
+
+    def blockSignals(self, blocked):
+        previous, self.blocked = self.blocked, blocked
+        return previous
+
+    def setValue(self, value):
+        self.values.append(value)
+        self.blocked_when_set.append(self.blocked)
+
+
+def _bound(model, key):
+    widget = Widget()
+    model.bind(key, widget.setValue, widget)
+    return widget
+
+
+def test_changes_are_batched_per_frame():
+    scheduled = []
+    model = ViewModel(schedule=lambda: scheduled.append(True))
+    widget = _bound(model, 'voltage')
+    model.set('voltage', '01.00')
+    model.set('voltage', '02.00')
+    # Jedno zaplanowane odświeżenie na klatkę, ostatnia wartość wygrywa
+    assert len(scheduled) == 1 and widget.values == []
+    model.flush()
+    assert widget.values == ['02.00']
+    assert model.flushes == 1 and model.applied == 1
+
+
+def test_unchanged_value_is_skipped():
+    model = ViewModel()
+    widget = _bound(model, 'voltage')
+    model.set('voltage', '05.00')
+    model.flush()
+    model.set('voltage', '05.00')
+    model.flush()
+    assert widget.values == ['05.00']
+    assert model.skipped == 1 and model.flushes == 1
+    # Zmiana wycofana przed flush - widżet nie jest ustawiany
+    model.set('voltage', '06.00')
+    model.set('voltage', '05.00')
+    model.flush()
+    assert widget.values == ['05.00']
+
+
+def test_signals_blocked_while_setting():
+    model = ViewModel()
+    widget = _bound(model, 'knob')
+    model.apply('knob', 3)
+    assert widget.values == [3] and widget.blocked_when_set == [True]
+    # Poprzedni stan blokady przywrócony
+    assert widget.blocked is False
+
+
+def test_note_records_user_value_without_setting():
+    model = ViewModel()
+    widget = _bound(model, 'knob')
+    model.set('knob', 1)
+    # Użytkownik przekręcił pokrętło - oczekująca zmiana przepada, widżet nie jest ustawiany
+    model.note('knob', 7)
+    model.flush()
+    assert widget.values == [] and model.value('knob') == 7
+    model.set('knob', 7)
+    assert model.skipped == 1
+
+
+def test_unbind_drops_pending_and_shown():
+    model = ViewModel()
+    widget = _bound(model, 'voltage')
+    model.apply('voltage', '05.00')
+    model.set('voltage', '06.00')
+    model.unbind('voltage')
+    model.flush()
+    assert widget.values == ['05.00'] and model.value('voltage') is None
+    # Wartość bez wiązania nie jest liczona jako zastosowana
+    model.apply('voltage', '07.00')
+    assert model.applied == 1